@@ -1,13 +1,19 @@
 """ap-empty-directory: CLI tool to empty directories by removing files and empty dirs"""
 
 from ap_empty_directory.empty import (
+    DirectoryEmptier,
+    RunStats,
     delete_files_in_directory,
     empty_directory,
     resolve_path,
 )
+from ap_empty_directory.pathlist import PathList
 
 __version__ = "0.1.0"
 __all__ = [
+    "DirectoryEmptier",
+    "PathList",
+    "RunStats",
     "delete_files_in_directory",
     "empty_directory",
     "resolve_path",
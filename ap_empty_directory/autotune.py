@@ -0,0 +1,248 @@
+"""Concurrent unlink workers with adaptive (AIMD) concurrency control."""
+
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Value of the workers option that enables the autotuner
+WORKERS_AUTO = "auto"
+
+
+def parse_workers(value: int | str) -> int | str:
+    """
+    Validate a workers setting.
+
+    Args:
+        value: Positive worker count, or "auto"
+
+    Returns:
+        The worker count as an int, or WORKERS_AUTO
+    """
+    if value == WORKERS_AUTO:
+        return WORKERS_AUTO
+    try:
+        workers = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Workers must be a positive integer or 'auto': {value}")
+    if workers < 1:
+        raise ValueError(f"Workers must be a positive integer or 'auto': {value}")
+    return workers
+
+
+class AIMDController:
+    """
+    Additive-increase/multiplicative-decrease concurrency controller.
+
+    Operation results are grouped into windows. After each window the limit
+    is adjusted:
+
+    - halved if the error rate exceeds ``max_error_rate`` or mean latency
+      exceeds ``latency_factor`` times the lowest mean latency seen so far
+      (the storage is saturated or failing)
+    - decreased by one if throughput fell compared to the previous window
+    - increased by one otherwise
+
+    The controller is not thread-safe; callers serialize record().
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 64,
+        max_error_rate: float = 0.05,
+        latency_factor: float = 4.0,
+        throughput_tolerance: float = 0.05,
+        min_window: int = 16,
+    ):
+        """
+        Args:
+            initial: Starting concurrency limit
+            minimum: Lowest allowed limit
+            maximum: Highest allowed limit
+            max_error_rate: Error fraction in a window that triggers a backoff
+            latency_factor: Latency growth over the baseline that triggers a
+                backoff
+            throughput_tolerance: Relative throughput drop treated as noise
+            min_window: Minimum number of operations per window
+        """
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError(
+                f"Invalid limits: minimum={minimum}, initial={initial}, "
+                f"maximum={maximum}"
+            )
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.peak = initial
+        self.adjustments = 0
+        self._max_error_rate = max_error_rate
+        self._latency_factor = latency_factor
+        self._throughput_tolerance = throughput_tolerance
+        self._min_window = min_window
+        self._baseline_latency: float | None = None
+        self._last_throughput: float | None = None
+        self._window_start: float | None = None
+        self._reset_window(None)
+
+    def record(self, latency: float, ok: bool, now: float | None = None) -> None:
+        """
+        Record the outcome of one operation.
+
+        Args:
+            latency: Seconds the operation took
+            ok: False if the operation failed
+            now: Current perf_counter() time (looked up if not given)
+        """
+        if now is None:
+            now = perf_counter()
+        if self._window_start is None:
+            # The first window starts when the first operation completes
+            self._window_start = now - latency
+        self._ops += 1
+        self._latency_sum += latency
+        if not ok:
+            self._errors += 1
+        if self._ops >= max(self._min_window, 4 * self.limit):
+            self._adjust(now, self._window_start)
+
+    def _adjust(self, now: float, window_start: float) -> None:
+        elapsed = max(now - window_start, 1e-9)
+        throughput = self._ops / elapsed
+        latency = self._latency_sum / self._ops
+        error_rate = self._errors / self._ops
+        if self._baseline_latency is None or latency < self._baseline_latency:
+            self._baseline_latency = latency
+
+        previous = self.limit
+        if (
+            error_rate > self._max_error_rate
+            or latency > self._baseline_latency * self._latency_factor
+        ):
+            self.limit = max(self.minimum, self.limit // 2)
+        elif self._last_throughput is not None and throughput < (
+            self._last_throughput * (1 - self._throughput_tolerance)
+        ):
+            self.limit = max(self.minimum, self.limit - 1)
+        else:
+            self.limit = min(self.maximum, self.limit + 1)
+
+        if self.limit != previous:
+            self.adjustments += 1
+            logger.debug(
+                f"Workers {previous} -> {self.limit} "
+                f"(throughput={throughput:.0f}/s, latency={latency * 1e3:.2f}ms, "
+                f"errors={error_rate:.1%})"
+            )
+        self.peak = max(self.peak, self.limit)
+        self._last_throughput = throughput
+        self._reset_window(now)
+
+    def _reset_window(self, now: float | None) -> None:
+        self._window_start = now
+        self._ops = 0
+        self._errors = 0
+        self._latency_sum = 0.0
+
+
+class UnlinkPool:
+    """
+    Thread pool that removes files concurrently.
+
+    The number of removals in flight is capped by a fixed worker count or by
+    an AIMDController. Results are queued and collected by the submitting
+    thread through completed() and drain(), so callbacks and counters are
+    only ever touched from one thread. A pool may be reused across runs.
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        controller: AIMDController | None = None,
+    ):
+        """
+        Args:
+            workers: Fixed number of concurrent removals
+            controller: Adaptive controller (used instead of workers)
+        """
+        if controller is None and workers is None:
+            raise ValueError("Either workers or controller is required")
+        self.controller = controller
+        self._workers = workers
+        size = controller.maximum if controller is not None else workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=size, thread_name_prefix="ap-empty-directory"
+        )
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._done: deque[tuple[str, OSError | None]] = deque()
+
+    @property
+    def limit(self) -> int:
+        """Current maximum number of removals in flight."""
+        if self.controller is not None:
+            return self.controller.limit
+        return self._workers  # type: ignore[return-value]
+
+    def submit(self, remove: Callable[[str], None], path: str) -> None:
+        """
+        Queue a path for removal, blocking while the pool is at its limit.
+
+        Args:
+            remove: Function that removes one path
+            path: Path to remove
+        """
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+        self._executor.submit(self._run, remove, path)
+
+    def completed(self) -> list[tuple[str, OSError | None]]:
+        """
+        Collect results of removals that have finished.
+
+        Returns:
+            List of (path, error) tuples; error is None on success
+        """
+        results = []
+        while self._done:
+            results.append(self._done.popleft())
+        return results
+
+    def drain(self) -> list[tuple[str, OSError | None]]:
+        """
+        Wait for all queued removals and collect their results.
+
+        Returns:
+            List of (path, error) tuples; error is None on success
+        """
+        with self._cond:
+            while self._in_flight:
+                self._cond.wait()
+        return self.completed()
+
+    def close(self) -> None:
+        """Wait for queued removals and stop the worker threads."""
+        self._executor.shutdown(wait=True)
+
+    def _run(self, remove: Callable[[str], None], path: str) -> None:
+        error: OSError | None = None
+        start = perf_counter()
+        try:
+            remove(path)
+        except OSError as e:
+            error = e
+        finally:
+            now = perf_counter()
+            with self._cond:
+                self._in_flight -= 1
+                self._done.append((path, error))
+                if self.controller is not None:
+                    self.controller.record(now - start, error is None, now)
+                self._cond.notify_all()
@@ -0,0 +1,525 @@
+"""Filesystem backends used by empty_directory."""
+
+import errno
+import os
+import posixpath
+import random
+import stat
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, ContextManager, Iterator
+
+# Operation names used for latency and failure injection
+OP_SCANDIR = "scandir"
+OP_STAT = "stat"
+OP_REMOVE = "remove"
+OP_RMDIR = "rmdir"
+OP_OPEN = "open"
+OP_TRUNCATE = "truncate"
+OPERATIONS = (OP_SCANDIR, OP_STAT, OP_REMOVE, OP_RMDIR, OP_OPEN, OP_TRUNCATE)
+
+# Maximum number of symlinks resolved in a single lookup (matches Linux)
+_MAX_SYMLINKS = 40
+
+
+class FilesystemBackend(ABC):
+    """
+    Filesystem operations needed to empty a directory.
+
+    Directory entries returned by scandir() must provide the subset of the
+    os.DirEntry interface used here: ``name``, ``path``, ``is_file()``,
+    ``is_dir()``, ``is_symlink()`` and ``stat()``. Errors are reported by
+    raising OSError subclasses exactly as the os module does.
+    """
+
+    @abstractmethod
+    def scandir(self, path: str) -> ContextManager[Iterator[Any]]:
+        """List a directory, returning a context-managed entry iterator."""
+
+    @abstractmethod
+    def stat(self, path: str, follow_symlinks: bool = True) -> os.stat_result:
+        """Return stat information for a path."""
+
+    @abstractmethod
+    def remove(self, path: str) -> None:
+        """Remove a file or symlink."""
+
+    @abstractmethod
+    def rmdir(self, path: str) -> None:
+        """Remove an empty directory."""
+
+    @abstractmethod
+    def isdir(self, path: str) -> bool:
+        """Return True if path is a directory (following symlinks)."""
+
+    @abstractmethod
+    def statvfs(self, path: str) -> os.statvfs_result:
+        """Return statistics for the filesystem containing path."""
+
+    @abstractmethod
+    def open(self, path: str) -> int:
+        """Open a file for writing without following symlinks or blocking."""
+
+    @abstractmethod
+    def fstat(self, fd: int) -> os.stat_result:
+        """Return stat information for an open file."""
+
+    @abstractmethod
+    def ftruncate(self, fd: int, length: int) -> None:
+        """Shrink an open file to length bytes."""
+
+    @abstractmethod
+    def close(self, fd: int) -> None:
+        """Close a file opened with open()."""
+
+
+class OSBackend(FilesystemBackend):
+    """Backend that performs real filesystem operations via the os module."""
+
+    def scandir(self, path: str) -> ContextManager[Iterator[Any]]:
+        return os.scandir(path)
+
+    def stat(self, path: str, follow_symlinks: bool = True) -> os.stat_result:
+        return os.stat(path, follow_symlinks=follow_symlinks)
+
+    def remove(self, path: str) -> None:
+        os.remove(path)
+
+    def rmdir(self, path: str) -> None:
+        os.rmdir(path)
+
+    def isdir(self, path: str) -> bool:
+        return os.path.isdir(path)
+
+    def statvfs(self, path: str) -> os.statvfs_result:
+        return os.statvfs(path)
+
+    def open(self, path: str) -> int:
+        flags = (
+            os.O_WRONLY | getattr(os, "O_NOFOLLOW", 0) | getattr(os, "O_NONBLOCK", 0)
+        )
+        return os.open(path, flags)
+
+    def fstat(self, fd: int) -> os.stat_result:
+        return os.fstat(fd)
+
+    def ftruncate(self, fd: int, length: int) -> None:
+        os.ftruncate(fd, length)
+
+    def close(self, fd: int) -> None:
+        os.close(fd)
+
+
+# Backend used when none is given
+DEFAULT_BACKEND = OSBackend()
+
+
+class _Node:
+    """A file, directory or symlink in a SimulatedBackend."""
+
+    __slots__ = (
+        "mode",
+        "ino",
+        "dev",
+        "size",
+        "mtime",
+        "children",
+        "target",
+        "nlink",
+        "opened",
+    )
+
+    def __init__(
+        self, mode: int, ino: int, dev: int, size: int = 0, mtime: float = 0.0
+    ):
+        self.mode = mode
+        self.ino = ino
+        self.dev = dev
+        self.size = size
+        self.mtime = mtime
+        self.children: dict[str, "_Node"] | None = {} if stat.S_ISDIR(mode) else None
+        self.target: str | None = None
+        self.nlink = 1
+        # Number of open descriptors; an unlinked file keeps its space until 0
+        self.opened = 0
+
+    def stat_result(self) -> os.stat_result:
+        return os.stat_result(
+            (
+                self.mode,
+                self.ino,
+                self.dev,
+                self.nlink,
+                0,
+                0,
+                self.size,
+                self.mtime,
+                self.mtime,
+                self.mtime,
+            )
+        )
+
+
+class SimulatedEntry:
+    """Directory entry returned by SimulatedBackend.scandir()."""
+
+    __slots__ = ("name", "path", "_backend", "_node")
+
+    def __init__(self, backend: "SimulatedBackend", path: str, name: str, node):
+        self._backend = backend
+        self._node = node
+        self.path = path
+        self.name = name
+
+    def is_symlink(self) -> bool:
+        return stat.S_ISLNK(self._node.mode)
+
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        return stat.S_ISREG(self._mode(follow_symlinks))
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        return stat.S_ISDIR(self._mode(follow_symlinks))
+
+    def inode(self) -> int:
+        return self._node.ino
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        if follow_symlinks and self.is_symlink():
+            return self._backend.stat(self.path)
+        return self._node.stat_result()
+
+    def _mode(self, follow_symlinks: bool) -> int:
+        # Like os.DirEntry, type checks on symlinks that are followed cost a
+        # stat; dangling links are neither files nor directories
+        if follow_symlinks and self.is_symlink():
+            try:
+                return self._backend.stat(self.path).st_mode
+            except OSError:
+                return 0
+        return self._node.mode
+
+
+class _SimulatedScandir:
+    """Context-managed iterator over a snapshot of a simulated directory."""
+
+    def __init__(self, entries: list[SimulatedEntry]):
+        self._it = iter(entries)
+
+    def __enter__(self) -> "_SimulatedScandir":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __iter__(self) -> "_SimulatedScandir":
+        return self
+
+    def __next__(self) -> SimulatedEntry:
+        return next(self._it)
+
+    def close(self) -> None:
+        self._it = iter(())
+
+
+class SimulatedBackend(FilesystemBackend):
+    """
+    In-memory filesystem with injectable per-operation latency and failures.
+
+    Intended for tests and for benchmarking traversal, ordering and
+    concurrency strategies against slow storage without the storage: a
+    backend built with ``latency={"remove": 0.005}`` behaves like a NAS with
+    a 5 ms unlink round trip. Latency is applied outside the internal lock,
+    so concurrent callers overlap their waits as they would on real storage.
+    Paths are absolute POSIX paths.
+    """
+
+    def __init__(
+        self,
+        latency: float | dict[str, float] = 0.0,
+        failure_rate: float | dict[str, float] = 0.0,
+        failure_errno: int = errno.EIO,
+        seed: int | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+        capacity: int = 1 << 40,
+    ):
+        """
+        Args:
+            latency: Seconds added to every operation, or a mapping of
+                operation name (see OPERATIONS) to seconds
+            failure_rate: Probability (0-1) that an operation fails, or a
+                mapping of operation name to probability
+            failure_errno: errno of injected failures
+            seed: Seed for the failure random number generator
+            sleep: Sleep function used to inject latency
+            capacity: Size of the simulated filesystem in bytes; free space
+                reported by statvfs() is the capacity less all file sizes
+        """
+        self._latency = _per_operation(latency)
+        self._failure_rate = _per_operation(failure_rate)
+        self._failure_errno = failure_errno
+        self._random = random.Random(seed)
+        self._sleep = sleep
+        self._capacity = capacity
+        self._used = 0
+        self._lock = threading.Lock()
+        self._next_ino = 1
+        self._root = self._new_node(stat.S_IFDIR | 0o755, dev=1)
+        self.counts: dict[str, int] = dict.fromkeys(OPERATIONS, 0)
+        self._fds: dict[int, _Node] = {}
+        self._next_fd = 3
+
+    # Tree construction
+
+    def mkdir(
+        self,
+        path: str,
+        parents: bool = True,
+        dev: int | None = None,
+        mtime: float = 0.0,
+    ):
+        """
+        Create a directory.
+
+        Args:
+            path: Absolute path of the directory
+            parents: Create missing parent directories
+            dev: Device number, to simulate a mount point (defaults to the
+                parent's device)
+            mtime: Modification time
+        """
+        with self._lock:
+            self._mkdir(path, parents, dev).mtime = mtime
+
+    def add_file(self, path: str, size: int = 0, mtime: float = 0.0) -> None:
+        """
+        Create a file, creating parent directories as needed.
+
+        Args:
+            path: Absolute path of the file
+            size: Size in bytes
+            mtime: Modification time
+        """
+        with self._lock:
+            parent, name = self._parent(path, create=True)
+            node = self._new_node(stat.S_IFREG | 0o644, parent.dev, size, mtime)
+            existing = parent.children.get(name)  # type: ignore[union-attr]
+            if existing is not None:
+                self._used -= existing.size
+            parent.children[name] = node  # type: ignore[index]
+            self._used += size
+
+    def symlink(self, path: str, target: str) -> None:
+        """
+        Create a symlink, creating parent directories as needed.
+
+        Args:
+            path: Absolute path of the link
+            target: Absolute path the link points to
+        """
+        with self._lock:
+            parent, name = self._parent(path, create=True)
+            node = self._new_node(stat.S_IFLNK | 0o777, parent.dev)
+            node.target = target
+            parent.children[name] = node  # type: ignore[index]
+
+    def exists(self, path: str) -> bool:
+        """Return True if path exists (without following a final symlink)."""
+        with self._lock:
+            try:
+                self._lookup(path, follow_last=False)
+            except OSError:
+                return False
+            return True
+
+    def paths(self) -> list[str]:
+        """Return all paths in the filesystem, sorted."""
+        result: list[str] = []
+        pending = [("/", self._root)]
+        with self._lock:
+            while pending:
+                path, node = pending.pop()
+                for name, child in (node.children or {}).items():
+                    child_path = posixpath.join(path, name)
+                    result.append(child_path)
+                    if child.children is not None:
+                        pending.append((child_path, child))
+        return sorted(result)
+
+    # FilesystemBackend
+
+    def scandir(self, path: str) -> _SimulatedScandir:
+        self._operation(OP_SCANDIR, path)
+        with self._lock:
+            node = self._lookup(path)
+            if node.children is None:
+                raise _error(errno.ENOTDIR, path)
+            entries = [
+                SimulatedEntry(self, posixpath.join(path, name), name, child)
+                for name, child in node.children.items()
+            ]
+        return _SimulatedScandir(entries)
+
+    def stat(self, path: str, follow_symlinks: bool = True) -> os.stat_result:
+        self._operation(OP_STAT, path)
+        with self._lock:
+            return self._lookup(path, follow_last=follow_symlinks).stat_result()
+
+    def remove(self, path: str) -> None:
+        self._operation(OP_REMOVE, path)
+        with self._lock:
+            parent, name = self._parent(path)
+            node = parent.children.get(name)  # type: ignore[union-attr]
+            if node is None:
+                raise _error(errno.ENOENT, path)
+            if node.children is not None:
+                raise _error(errno.EISDIR, path)
+            del parent.children[name]  # type: ignore[union-attr]
+            node.nlink = 0
+            if not node.opened:
+                self._used -= node.size
+
+    def rmdir(self, path: str) -> None:
+        self._operation(OP_RMDIR, path)
+        with self._lock:
+            parent, name = self._parent(path)
+            node = parent.children.get(name)  # type: ignore[union-attr]
+            if node is None:
+                raise _error(errno.ENOENT, path)
+            if node.children is None:
+                raise _error(errno.ENOTDIR, path)
+            if node.children:
+                raise _error(errno.ENOTEMPTY, path)
+            del parent.children[name]  # type: ignore[union-attr]
+
+    def isdir(self, path: str) -> bool:
+        try:
+            return stat.S_ISDIR(self.stat(path).st_mode)
+        except OSError:
+            return False
+
+    def statvfs(self, path: str) -> os.statvfs_result:
+        with self._lock:
+            self._lookup(path)
+            free = max(self._capacity - self._used, 0)
+        # One-byte blocks keep the arithmetic exact
+        return os.statvfs_result((1, 1, self._capacity, free, free, 0, 0, 0, 0, 255))
+
+    def open(self, path: str) -> int:
+        self._operation(OP_OPEN, path)
+        with self._lock:
+            node = self._lookup(path, follow_last=False)
+            if node.children is not None:
+                raise _error(errno.EISDIR, path)
+            if node.target is not None:
+                raise _error(errno.ELOOP, path)
+            fd = self._next_fd
+            self._next_fd += 1
+            self._fds[fd] = node
+            node.opened += 1
+            return fd
+
+    def fstat(self, fd: int) -> os.stat_result:
+        with self._lock:
+            return self._open_node(fd).stat_result()
+
+    def ftruncate(self, fd: int, length: int) -> None:
+        self._operation(OP_TRUNCATE, str(fd))
+        with self._lock:
+            node = self._open_node(fd)
+            self._used += length - node.size
+            node.size = length
+
+    def close(self, fd: int) -> None:
+        with self._lock:
+            node = self._open_node(fd)
+            del self._fds[fd]
+            node.opened -= 1
+            if not node.opened and not node.nlink:
+                self._used -= node.size
+
+    # Internals
+
+    def _operation(self, op: str, path: str) -> None:
+        """Count an operation and apply injected latency and failures."""
+        delay = self._latency.get(op, 0.0)
+        if delay:
+            self._sleep(delay)
+        rate = self._failure_rate.get(op, 0.0)
+        with self._lock:
+            self.counts[op] += 1
+            fail = rate and self._random.random() < rate
+        if fail:
+            raise _error(self._failure_errno, path)
+
+    def _open_node(self, fd: int) -> _Node:
+        node = self._fds.get(fd)
+        if node is None:
+            raise _error(errno.EBADF, str(fd))
+        return node
+
+    def _new_node(
+        self, mode: int, dev: int, size: int = 0, mtime: float = 0.0
+    ) -> _Node:
+        node = _Node(mode, self._next_ino, dev, size, mtime)
+        self._next_ino += 1
+        return node
+
+    def _mkdir(self, path: str, parents: bool, dev: int | None) -> _Node:
+        parent, name = self._parent(path, create=parents)
+        existing = parent.children.get(name)  # type: ignore[union-attr]
+        if existing is not None:
+            if existing.children is None:
+                raise _error(errno.EEXIST, path)
+            return existing
+        node = self._new_node(stat.S_IFDIR | 0o755, parent.dev if dev is None else dev)
+        parent.children[name] = node  # type: ignore[index]
+        return node
+
+    def _parent(self, path: str, create: bool = False) -> tuple[_Node, str]:
+        """Return the directory node containing path and the final name."""
+        head, name = posixpath.split(posixpath.normpath(path))
+        if not name:
+            raise _error(errno.EBUSY, path)
+        if create:
+            parent = self._mkdir(head, True, None) if head != "/" else self._root
+        else:
+            parent = self._lookup(head)
+        if parent.children is None:
+            raise _error(errno.ENOTDIR, path)
+        return parent, name
+
+    def _lookup(self, path: str, follow_last: bool = True, depth: int = 0) -> _Node:
+        """Resolve an absolute path to a node, following symlinks."""
+        if not posixpath.isabs(path):
+            raise _error(errno.ENOENT, path)
+        node = self._root
+        parts = [p for p in posixpath.normpath(path).split("/") if p]
+        for i, part in enumerate(parts):
+            if node.children is None:
+                raise _error(errno.ENOTDIR, path)
+            child = node.children.get(part)
+            if child is None:
+                raise _error(errno.ENOENT, path)
+            is_last = i == len(parts) - 1
+            if child.target is not None and (follow_last or not is_last):
+                if depth >= _MAX_SYMLINKS:
+                    raise _error(errno.ELOOP, path)
+                child = self._lookup(child.target, True, depth + 1)
+            node = child
+        return node
+
+
+def _per_operation(value: float | dict[str, float]) -> dict[str, float]:
+    """Expand a scalar setting to every operation."""
+    if isinstance(value, dict):
+        unknown = set(value) - set(OPERATIONS)
+        if unknown:
+            raise ValueError(f"Unknown operations: {sorted(unknown)}")
+        return dict(value)
+    return dict.fromkeys(OPERATIONS, value)
+
+
+def _error(code: int, path: str) -> OSError:
+    """Build the OSError subclass the os module would raise."""
+    return OSError(code, os.strerror(code), path)
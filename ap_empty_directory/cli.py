@@ -1,16 +1,64 @@
 """Command-line interface for ap-empty-directory."""
 
 import argparse
+import functools
+import json
 import sys
 
 from ap_common.logging_config import setup_logging
-from ap_empty_directory.empty import empty_directory
+from ap_empty_directory.autotune import parse_workers
+from ap_empty_directory.empty import (
+    SYMLINK_POLICIES,
+    SYMLINKS_UNLINK,
+    RunStats,
+    empty_directory,
+)
+from ap_empty_directory.freespace import FreeSpaceTarget, parse_free_target
+from ap_empty_directory.output import (
+    OUTPUT_FORMATS,
+    OUTPUT_JSONL,
+    OUTPUT_TEXT,
+    JsonlWriter,
+)
+from ap_empty_directory.profiling import Timings, run_profiled
+from ap_empty_directory.report import (
+    REPORT_FORMATS,
+    REPORT_JSON,
+    REPORT_TEXT,
+    UsageReport,
+)
+from ap_empty_directory.throttle import IONICE_CLASSES, lower_priority
+from ap_empty_directory.truncate import DEFAULT_CHUNK_SIZE, parse_size_option
 
 # Exit codes
 EXIT_SUCCESS = 0
 EXIT_ERROR = 1
 
 
+def _workers_arg(value: str) -> int | str:
+    """Parse the --workers argument."""
+    try:
+        return parse_workers(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _free_until_arg(value: str) -> FreeSpaceTarget:
+    """Parse the --free-until argument."""
+    try:
+        return parse_free_target(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _size_arg(value: str) -> int:
+    """Parse a positive size argument such as 4G."""
+    try:
+        return parse_size_option(value, "Size")
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
 def main():
     """Main entry point for the CLI."""
     parser = argparse.ArgumentParser(
@@ -52,25 +100,249 @@ def main():
         default=None,
         help="regex pattern to exclude files from deletion (matched against filename)",
     )
+    parser.add_argument(
+        "--symlinks",
+        choices=SYMLINK_POLICIES,
+        default=SYMLINKS_UNLINK,
+        help="how to treat symlinks: skip them, unlink the link itself "
+        "(default), or follow links to directories when recursive",
+    )
+    parser.add_argument(
+        "--one-file-system",
+        action="store_true",
+        help="do not descend into directories on other filesystems",
+    )
+    parser.add_argument(
+        "--keep-dirs",
+        action="store_true",
+        help="keep the directory structure after a recursive delete",
+    )
+    parser.add_argument(
+        "--prune-after-days",
+        type=float,
+        default=None,
+        metavar="DAYS",
+        help="with --keep-dirs, still remove empty directories not modified "
+        "in the last DAYS days",
+    )
+    parser.add_argument(
+        "--free-until",
+        type=_free_until_arg,
+        default=None,
+        metavar="SIZE|PERCENT",
+        help="delete oldest files first, only until SIZE (e.g. 200G) or "
+        "PERCENT (e.g. 15%%) of the filesystem is free",
+    )
+    parser.add_argument(
+        "--skip-open",
+        action="store_true",
+        help="skip files another process on this machine has open for writing",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=0,
+        metavar="N",
+        help="retry deletions that failed with a transient error (busy, stale "
+        "handle, timeout) up to N times at the end of the run",
+    )
+    parser.add_argument(
+        "--retry-delay",
+        type=float,
+        default=0.5,
+        metavar="SECONDS",
+        help="wait before the first retry, doubled for each further retry "
+        "(default: 0.5)",
+    )
+    parser.add_argument(
+        "--truncate-above",
+        type=_size_arg,
+        default=None,
+        metavar="SIZE",
+        help="unlink files of at least SIZE (e.g. 4G) in the background and "
+        "release their space in chunks, so huge files do not stall the run",
+    )
+    parser.add_argument(
+        "--truncate-chunk",
+        type=_size_arg,
+        default=DEFAULT_CHUNK_SIZE,
+        metavar="SIZE",
+        help="bytes released per truncate call with --truncate-above "
+        "(default: 256M)",
+    )
+    parser.add_argument(
+        "--coordinate",
+        action="store_true",
+        help="cooperate with other runs on the same root (on this or other "
+        "hosts) by claiming top-level subtrees through lease files; requires "
+        "--recursive",
+    )
+    parser.add_argument(
+        "--lease-ttl",
+        type=float,
+        default=60.0,
+        metavar="SECONDS",
+        help="with --coordinate, take over leases not renewed for SECONDS "
+        "(default: 60)",
+    )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=_workers_arg,
+        default=1,
+        metavar="N|auto",
+        help="number of concurrent unlinks, or 'auto' to tune it while running",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        choices=OUTPUT_FORMATS,
+        default=OUTPUT_TEXT,
+        help="output format; jsonl streams one JSON object per file to stdout",
+    )
+    parser.add_argument(
+        "--report",
+        nargs="?",
+        const=REPORT_TEXT,
+        choices=REPORT_FORMATS,
+        default=None,
+        help="print file counts and bytes per subdirectory and extension, "
+        "collected during the same traversal (default format: text)",
+    )
+    parser.add_argument(
+        "--report-depth",
+        type=int,
+        default=1,
+        metavar="N",
+        help="group the report by the first N subdirectory levels (default: 1)",
+    )
+    parser.add_argument(
+        "--report-only",
+        action="store_true",
+        help="only print the report; do not delete anything",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="run under cProfile and write the stats to PATH",
+    )
+    parser.add_argument(
+        "--timing",
+        action="store_true",
+        help="report cumulative time spent listing, deleting and matching",
+    )
+    parser.add_argument(
+        "--max-unlinks-per-sec",
+        type=float,
+        default=None,
+        metavar="N",
+        help="limit the number of files deleted per second",
+    )
+    parser.add_argument(
+        "--max-bytes-per-sec",
+        type=float,
+        default=None,
+        metavar="N",
+        help="limit the number of bytes freed per second",
+    )
+    parser.add_argument(
+        "--nice",
+        type=int,
+        default=None,
+        metavar="N",
+        help="increase process niceness by N before deleting",
+    )
+    parser.add_argument(
+        "--ionice",
+        choices=sorted(IONICE_CLASSES),
+        default=None,
+        help="set the I/O scheduling class before deleting",
+    )
 
     args = parser.parse_args()
 
-    # Setup logging
-    setup_logging(name="ap_empty_directory", debug=args.debug, quiet=args.quiet)
+    # Setup logging; jsonl output replaces progress logging entirely
+    jsonl = args.output == OUTPUT_JSONL
+    setup_logging(
+        name="ap_empty_directory",
+        debug=args.debug,
+        quiet=args.quiet or jsonl,
+    )
+
+    writer = JsonlWriter() if jsonl else None
+    stats = RunStats()
+    timings = Timings() if args.timing else None
+    report_format = args.report
+    if args.report_only and report_format is None:
+        report_format = REPORT_TEXT
+    report = None
+    if report_format is not None:
+        try:
+            report = UsageReport(args.report_depth)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(EXIT_ERROR)
 
+    error = None
     try:
-        empty_directory(
+        lower_priority(nice=args.nice, ionice=args.ionice)
+        run = empty_directory
+        if args.profile:
+            run = functools.partial(run_profiled, args.profile, empty_directory)
+        run(
             directory=args.directory,
             recursive=args.recursive,
             dryrun=args.dryrun,
             exclude_regex=args.exclude_regex,
+            max_unlinks_per_sec=args.max_unlinks_per_sec,
+            max_bytes_per_sec=args.max_bytes_per_sec,
+            on_entry=writer,
+            stats=stats,
+            symlinks=args.symlinks,
+            one_file_system=args.one_file_system,
+            timings=timings,
+            workers=args.workers,
+            keep_dirs=args.keep_dirs,
+            prune_after_days=args.prune_after_days,
+            free_until=args.free_until,
+            skip_open=args.skip_open,
+            retries=args.retries,
+            retry_delay=args.retry_delay,
+            truncate_above=args.truncate_above,
+            truncate_chunk=args.truncate_chunk,
+            coordinate=args.coordinate,
+            lease_ttl=args.lease_ttl,
+            report=report,
+            report_only=args.report_only,
         )
     except ValueError as e:
+        error = str(e)
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(EXIT_ERROR)
+    except KeyboardInterrupt:
+        error = "interrupted"
+        print("Interrupted", file=sys.stderr)
+        sys.exit(EXIT_ERROR)
     except Exception as e:
+        error = str(e)
         print(f"Unexpected error: {e}", file=sys.stderr)
         sys.exit(EXIT_ERROR)
+    finally:
+        if writer is not None:
+            # Files deleted before a failure are still reported, followed by
+            # a summary that says the run did not complete; the report
+            # travels in the stream as its own event
+            writer.close(stats, report if error is None else None, error)
+
+    if writer is None and report is not None:
+        if report_format == REPORT_JSON:
+            print(json.dumps(report.as_dict(), separators=(",", ":")))
+        else:
+            print(report.format())
+    if timings is not None:
+        print(timings.format(), file=sys.stderr)
 
     sys.exit(EXIT_SUCCESS)
 
@@ -0,0 +1,458 @@
+"""Lease files that let several processes empty one shared tree together."""
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from typing import Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Directory in the shared root holding lease files and completion markers
+COORDINATION_DIR = ".ap-empty-directory"
+
+# File name prefixes inside COORDINATION_DIR
+_LEASE_PREFIX = "lease."
+_DONE_PREFIX = "done."
+_STALE_PREFIX = "stale."
+# Held by every process for as long as it takes part in the run
+_MEMBER_PREFIX = "member."
+# Held by the process that prunes empty directories at the end of the run
+_PRUNE_LOCK = "prune"
+# Held while a process checks for and clears the state of an interrupted run
+_RESET_LOCK = "reset"
+# Seconds to wait before trying the reset lock again
+_RESET_WAIT = 0.1
+
+
+class LeaseLostError(Exception):
+    """Raised to stop work on a subtree whose lease another process took over."""
+
+
+def default_owner() -> str:
+    """
+    Return an identifier for this process that is unique across hosts.
+
+    Returns:
+        "<hostname>-<pid>-<random suffix>"
+    """
+    return f"{socket.gethostname()}-{os.getpid()}-{random.getrandbits(32):08x}"
+
+
+class LeaseDirectory:
+    """
+    Claims on the top-level subtrees of a shared root, held as lease files.
+
+    A claim is the exclusive creation (O_CREAT | O_EXCL, which is atomic on
+    local filesystems and NFSv3 and later) of ``lease.<name>`` in
+    COORDINATION_DIR under the root. While a process holds leases, a
+    background thread renews them by updating their modification time every
+    third of ``ttl``; a lease that has not been renewed for ``ttl`` seconds
+    belongs to a process that died or hung and is taken over by the next
+    process that wants it. Expiry compares modification times with the
+    local clock, so hosts are expected to keep their clocks in sync (NTP).
+
+    A finished subtree gets a ``done.<name>`` marker so it is not claimed
+    again. Processes keep claiming until every subtree is done, waiting
+    while the remaining ones are leased by others so expired leases are
+    picked up; the first process to take the prune lock afterwards does the
+    final cleanup (see begin_prune() and finish()). Use as a context
+    manager: entering creates the coordination directory and starts the
+    renewal thread, leaving stops it and releases unfinished leases.
+
+    Each process also holds a ``member.<owner>`` file, renewed with its
+    leases, from entering to leaving. Completion markers only count while
+    the run that wrote them is in progress: a process that enters when no
+    member file, lease or prune lock has been renewed within ``ttl`` (every
+    earlier process died before the final cleanup) discards them and starts
+    a new run. The check and the creation of the member file happen under
+    the ``reset`` lock, so processes entering together cannot clear each
+    other's files.
+
+    A process that stalls for longer than ``ttl`` can find its lease taken
+    over. The renewal thread checks the owner written in each lease before
+    renewing it; a lease held by someone else is dropped, lost() turns True
+    for its subtree, and the subtree is neither marked done nor released by
+    this process.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        ttl: float = 60.0,
+        poll: float | None = None,
+        owner: str | None = None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Args:
+            root: Shared root directory
+            ttl: Seconds after the last renewal at which a lease expires
+            poll: Seconds to wait before looking for work again while all
+                remaining subtrees are leased by others (defaults to a
+                quarter of ttl, at most 5 seconds)
+            owner: Identifier written to lease files (see default_owner())
+            clock: Wall-clock time function, comparable to file mtimes
+            sleep: Sleep function
+        """
+        if ttl <= 0:
+            raise ValueError(f"Lease TTL must be positive: {ttl}")
+        self.root = root
+        self.path = os.path.join(root, COORDINATION_DIR)
+        self.ttl = ttl
+        self.poll = poll if poll is not None else min(ttl / 4, 5.0)
+        self.owner = owner if owner is not None else default_owner()
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._held: set[str] = set()
+        self._lost: set[str] = set()
+        self._pruning = False
+        self._stop = threading.Event()
+        self._renewer: threading.Thread | None = None
+
+    def __enter__(self) -> "LeaseDirectory":
+        os.makedirs(self.path, exist_ok=True)
+        reset_lock = os.path.join(self.path, _RESET_LOCK)
+        self._lock_reset(reset_lock)
+        try:
+            prune_lock = os.path.join(self.path, _PRUNE_LOCK)
+            if self._expired(prune_lock) or not self._active():
+                # Every process of a previous run died, or the one pruning it
+                # did; its completion markers must not make this run skip
+                # subtrees
+                if self._clear(keep_prune_lock=False):
+                    logger.warning("Cleared coordination state of an interrupted run")
+            _create(self._member_path(), self.owner)
+        finally:
+            if self._owns(reset_lock):
+                _unlink(reset_lock)
+        self._stop.clear()
+        self._renewer = threading.Thread(
+            target=self._renew_loop, name="ap-empty-directory-lease", daemon=True
+        )
+        self._renewer.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        if self._renewer is not None:
+            self._renewer.join()
+            self._renewer = None
+        with self._lock:
+            held = list(self._held)
+            self._held.clear()
+        for name in held:
+            _unlink(self._lease_path(name))
+        _unlink(self._member_path())
+
+    def claims(self, list_names: Callable[[], list[str]]) -> Iterator[str]:
+        """
+        Claim subtrees one at a time until every subtree is done.
+
+        The subtree names are listed again each round, so subtrees created
+        while the run is in progress are picked up. A yielded subtree is
+        marked done when the caller asks for the next one; if the caller
+        stops early (or raises), its lease is released instead.
+
+        Args:
+            list_names: Function returning the current subtree names
+
+        Yields:
+            Names of subtrees this process now holds the lease for
+        """
+        while not self._closed():
+            pending = [name for name in list_names() if not self._done(name)]
+            if not pending:
+                return
+            # Start at a random position so processes do not all contend for
+            # the same lease first
+            start = random.randrange(len(pending))
+            claimed = False
+            for name in pending[start:] + pending[:start]:
+                if not self._claim(name):
+                    continue
+                claimed = True
+                finished = False
+                try:
+                    yield name
+                    finished = True
+                finally:
+                    if not self._still_held(name):
+                        # Left to the process that took the lease over
+                        pass
+                    elif finished:
+                        self._complete(name)
+                    else:
+                        self._release(name)
+            if not claimed:
+                logger.debug(
+                    f"Waiting for {len(pending)} subtrees leased by other processes"
+                )
+                self._sleep(self.poll)
+
+    def lost(self, name: str) -> bool:
+        """
+        Check whether the lease on a claimed subtree was taken over.
+
+        Args:
+            name: Subtree name yielded by claims()
+
+        Returns:
+            True if another process now holds the lease, so work on the
+            subtree should stop
+        """
+        return name in self._lost
+
+    def begin_prune(self) -> bool:
+        """
+        Try to become the process that performs the final cleanup.
+
+        Returns:
+            True if this process took the prune lock
+        """
+        try:
+            _create(os.path.join(self.path, _PRUNE_LOCK), self.owner)
+        except (FileExistsError, FileNotFoundError):
+            return False
+        self._pruning = True
+        return True
+
+    def finish(self) -> None:
+        """Remove the coordination directory once pruning is done."""
+        self._clear(keep_prune_lock=True)
+        _unlink(os.path.join(self.path, _PRUNE_LOCK))
+        self._pruning = False
+        try:
+            os.rmdir(self.path)
+        except OSError as e:
+            # A late process created a file after the directory was cleared
+            logger.debug(f"Could not remove {self.path}: {e}")
+
+    # Internals
+
+    def _lease_path(self, name: str) -> str:
+        return os.path.join(self.path, _LEASE_PREFIX + name)
+
+    def _member_path(self) -> str:
+        return os.path.join(self.path, _MEMBER_PREFIX + self.owner)
+
+    def _active(self) -> bool:
+        """Return True if a member file, lease or prune lock is still renewed."""
+        try:
+            with os.scandir(self.path) as it:
+                names = [
+                    entry.name
+                    for entry in it
+                    if entry.name.startswith((_MEMBER_PREFIX, _LEASE_PREFIX))
+                    or entry.name == _PRUNE_LOCK
+                ]
+        except FileNotFoundError:
+            return False
+        now = self._clock()
+        for name in names:
+            try:
+                mtime = os.stat(os.path.join(self.path, name)).st_mtime
+            except FileNotFoundError:
+                continue
+            if now - mtime <= self.ttl:
+                return True
+        return False
+
+    def _lock_reset(self, reset_lock: str) -> None:
+        """Wait for the reset lock, taking it over if its holder died."""
+        while True:
+            try:
+                _create(reset_lock, self.owner)
+                return
+            except FileExistsError:
+                if not self._take_over(reset_lock):
+                    self._sleep(_RESET_WAIT)
+            except FileNotFoundError:
+                # Removed by the final cleanup of the previous run
+                os.makedirs(self.path, exist_ok=True)
+
+    def _owns(self, path: str) -> bool:
+        """Return True if a lock file exists and names this process as owner."""
+        try:
+            with open(path) as f:
+                return f.read() == self.owner
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            # Unreadable for now; keep treating it as ours
+            logger.warning(f"Failed to read {path}: {e}")
+            return True
+
+    def _still_held(self, name: str) -> bool:
+        """Check the owner of a held lease, dropping it if it was taken over."""
+        with self._lock:
+            if name not in self._held:
+                return name not in self._lost
+        if self._owns(self._lease_path(name)):
+            return True
+        with self._lock:
+            if name not in self._held:
+                # Released meanwhile by the thread that claimed it
+                return True
+            self._held.discard(name)
+            self._lost.add(name)
+        logger.warning(
+            f"Lease on subtree {name or os.curdir!r} was taken over by "
+            f"another process"
+        )
+        return False
+
+    def _done(self, name: str) -> bool:
+        return os.path.exists(os.path.join(self.path, _DONE_PREFIX + name))
+
+    def _closed(self) -> bool:
+        """Return True once another process has started the final cleanup."""
+        return not os.path.isdir(self.path) or os.path.exists(
+            os.path.join(self.path, _PRUNE_LOCK)
+        )
+
+    def _claim(self, name: str) -> bool:
+        """Create the lease for a subtree, taking over an expired one."""
+        if self._done(name):
+            return False
+        lease = self._lease_path(name)
+        try:
+            try:
+                _create(lease, self.owner)
+            except FileExistsError:
+                if not self._take_over(lease):
+                    return False
+                _create(lease, self.owner)
+        except (FileExistsError, FileNotFoundError):
+            # Lost the race, or the run was finished and cleaned up
+            return False
+        with self._lock:
+            self._held.add(name)
+            self._lost.discard(name)
+        if self._done(name):
+            # Finished by its previous holder between the check and the claim
+            self._release(name)
+            return False
+        logger.debug(f"Claimed subtree {name or os.curdir!r}")
+        return True
+
+    def _complete(self, name: str) -> None:
+        """Mark a subtree done, then drop its lease."""
+        try:
+            _create(os.path.join(self.path, _DONE_PREFIX + name), self.owner)
+        except FileExistsError:
+            pass
+        self._release(name)
+
+    def _release(self, name: str) -> None:
+        with self._lock:
+            self._held.discard(name)
+        _unlink(self._lease_path(name))
+
+    def _expired(self, path: str) -> bool:
+        """Return True if a lock file exists and was not renewed within ttl."""
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return False
+        return self._clock() - mtime > self.ttl
+
+    def _take_over(self, lease: str) -> bool:
+        """
+        Remove an expired lease so it can be created again.
+
+        The lease is first renamed to a name private to this process, so of
+        several processes trying at once only one removes it. If the renamed
+        file turns out to be live (renewed or re-created since it was
+        checked), it is put back.
+        """
+        try:
+            mtime = os.stat(lease).st_mtime
+        except FileNotFoundError:
+            return True
+        if self._clock() - mtime <= self.ttl:
+            return False
+        stale = os.path.join(self.path, _STALE_PREFIX + self.owner)
+        try:
+            os.rename(lease, stale)
+        except FileNotFoundError:
+            return True
+        try:
+            if not self._expired(stale):
+                try:
+                    os.link(stale, lease)
+                except FileExistsError:
+                    pass
+                return False
+            try:
+                with open(stale) as f:
+                    previous = f.read()
+            except OSError:
+                previous = "unknown"
+            logger.warning(
+                f"Taking over expired lease {os.path.basename(lease)} "
+                f"held by {previous}"
+            )
+            return True
+        finally:
+            _unlink(stale)
+
+    def _renew_loop(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            with self._lock:
+                held = list(self._held)
+            # Renewing a lease another process took over would keep it alive
+            # on behalf of that process
+            paths = [self._lease_path(name) for name in held if self._still_held(name)]
+            paths.append(self._member_path())
+            if self._pruning:
+                paths.append(os.path.join(self.path, _PRUNE_LOCK))
+            for path in paths:
+                try:
+                    os.utime(path)
+                except FileNotFoundError:
+                    # Removed by the final cleanup of the run
+                    logger.debug(f"Lease {path} no longer exists")
+                except OSError as e:
+                    logger.warning(f"Failed to renew lease {path}: {e}")
+
+    def _clear(self, keep_prune_lock: bool) -> int:
+        """
+        Remove coordination files (the directory itself is kept).
+
+        Returns:
+            Number of files removed
+        """
+        try:
+            with os.scandir(self.path) as it:
+                names = [entry.name for entry in it]
+        except FileNotFoundError:
+            return 0
+        if keep_prune_lock and _PRUNE_LOCK in names:
+            names.remove(_PRUNE_LOCK)
+        # Held by a process entering right now, which removes it itself
+        if _RESET_LOCK in names:
+            names.remove(_RESET_LOCK)
+        for name in names:
+            _unlink(os.path.join(self.path, name))
+        return len(names)
+
+
+def _create(path: str, content: str) -> None:
+    """Atomically create a file that must not exist yet."""
+    fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    try:
+        os.write(fd, content.encode())
+    finally:
+        os.close(fd)
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
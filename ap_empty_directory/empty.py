@@ -1,14 +1,76 @@
 """Core functionality for emptying directories."""
 
+import errno
 import logging
 import os
 import re
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, ContextManager, Iterator
 
-from ap_common.filesystem import delete_empty_directories
 from ap_common.utils import replace_env_vars
+from ap_empty_directory.autotune import (
+    WORKERS_AUTO,
+    AIMDController,
+    UnlinkPool,
+    parse_workers,
+)
+from ap_empty_directory.backend import DEFAULT_BACKEND, FilesystemBackend, OSBackend
+from ap_empty_directory.coordinate import (
+    COORDINATION_DIR,
+    LeaseDirectory,
+    LeaseLostError,
+)
+from ap_empty_directory.freespace import (
+    FreeSpaceTarget,
+    OldestFiles,
+    parse_free_target,
+)
+from ap_empty_directory.openfiles import OpenFiles, open_elsewhere, scan_open_files
+from ap_empty_directory.pathlist import PathList
+from ap_empty_directory.profiling import Timings
+from ap_empty_directory.report import UsageReport
+from ap_empty_directory.retry import RetryQueue
+from ap_empty_directory.throttle import TokenBucket
+from ap_empty_directory.truncate import (
+    DEFAULT_CHUNK_SIZE,
+    Truncator,
+    parse_size_option,
+)
 
 logger = logging.getLogger(__name__)
 
+# Events reported to on_entry callbacks
+EVENT_DELETED = "deleted"
+EVENT_PLANNED = "planned"
+EVENT_EXCLUDED = "excluded"
+EVENT_FAILED = "failed"
+EVENT_IN_USE = "in_use"
+
+# Symlink policies
+SYMLINKS_SKIP = "skip"
+SYMLINKS_UNLINK = "unlink"
+SYMLINKS_FOLLOW = "follow"
+SYMLINK_POLICIES = (SYMLINKS_SKIP, SYMLINKS_UNLINK, SYMLINKS_FOLLOW)
+
+# Callback invoked once per processed file: (event, path, error)
+EntryCallback = Callable[[str, str, OSError | None], None]
+
+
+@dataclass
+class RunStats:
+    """Counters collected while emptying a directory."""
+
+    deleted: int = 0
+    planned: int = 0
+    excluded: int = 0
+    failed: int = 0
+    # Files skipped because a process had them open for writing
+    in_use: int = 0
+    # Concurrent unlinks at the end of the run, and the highest reached
+    workers: int = 1
+    workers_peak: int = 1
+
 
 def resolve_path(path: str) -> str:
     """
@@ -26,11 +88,52 @@ def resolve_path(path: str) -> str:
     return path
 
 
+def _record_removal(
+    filepath: str,
+    error: OSError | None,
+    stats: RunStats,
+    on_entry: EntryCallback | None,
+    failed_files: PathList,
+    retry_queue: RetryQueue | None = None,
+) -> None:
+    """Count and report the outcome of one removal."""
+    if error is not None:
+        if retry_queue is not None and retry_queue.offer(filepath, error):
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Will retry {filepath}: {error}")
+            return
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning(f"Failed to delete {filepath}: {error}")
+        failed_files.append(filepath)
+        stats.failed += 1
+        if on_entry is not None:
+            on_entry(EVENT_FAILED, filepath, error)
+        return
+    stats.deleted += 1
+    if on_entry is not None:
+        on_entry(EVENT_DELETED, filepath, None)
+
+
 def _delete_files_in_dir(
     directory: str,
     dryrun: bool = False,
     exclude_pattern: re.Pattern | None = None,
-) -> list[str]:
+    unlink_bucket: TokenBucket | None = None,
+    bytes_bucket: TokenBucket | None = None,
+    on_entry: EntryCallback | None = None,
+    stats: RunStats | None = None,
+    subdirs: list[os.DirEntry] | None = None,
+    symlinks: str = SYMLINKS_UNLINK,
+    timings: Timings | None = None,
+    backend: FilesystemBackend | None = None,
+    pool: UnlinkPool | None = None,
+    selection: OldestFiles | None = None,
+    open_files: OpenFiles | None = None,
+    retry_queue: RetryQueue | None = None,
+    report: UsageReport | None = None,
+    report_only: bool = False,
+    truncator: Truncator | None = None,
+) -> PathList:
     """
     Delete all files in a single directory (non-recursive).
 
@@ -38,86 +141,1204 @@ def _delete_files_in_dir(
         directory: Path to the directory
         dryrun: If True, log what would be deleted without actually deleting
         exclude_pattern: Compiled regex pattern to exclude files from deletion
+        unlink_bucket: Token bucket limiting the number of unlinks per second
+        bytes_bucket: Token bucket limiting the number of bytes freed per second
+        on_entry: Callback invoked with (event, path, error) for each file
+        stats: Counters to update
+        subdirs: If provided, entries for subdirectories found while listing
+            are appended to it (including symlinks to directories when
+            symlinks is "follow")
+        symlinks: Symlink policy: "skip" leaves symlinks alone, "unlink"
+            removes the link itself, "follow" removes links to files and
+            reports links to directories as subdirectories
+        timings: If provided, time spent listing, deleting and matching is
+            recorded in it
+        backend: Filesystem backend (defaults to the real filesystem)
+        pool: If provided, removals are handed to this pool; results that
+            complete while listing are reported here, the caller must drain
+            the rest
+        selection: If provided, files that are not excluded are offered to
+            it instead of being deleted
+        open_files: If provided, files in this index are skipped and reported
+            as in use
+        retry_queue: If provided, removals that fail with a transient error
+            are queued in it instead of being reported as failed
+        report: If provided, regular files are counted in it
+        report_only: If True, files are only counted in the report; nothing
+            is deleted, planned or excluded
+        truncator: If provided, files of at least its threshold size are
+            handed to it for truncation and removal in the background; the
+            caller must drain it
 
     Returns:
-        List of files that failed to delete (empty if all succeeded)
+        Paths of files that failed to delete (empty if all succeeded)
     """
-    failed_files: list[str] = []
-    for entry in os.listdir(directory):
-        filepath = os.path.join(directory, entry)
-        if os.path.isfile(filepath):
+    if stats is None:
+        stats = RunStats()
+    if backend is None:
+        backend = DEFAULT_BACKEND
+    scandir: Callable[[str], ContextManager[Iterator[Any]]] = backend.scandir
+    remove = backend.remove
+    exclude_search: Callable[[str], Any] | None = (
+        exclude_pattern.search if exclude_pattern else None
+    )
+    if timings is not None:
+        scandir = timings.wrap_scandir(scandir)
+        remove = timings.wrap("remove", remove)
+        if exclude_search is not None:
+            exclude_search = timings.wrap("exclude", exclude_search)
+    # Resolve log levels once per directory rather than formatting a message
+    # per file that is then discarded
+    log_debug = logger.isEnabledFor(logging.DEBUG)
+    log_info = logger.isEnabledFor(logging.INFO)
+    failed_files = PathList()
+    # Report group of this directory, resolved once rather than per file
+    usage = report.bucket(directory) if report is not None else None
+    # File types come from the directory listing (d_type), so regular files
+    # and subdirectories cost no stat calls; files are deleted as they are
+    # listed rather than after the whole listing has been read
+    with scandir(directory) as it:
+        for entry in it:
+            if entry.is_file(follow_symlinks=False):
+                if usage is not None:
+                    # DirEntry caches the stat for the byte throttle
+                    try:
+                        size = entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        size = 0
+                    report.add(usage, entry.name, size)  # type: ignore[union-attr]
+            elif entry.is_dir(follow_symlinks=False):
+                if subdirs is not None:
+                    subdirs.append(entry)
+                continue
+            elif entry.is_symlink():
+                # Links are never followed for deletion; only "follow" needs
+                # a stat to find out whether the target is a directory
+                if symlinks == SYMLINKS_SKIP:
+                    continue
+                if symlinks == SYMLINKS_FOLLOW and entry.is_dir():
+                    if subdirs is not None:
+                        subdirs.append(entry)
+                    continue
+            else:
+                continue
+            if report_only:
+                continue
+            filepath = entry.path
             # Check if file matches exclude pattern
-            if exclude_pattern and exclude_pattern.search(entry):
-                logger.debug(f"Skipping excluded file: {filepath}")
+            if exclude_search is not None and exclude_search(entry.name):
+                if log_debug:
+                    logger.debug(f"Skipping excluded file: {filepath}")
+                stats.excluded += 1
+                if on_entry is not None:
+                    on_entry(EVENT_EXCLUDED, filepath, None)
+                continue
+            if open_files is not None and entry in open_files:
+                if log_info:
+                    logger.info(f"Skipping file open for writing: {filepath}")
+                stats.in_use += 1
+                if on_entry is not None:
+                    on_entry(EVENT_IN_USE, filepath, None)
+                continue
+            if selection is not None:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError as e:
+                    logger.warning(f"Failed to stat {filepath}: {e}")
+                    continue
+                selection.offer(filepath, st.st_size, st.st_mtime)
                 continue
             if dryrun:
-                logger.info(f"[DRYRUN] Deleting file: {filepath}")
-            else:
+                if log_info:
+                    logger.info(f"[DRYRUN] Deleting file: {filepath}")
+                stats.planned += 1
+                if on_entry is not None:
+                    on_entry(EVENT_PLANNED, filepath, None)
+                continue
+            if log_debug:
                 logger.debug(f"Deleting file: {filepath}")
-            if not dryrun:
+            if unlink_bucket is not None:
+                unlink_bucket.consume()
+            if truncator is not None:
                 try:
-                    os.remove(filepath)
-                except OSError as e:
-                    logger.warning(f"Failed to delete {filepath}: {e}")
-                    failed_files.append(filepath)
+                    size = entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    size = 0
+                if size >= truncator.threshold:
+                    truncator.submit(filepath, size)
+                    for path, error in truncator.completed():
+                        _record_removal(
+                            path, error, stats, on_entry, failed_files, retry_queue
+                        )
+                    continue
+            if bytes_bucket is not None:
+                try:
+                    bytes_bucket.consume(entry.stat(follow_symlinks=False).st_size)
+                except OSError:
+                    pass
+            if pool is not None:
+                pool.submit(remove, filepath)
+                for path, error in pool.completed():
+                    _record_removal(
+                        path, error, stats, on_entry, failed_files, retry_queue
+                    )
+                continue
+            error = None
+            try:
+                remove(filepath)
+            except OSError as e:
+                error = e
+            _record_removal(filepath, error, stats, on_entry, failed_files, retry_queue)
     return failed_files
 
 
+def _guard_lease(
+    leases: LeaseDirectory, name: str, on_entry: EntryCallback | None
+) -> EntryCallback:
+    """Wrap on_entry to stop work on a subtree once its lease is lost."""
+    stopped = False
+
+    def guarded(event: str, filepath: str, error: OSError | None) -> None:
+        nonlocal stopped
+        if on_entry is not None:
+            on_entry(event, filepath, error)
+        # Raised once; removals still in flight are reported while unwinding
+        if not stopped and leases.lost(name):
+            stopped = True
+            raise LeaseLostError(f"lease on {name or os.curdir!r} was taken over")
+
+    return guarded
+
+
+def _delete_empty_dirs(
+    directory: str,
+    dryrun: bool = False,
+    one_file_system: bool = False,
+    timings: Timings | None = None,
+    backend: FilesystemBackend | None = None,
+    candidates: list[str] | None = None,
+) -> None:
+    """
+    Remove empty subdirectories, deepest first. The root directory is kept.
+
+    Symlinks are never entered. With one_file_system, directories on a
+    different device than ``directory`` (mount points) are not entered either.
+
+    Args:
+        directory: Path to the root directory
+        dryrun: If True, log what would be removed without removing
+        one_file_system: If True, do not cross filesystem boundaries
+        timings: If provided, time spent in directory listing and rmdir is
+            recorded in it
+        backend: Filesystem backend (defaults to the real filesystem)
+        candidates: If provided, only these directories are considered and
+            no walk is performed
+    """
+    if backend is None:
+        backend = DEFAULT_BACKEND
+    scandir: Callable[[str], ContextManager[Iterator[Any]]] = backend.scandir
+    rmdir = backend.rmdir
+    if timings is not None:
+        scandir = timings.wrap_scandir(scandir)
+        rmdir = timings.wrap("rmdir", rmdir)
+
+    if candidates is not None:
+        # Parents before children, like the walk; processed in reverse below
+        order = sorted(candidates, key=lambda path: path.count(os.sep))
+        order.insert(0, directory)
+    else:
+        order = _list_dirs(directory, one_file_system, backend, scandir)
+
+    removed: set[str] = set()
+    for path in reversed(order[1:]):
+        if dryrun:
+            try:
+                with scandir(path) as it:
+                    children = [entry.path for entry in it]
+            except OSError:
+                continue
+            if all(child in removed for child in children):
+                logger.info(f"[DRYRUN] Deleting empty directory: {path}")
+                removed.add(path)
+            continue
+        try:
+            rmdir(path)
+        except OSError:
+            # Not empty (or not removable); leave it in place
+            continue
+        logger.debug(f"Deleted empty directory: {path}")
+
+
+def _list_dirs(
+    directory: str,
+    one_file_system: bool,
+    backend: FilesystemBackend,
+    scandir: Callable[[str], ContextManager[Iterator[Any]]] | None = None,
+) -> list[str]:
+    """
+    List a directory tree, parents before children, without following
+    symlinks (or, with one_file_system, crossing mount points).
+
+    Args:
+        directory: Path to the root directory
+        one_file_system: If True, do not cross filesystem boundaries
+        backend: Filesystem backend
+        scandir: Listing function to use instead of backend.scandir (for
+            example wrapped by Timings)
+
+    Returns:
+        Directory paths in pre-order, starting with ``directory``
+    """
+    if scandir is None:
+        scandir = backend.scandir
+    device = backend.stat(directory).st_dev if one_file_system else None
+    order: list[str] = []
+    pending = [directory]
+    while pending:
+        current = pending.pop()
+        order.append(current)
+        try:
+            with scandir(current) as it:
+                for entry in it:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+                    if (
+                        device is not None
+                        and entry.stat(follow_symlinks=False).st_dev != device
+                    ):
+                        continue
+                    pending.append(entry.path)
+        except OSError as e:
+            logger.warning(f"Failed to list {current}: {e}")
+    return order
+
+
+class DirectoryEmptier:
+    """
+    Reusable, pre-configured directory emptier.
+
+    Configuration is validated and the exclude pattern compiled once, and the
+    unlink worker pool (when workers is not 1), rate limiters and autotuned
+    concurrency persist across calls. Services that empty directories
+    repeatedly should keep one instance and call empty() or plan(); close()
+    stops the worker threads. Instances can be used as context managers.
+    """
+
+    def __init__(
+        self,
+        recursive: bool = False,
+        exclude_regex: str | None = None,
+        max_unlinks_per_sec: float | None = None,
+        max_bytes_per_sec: float | None = None,
+        symlinks: str = SYMLINKS_UNLINK,
+        one_file_system: bool = False,
+        timings: Timings | None = None,
+        backend: FilesystemBackend | None = None,
+        workers: int | str = 1,
+        keep_dirs: bool = False,
+        prune_after_days: float | None = None,
+        free_until: str | FreeSpaceTarget | None = None,
+        skip_open: bool = False,
+        retries: int = 0,
+        retry_delay: float = 0.5,
+        truncate_above: int | str | None = None,
+        truncate_chunk: int | str = DEFAULT_CHUNK_SIZE,
+        coordinate: bool = False,
+        lease_ttl: float = 60.0,
+    ):
+        """
+        Args:
+            recursive: If True, delete files in subdirectories as well
+            exclude_regex: Regex pattern to exclude files from deletion
+                (matched against filename)
+            max_unlinks_per_sec: Maximum number of files deleted per second
+                (None for unlimited)
+            max_bytes_per_sec: Maximum number of bytes freed per second
+                (None for unlimited)
+            symlinks: Symlink policy: "skip" leaves symlinks alone, "unlink"
+                removes the link itself without following it, "follow" also
+                descends into symlinked directories when recursive
+            one_file_system: If True, do not descend into directories on
+                other filesystems (mount points)
+            timings: If provided, cumulative time spent in directory listing,
+                unlink, rmdir and exclude matching is recorded in it
+            backend: Filesystem backend (defaults to the real filesystem)
+            workers: Number of concurrent unlinks, or "auto" to adapt the
+                number to observed latency, throughput and errors
+            keep_dirs: If True, leave the directory skeleton in place after
+                a recursive delete instead of removing empty directories
+            prune_after_days: With keep_dirs, still remove empty directories
+                that had not been modified for more than this many days
+                before the run
+            free_until: Free space target such as "200G" or "15%"; only the
+                oldest files are deleted, until the filesystem has that much
+                space available
+            skip_open: If True, skip files that a process on this machine
+                has open for writing (found by scanning /proc once per run)
+            retries: Number of times a removal that failed with a transient
+                error (busy, stale handle, timeout) is retried at the end of
+                the run
+            retry_delay: Seconds to wait before the first retry; the wait
+                doubles for each further retry
+            truncate_above: Size such as "4G" (or bytes); larger files are
+                unlinked by a background worker, which then releases their
+                space in chunks, so the traversal never waits on one huge
+                unlink
+            truncate_chunk: Bytes released per truncate call
+            coordinate: If True, empty() cooperates with other processes
+                (on this or other hosts) emptying the same root: top-level
+                subtrees are claimed through lease files in the root, and
+                the process that finishes last removes empty directories
+            lease_ttl: Seconds after which the lease of a process that
+                stopped renewing it can be taken over
+        """
+        if symlinks not in SYMLINK_POLICIES:
+            raise ValueError(f"Unknown symlink policy: {symlinks}")
+        if prune_after_days is not None and not keep_dirs:
+            raise ValueError("prune_after_days requires keep_dirs")
+        if retries < 0:
+            raise ValueError(f"Retries must not be negative: {retries}")
+        if retry_delay < 0:
+            raise ValueError(f"Retry delay must not be negative: {retry_delay}")
+        if coordinate:
+            if not recursive:
+                raise ValueError("coordinate requires recursive")
+            if free_until is not None:
+                raise ValueError("coordinate cannot be combined with free_until")
+            if prune_after_days is not None:
+                raise ValueError("coordinate cannot be combined with prune_after_days")
+            if backend is not None and not isinstance(backend, OSBackend):
+                raise ValueError("coordinate requires the real filesystem backend")
+            if lease_ttl <= 0:
+                raise ValueError(f"Lease TTL must be positive: {lease_ttl}")
+        self.recursive = recursive
+        self.exclude_regex = exclude_regex
+        self.max_unlinks_per_sec = max_unlinks_per_sec
+        self.max_bytes_per_sec = max_bytes_per_sec
+        self.symlinks = symlinks
+        self.one_file_system = one_file_system
+        self.timings = timings
+        self.backend = backend if backend is not None else DEFAULT_BACKEND
+        self.workers = parse_workers(workers)
+        self.keep_dirs = keep_dirs
+        self.prune_after_days = prune_after_days
+        self.free_until = None
+        if free_until is not None:
+            self.free_until = parse_free_target(free_until)
+        self.skip_open = skip_open
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.truncate_above = None
+        if truncate_above is not None:
+            self.truncate_above = parse_size_option(truncate_above, "truncate_above")
+        self.truncate_chunk = parse_size_option(truncate_chunk, "truncate_chunk")
+        self.coordinate = coordinate
+        self.lease_ttl = lease_ttl
+
+        # Compile the exclude regex pattern if provided
+        self._exclude_pattern = re.compile(exclude_regex) if exclude_regex else None
+
+        # Rate limiters are only created when limiting, so the unthrottled
+        # path costs a single None check per file
+        self._unlink_bucket = None
+        if max_unlinks_per_sec is not None:
+            self._unlink_bucket = TokenBucket(max_unlinks_per_sec)
+        self._bytes_bucket = None
+        if max_bytes_per_sec is not None:
+            self._bytes_bucket = TokenBucket(max_bytes_per_sec)
+
+        # Created on first use so dry runs and serial runs start no threads
+        self._pool: UnlinkPool | None = None
+        self._truncator: Truncator | None = None
+
+    def __enter__(self) -> "DirectoryEmptier":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop the worker pool and truncate worker, if they were started."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        if self._truncator is not None:
+            self._truncator.close()
+            self._truncator = None
+
+    def empty(
+        self,
+        directory: str,
+        dryrun: bool = False,
+        on_entry: EntryCallback | None = None,
+        stats: RunStats | None = None,
+        report: UsageReport | None = None,
+        report_only: bool = False,
+    ) -> PathList:
+        """
+        Empty a directory: delete files, then (when recursive) remove empty
+        subdirectories.
+
+        Args:
+            directory: Path to the directory to empty
+            dryrun: If True, log what would be deleted without actually deleting
+            on_entry: Callback invoked with (event, path, error) for each
+                deleted, planned, excluded or failed file
+            stats: Counters to update (a RunStats is created if not provided)
+            report: If provided, file counts and bytes per subdirectory and
+                extension are collected in it during the same traversal
+            report_only: If True, only collect the report; nothing is deleted
+
+        Returns:
+            Paths of files that failed to delete (empty if all succeeded)
+        """
+        # Dry runs change nothing, so there is nothing to coordinate
+        if self.coordinate and not dryrun:
+            if report is not None or report_only:
+                raise ValueError("coordinate cannot be combined with a report")
+            return self._empty_coordinated(directory, on_entry, stats)
+        # Modification times of subdirectories as they were before their files
+        # were deleted, for pruning stale directories in keep_dirs mode
+        prune_after_days = self.prune_after_days
+        dir_mtimes: dict[str, float] | None = None
+        if self.recursive and prune_after_days is not None and not report_only:
+            dir_mtimes = {}
+        failed_files = self._delete_files(
+            directory,
+            dryrun=dryrun,
+            on_entry=on_entry,
+            stats=stats,
+            dir_mtimes=dir_mtimes,
+            report=report,
+            report_only=report_only,
+        )
+
+        if not self.recursive or report_only or (self.keep_dirs and dir_mtimes is None):
+            return failed_files
+
+        candidates = None
+        if dir_mtimes is not None and prune_after_days is not None:
+            cutoff = time.time() - prune_after_days * 86400
+            candidates = [path for path, mtime in dir_mtimes.items() if mtime < cutoff]
+        try:
+            _delete_empty_dirs(
+                resolve_path(directory),
+                dryrun=dryrun,
+                one_file_system=self.one_file_system,
+                timings=self.timings,
+                backend=self.backend,
+                candidates=candidates,
+            )
+        except OSError as e:
+            logger.warning(f"Failed to clean up empty directories: {e}")
+
+        return failed_files
+
+    def plan(self, directory: str) -> PathList:
+        """
+        List the files empty() would delete, without deleting anything.
+
+        Args:
+            directory: Path to the directory
+
+        Returns:
+            Paths of files that would be deleted
+        """
+        planned = PathList()
+
+        def collect(event: str, path: str, error: OSError | None) -> None:
+            if event == EVENT_PLANNED:
+                planned.append(path)
+
+        self.delete_files(directory, dryrun=True, on_entry=collect)
+        return planned
+
+    def survey(self, directory: str, depth: int = 1) -> UsageReport:
+        """
+        Report file counts and bytes per subdirectory and extension, without
+        deleting anything.
+
+        Args:
+            directory: Path to the directory
+            depth: Number of path components below the directory to group by
+
+        Returns:
+            The collected report
+        """
+        report = UsageReport(depth)
+        self._delete_files(
+            directory,
+            dryrun=True,
+            on_entry=None,
+            stats=None,
+            dir_mtimes=None,
+            report=report,
+            report_only=True,
+        )
+        return report
+
+    def delete_files(
+        self,
+        directory: str,
+        dryrun: bool = False,
+        on_entry: EntryCallback | None = None,
+        stats: RunStats | None = None,
+        report: UsageReport | None = None,
+    ) -> PathList:
+        """
+        Delete files in a directory without removing any directories.
+
+        Args:
+            directory: Path to the directory to empty
+            dryrun: If True, log what would be deleted without actually deleting
+            on_entry: Callback invoked with (event, path, error) for each
+                deleted, planned, excluded or failed file
+            stats: Counters to update (a RunStats is created if not provided)
+            report: If provided, file counts and bytes per subdirectory and
+                extension are collected in it during the same traversal
+
+        Returns:
+            Paths of files that failed to delete (empty if all succeeded)
+        """
+        return self._delete_files(
+            directory,
+            dryrun=dryrun,
+            on_entry=on_entry,
+            stats=stats,
+            dir_mtimes=None,
+            report=report,
+        )
+
+    def _delete_files(
+        self,
+        directory: str,
+        *,
+        dryrun: bool,
+        on_entry: EntryCallback | None,
+        stats: RunStats | None,
+        dir_mtimes: dict[str, float] | None,
+        report: UsageReport | None = None,
+        report_only: bool = False,
+        recursive: bool | None = None,
+    ) -> PathList:
+        directory = resolve_path(directory)
+        if recursive is None:
+            recursive = self.recursive
+
+        if not self.backend.isdir(directory):
+            raise ValueError(f"Not a directory: {directory}")
+
+        logger.debug(
+            f"delete_files_in_directory({directory}, "
+            f"recursive={recursive}, "
+            f"dryrun={dryrun}, "
+            f"exclude_regex={self.exclude_regex!r}, "
+            f"max_unlinks_per_sec={self.max_unlinks_per_sec}, "
+            f"max_bytes_per_sec={self.max_bytes_per_sec}, "
+            f"symlinks={self.symlinks}, "
+            f"one_file_system={self.one_file_system}, "
+            f"workers={self.workers}, "
+            f"free_until={self.free_until}, "
+            f"skip_open={self.skip_open}, "
+            f"retries={self.retries}, "
+            f"truncate_above={self.truncate_above})"
+        )
+
+        if stats is None:
+            stats = RunStats()
+        failed_files = PathList()
+        if report is not None:
+            report.begin(directory)
+        if report_only:
+            self._survey(directory, stats, report)
+            return failed_files
+        # Built once per run; files opened after the scan are not detected
+        open_files = scan_open_files() if self.skip_open else None
+        retry_queue = None
+        if self.retries and not dryrun:
+            retry_queue = RetryQueue(self.retries, self.retry_delay)
+        pool = None if dryrun else self._get_pool()
+        truncator = None if dryrun else self._get_truncator()
+        try:
+            if self.free_until is not None:
+                self._free_space(
+                    directory,
+                    dryrun=dryrun,
+                    on_entry=on_entry,
+                    stats=stats,
+                    failed_files=failed_files,
+                    pool=pool,
+                    dir_mtimes=dir_mtimes,
+                    open_files=open_files,
+                    retry_queue=retry_queue,
+                    report=report,
+                    truncator=truncator,
+                )
+            elif recursive:
+                self._delete_tree(
+                    directory,
+                    dryrun=dryrun,
+                    on_entry=on_entry,
+                    stats=stats,
+                    failed_files=failed_files,
+                    pool=pool,
+                    dir_mtimes=dir_mtimes,
+                    open_files=open_files,
+                    retry_queue=retry_queue,
+                    report=report,
+                    truncator=truncator,
+                )
+            else:
+                failed_files.extend(
+                    self._delete_dir(
+                        directory,
+                        dryrun=dryrun,
+                        on_entry=on_entry,
+                        stats=stats,
+                        pool=pool,
+                        open_files=open_files,
+                        retry_queue=retry_queue,
+                        report=report,
+                        truncator=truncator,
+                    )
+                )
+            if retry_queue is not None:
+                self._retry(
+                    retry_queue,
+                    on_entry=on_entry,
+                    stats=stats,
+                    failed_files=failed_files,
+                    pool=pool,
+                    truncator=truncator,
+                )
+        finally:
+            if truncator is not None:
+                for path, error in truncator.drain():
+                    _record_removal(path, error, stats, on_entry, failed_files)
+            if pool is not None:
+                for path, error in pool.drain():
+                    _record_removal(path, error, stats, on_entry, failed_files)
+                self._report_workers(pool, stats)
+            if retry_queue is not None:
+                # Only left over if the run was interrupted
+                for path, error in retry_queue.exhausted():
+                    _record_removal(path, error, stats, on_entry, failed_files)
+        return failed_files
+
+    def _empty_coordinated(
+        self,
+        directory: str,
+        on_entry: EntryCallback | None,
+        stats: RunStats | None,
+    ) -> PathList:
+        """Empty the subtrees this process claims, pruning if it finishes last."""
+        directory = resolve_path(directory)
+        if not self.backend.isdir(directory):
+            raise ValueError(f"Not a directory: {directory}")
+        if stats is None:
+            stats = RunStats()
+        failed_files = PathList()
+        with LeaseDirectory(directory, self.lease_ttl) as leases:
+            for name in leases.claims(lambda: self._subtrees(directory)):
+                # The empty name stands for the files directly in the root
+                path = os.path.join(directory, name) if name else directory
+                try:
+                    failed_files.extend(
+                        self._delete_files(
+                            path,
+                            dryrun=False,
+                            on_entry=_guard_lease(leases, name, on_entry),
+                            stats=stats,
+                            dir_mtimes=None,
+                            recursive=bool(name),
+                        )
+                    )
+                except LeaseLostError as e:
+                    logger.warning(f"Stopped emptying {path}: {e}")
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Failed to empty {path}: {e}")
+            if not leases.begin_prune():
+                return failed_files
+            logger.info("All subtrees done, removing empty directories")
+            if not self.keep_dirs:
+                try:
+                    _delete_empty_dirs(
+                        directory,
+                        one_file_system=self.one_file_system,
+                        timings=self.timings,
+                        backend=self.backend,
+                    )
+                except OSError as e:
+                    logger.warning(f"Failed to clean up empty directories: {e}")
+            leases.finish()
+        return failed_files
+
+    def _subtrees(self, directory: str) -> list[str]:
+        """List the names of the units of work in a coordinated run."""
+        follow = self.symlinks == SYMLINKS_FOLLOW
+        device = self.backend.stat(directory).st_dev if self.one_file_system else None
+        names = [""]
+        with self.backend.scandir(directory) as it:
+            for entry in it:
+                if entry.name == COORDINATION_DIR:
+                    continue
+                if not entry.is_dir(follow_symlinks=follow):
+                    continue
+                if device is not None and entry.stat().st_dev != device:
+                    continue
+                names.append(entry.name)
+        return names
+
+    def _survey(
+        self, directory: str, stats: RunStats, report: UsageReport | None
+    ) -> None:
+        """Traverse a directory, only collecting the usage report."""
+        if self.recursive:
+            self._delete_tree(
+                directory,
+                dryrun=True,
+                on_entry=None,
+                stats=stats,
+                failed_files=PathList(),
+                pool=None,
+                report=report,
+                report_only=True,
+            )
+        else:
+            self._delete_dir(
+                directory,
+                dryrun=True,
+                on_entry=None,
+                stats=stats,
+                pool=None,
+                report=report,
+                report_only=True,
+            )
+
+    def _retry(
+        self,
+        retry_queue: RetryQueue,
+        *,
+        on_entry: EntryCallback | None,
+        stats: RunStats,
+        failed_files: PathList,
+        pool: UnlinkPool | None,
+        truncator: Truncator | None = None,
+    ) -> None:
+        """Retry queued transient failures, reporting those that persist."""
+        if truncator is not None:
+            for path, error in truncator.drain():
+                _record_removal(path, error, stats, on_entry, failed_files, retry_queue)
+        if pool is not None:
+            for path, error in pool.drain():
+                _record_removal(path, error, stats, on_entry, failed_files, retry_queue)
+        remove = self.backend.remove
+        if self.timings is not None:
+            remove = self.timings.wrap("remove", remove)
+        for _, paths in retry_queue.rounds():
+            results: list[tuple[str, OSError | None]] = []
+            for path in paths:
+                if self._unlink_bucket is not None:
+                    self._unlink_bucket.consume()
+                if pool is not None:
+                    pool.submit(remove, path)
+                    continue
+                try:
+                    remove(path)
+                    results.append((path, None))
+                except OSError as e:
+                    results.append((path, e))
+            if pool is not None:
+                results = pool.drain()
+            for path, error in results:
+                if error is not None and error.errno == errno.ENOENT:
+                    # An earlier attempt took effect after reporting an error
+                    # (common with stale handles), or the file went away
+                    error = None
+                _record_removal(path, error, stats, on_entry, failed_files, retry_queue)
+        for path, error in retry_queue.exhausted():
+            _record_removal(path, error, stats, on_entry, failed_files)
+
+    def _get_pool(self) -> UnlinkPool | None:
+        """Return the worker pool, starting it on first use."""
+        if self.workers == 1:
+            return None
+        if self._pool is None:
+            if self.workers == WORKERS_AUTO:
+                self._pool = UnlinkPool(controller=AIMDController())
+            else:
+                self._pool = UnlinkPool(workers=self.workers)  # type: ignore[arg-type]
+        return self._pool
+
+    def _get_truncator(self) -> Truncator | None:
+        """Return the truncate worker, starting it on first use."""
+        if self.truncate_above is None:
+            return None
+        if self._truncator is None:
+            self._truncator = Truncator(
+                self.backend,
+                self.truncate_above,
+                self.truncate_chunk,
+                bytes_bucket=self._bytes_bucket,
+                timings=self.timings,
+                # Simulated inodes must not be matched against real processes
+                in_use=open_elsewhere if isinstance(self.backend, OSBackend) else None,
+            )
+        return self._truncator
+
+    def _report_workers(self, pool: UnlinkPool, stats: RunStats) -> None:
+        stats.workers = pool.limit
+        stats.workers_peak = pool.limit
+        if pool.controller is not None:
+            stats.workers_peak = pool.controller.peak
+            logger.info(
+                f"Autotuned workers: {stats.workers} "
+                f"(peak {stats.workers_peak}, "
+                f"{pool.controller.adjustments} adjustments)"
+            )
+
+    def _delete_dir(
+        self,
+        directory: str,
+        *,
+        dryrun: bool,
+        on_entry: EntryCallback | None,
+        stats: RunStats,
+        pool: UnlinkPool | None,
+        subdirs: list[os.DirEntry] | None = None,
+        selection: OldestFiles | None = None,
+        open_files: OpenFiles | None = None,
+        retry_queue: RetryQueue | None = None,
+        report: UsageReport | None = None,
+        report_only: bool = False,
+        truncator: Truncator | None = None,
+    ) -> PathList:
+        return _delete_files_in_dir(
+            directory,
+            dryrun=dryrun,
+            exclude_pattern=self._exclude_pattern,
+            unlink_bucket=self._unlink_bucket,
+            bytes_bucket=self._bytes_bucket,
+            on_entry=on_entry,
+            stats=stats,
+            subdirs=subdirs,
+            symlinks=self.symlinks,
+            timings=self.timings,
+            backend=self.backend,
+            pool=pool,
+            selection=selection,
+            open_files=open_files,
+            retry_queue=retry_queue,
+            report=report,
+            report_only=report_only,
+            truncator=truncator,
+        )
+
+    def _shortfall(self, directory: str) -> int:
+        """Return the bytes still to free to reach the free space target."""
+        st = self.backend.statvfs(directory)
+        return self.free_until.shortfall(  # type: ignore[union-attr]
+            st.f_frsize * st.f_blocks, st.f_frsize * st.f_bavail
+        )
+
+    def _free_space(
+        self,
+        directory: str,
+        *,
+        dryrun: bool,
+        on_entry: EntryCallback | None,
+        stats: RunStats,
+        failed_files: PathList,
+        pool: UnlinkPool | None,
+        dir_mtimes: dict[str, float] | None,
+        open_files: OpenFiles | None,
+        retry_queue: RetryQueue | None,
+        report: UsageReport | None,
+        truncator: Truncator | None = None,
+    ) -> None:
+        # Each round lists the tree once, selecting the oldest files that
+        # cover the shortfall, and deletes them oldest first. Free space is
+        # then re-read, since block rounding, hard links and other writers
+        # make file sizes an estimate; another round runs while the target
+        # is still short and the previous round deleted something. Files a
+        # round tried to delete are not selected again, so one that failed
+        # (or is queued for a retry) cannot keep later rounds from making
+        # progress. Only the first listing is counted in the usage report,
+        # reports excluded and in-use files and records directory mtimes, so
+        # a file is reported once however many rounds list it, and mtimes
+        # stay those from before the run.
+        needed = self._shortfall(directory)
+        if not needed:
+            logger.info(f"Free space target {self.free_until} already met")
+            if report is not None:
+                self._survey(directory, stats, report)
+            return
+        remove = self.backend.remove
+        if self.timings is not None:
+            remove = self.timings.wrap("remove", remove)
+        log_debug = logger.isEnabledFor(logging.DEBUG)
+        list_on_entry = on_entry
+        list_stats = stats
+        attempted: set[str] = set()
+        while needed:
+            selection = OldestFiles(needed, attempted)
+            if self.recursive:
+                self._delete_tree(
+                    directory,
+                    dryrun=dryrun,
+                    on_entry=list_on_entry,
+                    stats=list_stats,
+                    failed_files=PathList(),
+                    pool=None,
+                    dir_mtimes=dir_mtimes,
+                    selection=selection,
+                    open_files=open_files,
+                    retry_queue=retry_queue,
+                    report=report,
+                )
+            else:
+                self._delete_dir(
+                    directory,
+                    dryrun=dryrun,
+                    on_entry=list_on_entry,
+                    stats=list_stats,
+                    pool=None,
+                    selection=selection,
+                    open_files=open_files,
+                    retry_queue=retry_queue,
+                    report=report,
+                )
+            report = None
+            list_on_entry = None
+            list_stats = RunStats()
+            dir_mtimes = None
+            selected = selection.oldest_first()
+            attempted.update(path for path, _ in selected)
+            logger.info(
+                f"Freeing {needed} bytes: selected {len(selected)} oldest files "
+                f"({selection.total} bytes)"
+            )
+            if dryrun:
+                for filepath, _ in selected:
+                    logger.info(f"[DRYRUN] Deleting file: {filepath}")
+                    stats.planned += 1
+                    if on_entry is not None:
+                        on_entry(EVENT_PLANNED, filepath, None)
+                return
+
+            deleted = stats.deleted
+            for filepath, size in selected:
+                if log_debug:
+                    logger.debug(f"Deleting file: {filepath}")
+                if self._unlink_bucket is not None:
+                    self._unlink_bucket.consume()
+                if truncator is not None and size >= truncator.threshold:
+                    truncator.submit(filepath, size)
+                    continue
+                if self._bytes_bucket is not None:
+                    self._bytes_bucket.consume(size)
+                if pool is not None:
+                    pool.submit(remove, filepath)
+                    for path, error in pool.completed():
+                        _record_removal(
+                            path, error, stats, on_entry, failed_files, retry_queue
+                        )
+                    continue
+                error = None
+                try:
+                    remove(filepath)
+                except OSError as e:
+                    error = e
+                _record_removal(
+                    filepath, error, stats, on_entry, failed_files, retry_queue
+                )
+            if truncator is not None:
+                for path, error in truncator.drain():
+                    _record_removal(
+                        path, error, stats, on_entry, failed_files, retry_queue
+                    )
+            if pool is not None:
+                for path, error in pool.drain():
+                    _record_removal(
+                        path, error, stats, on_entry, failed_files, retry_queue
+                    )
+
+            needed = self._shortfall(directory)
+            if needed and stats.deleted == deleted:
+                logger.warning(
+                    f"Free space target {self.free_until} not reached: "
+                    f"{needed} bytes short"
+                )
+                return
+
+    def _delete_tree(
+        self,
+        directory: str,
+        *,
+        dryrun: bool,
+        on_entry: EntryCallback | None,
+        stats: RunStats,
+        failed_files: PathList,
+        pool: UnlinkPool | None,
+        dir_mtimes: dict[str, float] | None = None,
+        selection: OldestFiles | None = None,
+        open_files: OpenFiles | None = None,
+        retry_queue: RetryQueue | None = None,
+        report: UsageReport | None = None,
+        report_only: bool = False,
+        truncator: Truncator | None = None,
+    ) -> None:
+        # Depth-first traversal fed by the same listing that deletes files,
+        # so each directory is listed exactly once. Subdirectories are only
+        # stat'ed when a mount or cycle check needs their st_dev/st_ino, and
+        # DirEntry caches that result.
+        follow = self.symlinks == SYMLINKS_FOLLOW
+        root_stat = None
+        if self.one_file_system or follow:
+            root_stat = self.backend.stat(directory)
+        visited: set[tuple[int, int]] = set()
+        if follow and root_stat is not None:
+            visited.add((root_stat.st_dev, root_stat.st_ino))
+        pending = [directory]
+        while pending:
+            root = pending.pop()
+            subdirs: list[os.DirEntry] = []
+            try:
+                failed_files.extend(
+                    self._delete_dir(
+                        root,
+                        dryrun=dryrun,
+                        on_entry=on_entry,
+                        stats=stats,
+                        pool=pool,
+                        subdirs=subdirs,
+                        selection=selection,
+                        open_files=open_files,
+                        retry_queue=retry_queue,
+                        report=report,
+                        report_only=report_only,
+                        truncator=truncator,
+                    )
+                )
+            except OSError as e:
+                if root == directory:
+                    raise
+                logger.warning(f"Failed to list {root}: {e}")
+            for entry in reversed(subdirs):
+                if root_stat is not None:
+                    try:
+                        st = entry.stat()
+                    except OSError as e:
+                        logger.warning(f"Failed to stat {entry.path}: {e}")
+                        continue
+                    if self.one_file_system and st.st_dev != root_stat.st_dev:
+                        logger.debug(f"Skipping mount point: {entry.path}")
+                        continue
+                    if follow:
+                        key = (st.st_dev, st.st_ino)
+                        if key in visited:
+                            logger.debug(f"Skipping visited directory: {entry.path}")
+                            continue
+                        visited.add(key)
+                if dir_mtimes is not None:
+                    try:
+                        dir_mtimes[entry.path] = entry.stat().st_mtime
+                    except OSError:
+                        pass
+                pending.append(entry.path)
+
+
 def delete_files_in_directory(
     directory: str,
     recursive: bool = False,
     dryrun: bool = False,
     exclude_regex: str | None = None,
+    max_unlinks_per_sec: float | None = None,
+    max_bytes_per_sec: float | None = None,
+    on_entry: EntryCallback | None = None,
+    stats: RunStats | None = None,
+    symlinks: str = SYMLINKS_UNLINK,
+    one_file_system: bool = False,
+    timings: Timings | None = None,
+    backend: FilesystemBackend | None = None,
+    workers: int | str = 1,
+    free_until: str | FreeSpaceTarget | None = None,
+    skip_open: bool = False,
+    retries: int = 0,
+    retry_delay: float = 0.5,
+    truncate_above: int | str | None = None,
+    truncate_chunk: int | str = DEFAULT_CHUNK_SIZE,
+    report: UsageReport | None = None,
 ) -> list[str]:
     """
     Delete all files in a directory.
 
+    Convenience wrapper around a single-use DirectoryEmptier.
+
     Args:
         directory: Path to the directory to empty
         recursive: If True, delete files in subdirectories as well
         dryrun: If True, log what would be deleted without actually deleting
         exclude_regex: Regex pattern to exclude files from deletion
             (matched against filename)
+        max_unlinks_per_sec: Maximum number of files deleted per second
+            (None for unlimited)
+        max_bytes_per_sec: Maximum number of bytes freed per second
+            (None for unlimited)
+        on_entry: Callback invoked with (event, path, error) for each deleted,
+            planned, excluded or failed file
+        stats: Counters to update (a RunStats is created if not provided)
+        symlinks: Symlink policy: "skip" leaves symlinks alone, "unlink"
+            removes the link itself without following it, "follow" also
+            descends into symlinked directories when recursive
+        one_file_system: If True, do not descend into directories on other
+            filesystems (mount points)
+        timings: If provided, cumulative time spent in directory listing,
+            unlink, rmdir and exclude matching is recorded in it
+        backend: Filesystem backend (defaults to the real filesystem)
+        workers: Number of concurrent unlinks, or "auto" to adapt the number
+            to observed latency, throughput and errors while running
+        free_until: Free space target such as "200G" or "15%"; only the oldest
+            files are deleted, until the filesystem has that much space
+            available
+        skip_open: If True, skip files that a process on this machine has open
+            for writing (found by scanning /proc once per run)
+        retries: Number of times a removal that failed with a transient error
+            (busy, stale handle, timeout) is retried at the end of the run
+        retry_delay: Seconds to wait before the first retry; the wait doubles
+            for each further retry
+        truncate_above: Size such as "4G" (or bytes); larger files are
+            unlinked by a background worker, which then releases their space
+            in chunks, so the traversal never waits on one huge unlink
+        truncate_chunk: Bytes released per truncate call
+        report: If provided, file counts and bytes per subdirectory and
+            extension are collected in it during the same traversal
 
     Returns:
-        List of files that failed to delete (empty if all succeeded)
+        Paths of files that failed to delete (empty if all succeeded)
     """
-    directory = resolve_path(directory)
-
-    if not os.path.isdir(directory):
-        raise ValueError(f"Not a directory: {directory}")
-
-    # Compile the exclude regex pattern if provided
-    exclude_pattern = None
-    if exclude_regex:
-        exclude_pattern = re.compile(exclude_regex)
-
-    logger.debug(
-        f"delete_files_in_directory({directory}, "
-        f"recursive={recursive}, "
-        f"dryrun={dryrun}, "
-        f"exclude_regex={exclude_regex!r})"
-    )
-
-    failed_files: list[str] = []
-    if recursive:
-        for root, dirs, files in os.walk(directory):
-            failed_files.extend(
-                _delete_files_in_dir(
-                    root,
-                    dryrun=dryrun,
-                    exclude_pattern=exclude_pattern,
-                )
-            )
-    else:
-        failed_files.extend(
-            _delete_files_in_dir(
-                directory,
-                dryrun=dryrun,
-                exclude_pattern=exclude_pattern,
+    with DirectoryEmptier(
+        recursive=recursive,
+        exclude_regex=exclude_regex,
+        max_unlinks_per_sec=max_unlinks_per_sec,
+        max_bytes_per_sec=max_bytes_per_sec,
+        symlinks=symlinks,
+        one_file_system=one_file_system,
+        timings=timings,
+        backend=backend,
+        workers=workers,
+        free_until=free_until,
+        skip_open=skip_open,
+        retries=retries,
+        retry_delay=retry_delay,
+        truncate_above=truncate_above,
+        truncate_chunk=truncate_chunk,
+    ) as emptier:
+        return list(
+            emptier.delete_files(
+                directory, dryrun=dryrun, on_entry=on_entry, stats=stats, report=report
             )
         )
-    return failed_files
 
 
 def empty_directory(
@@ -125,31 +1346,114 @@ def empty_directory(
     recursive: bool = False,
     dryrun: bool = False,
     exclude_regex: str | None = None,
+    max_unlinks_per_sec: float | None = None,
+    max_bytes_per_sec: float | None = None,
+    on_entry: EntryCallback | None = None,
+    stats: RunStats | None = None,
+    symlinks: str = SYMLINKS_UNLINK,
+    one_file_system: bool = False,
+    timings: Timings | None = None,
+    backend: FilesystemBackend | None = None,
+    workers: int | str = 1,
+    keep_dirs: bool = False,
+    prune_after_days: float | None = None,
+    free_until: str | FreeSpaceTarget | None = None,
+    skip_open: bool = False,
+    retries: int = 0,
+    retry_delay: float = 0.5,
+    truncate_above: int | str | None = None,
+    truncate_chunk: int | str = DEFAULT_CHUNK_SIZE,
+    coordinate: bool = False,
+    lease_ttl: float = 60.0,
+    report: UsageReport | None = None,
+    report_only: bool = False,
 ) -> list[str]:
     """
     Empty a directory by removing all files and then removing empty subdirectories.
 
+    Convenience wrapper around a single-use DirectoryEmptier.
+
     Args:
         directory: Path to the directory to empty
         recursive: If True, delete files in subdirectories as well
         dryrun: If True, log what would be deleted without actually deleting
         exclude_regex: Regex pattern to exclude files from deletion
             (matched against filename)
+        max_unlinks_per_sec: Maximum number of files deleted per second
+            (None for unlimited)
+        max_bytes_per_sec: Maximum number of bytes freed per second
+            (None for unlimited)
+        on_entry: Callback invoked with (event, path, error) for each deleted,
+            planned, excluded or failed file
+        stats: Counters to update (a RunStats is created if not provided)
+        symlinks: Symlink policy: "skip" leaves symlinks alone, "unlink"
+            removes the link itself without following it, "follow" also
+            descends into symlinked directories when recursive
+        one_file_system: If True, do not descend into directories on other
+            filesystems (mount points)
+        timings: If provided, cumulative time spent in directory listing,
+            unlink, rmdir and exclude matching is recorded in it
+        backend: Filesystem backend (defaults to the real filesystem)
+        workers: Number of concurrent unlinks, or "auto" to adapt the number
+            to observed latency, throughput and errors while running
+        keep_dirs: If True, leave the directory skeleton in place after a
+            recursive delete instead of removing empty directories
+        prune_after_days: With keep_dirs, still remove empty directories that
+            had not been modified for more than this many days before the run
+        free_until: Free space target such as "200G" or "15%"; only the oldest
+            files are deleted, until the filesystem has that much space
+            available
+        skip_open: If True, skip files that a process on this machine has open
+            for writing (found by scanning /proc once per run)
+        retries: Number of times a removal that failed with a transient error
+            (busy, stale handle, timeout) is retried at the end of the run
+        retry_delay: Seconds to wait before the first retry; the wait doubles
+            for each further retry
+        truncate_above: Size such as "4G" (or bytes); larger files are
+            unlinked by a background worker, which then releases their space
+            in chunks, so the traversal never waits on one huge unlink
+        truncate_chunk: Bytes released per truncate call
+        coordinate: If True, cooperate with other processes (on this or other
+            hosts) emptying the same root: top-level subtrees are claimed
+            through lease files in the root, and the process that finishes
+            last removes empty directories
+        lease_ttl: Seconds after which the lease of a process that stopped
+            renewing it can be taken over
+        report: If provided, file counts and bytes per subdirectory and
+            extension are collected in it during the same traversal
+        report_only: If True, only collect the report; nothing is deleted
 
     Returns:
-        List of files that failed to delete (empty if all succeeded)
+        Paths of files that failed to delete (empty if all succeeded)
     """
-    failed_files = delete_files_in_directory(
-        directory,
+    with DirectoryEmptier(
         recursive=recursive,
-        dryrun=dryrun,
         exclude_regex=exclude_regex,
-    )
-
-    if recursive:
-        try:
-            delete_empty_directories(directory, dryrun=dryrun)
-        except OSError as e:
-            logger.warning(f"Failed to clean up empty directories: {e}")
-
-    return failed_files
+        max_unlinks_per_sec=max_unlinks_per_sec,
+        max_bytes_per_sec=max_bytes_per_sec,
+        symlinks=symlinks,
+        one_file_system=one_file_system,
+        timings=timings,
+        backend=backend,
+        workers=workers,
+        keep_dirs=keep_dirs,
+        prune_after_days=prune_after_days,
+        free_until=free_until,
+        skip_open=skip_open,
+        retries=retries,
+        retry_delay=retry_delay,
+        truncate_above=truncate_above,
+        truncate_chunk=truncate_chunk,
+        coordinate=coordinate,
+        lease_ttl=lease_ttl,
+    ) as emptier:
+        return list(
+            emptier.empty(
+                directory,
+                dryrun=dryrun,
+                on_entry=on_entry,
+                stats=stats,
+                report=report,
+                report_only=report_only,
+            )
+        )
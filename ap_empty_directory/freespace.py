@@ -0,0 +1,154 @@
+"""Free-space targets and oldest-first file selection."""
+
+import heapq
+import math
+import re
+from dataclasses import dataclass
+
+# Binary size suffixes, as used by df and du
+_SIZE_UNITS = {
+    "": 1,
+    "K": 1 << 10,
+    "M": 1 << 20,
+    "G": 1 << 30,
+    "T": 1 << 40,
+    "P": 1 << 50,
+}
+_SIZE_RE = re.compile(
+    r"^\s*(\d+(?:\.\d*)?|\.\d+)\s*([KMGTP]?)(?:I?B)?\s*$", re.IGNORECASE
+)
+
+
+def parse_size(value: str) -> int:
+    """
+    Parse a size such as "200G", "1.5TiB" or "4096".
+
+    Suffixes K, M, G, T and P are powers of 1024 and may be followed by "B"
+    or "iB"; a bare number is a byte count.
+
+    Args:
+        value: Size string
+
+    Returns:
+        Size in bytes
+    """
+    match = _SIZE_RE.match(value)
+    if match is None:
+        raise ValueError(f"Invalid size: {value}")
+    number, unit = match.groups()
+    return int(float(number) * _SIZE_UNITS[unit.upper()])
+
+
+@dataclass(frozen=True)
+class FreeSpaceTarget:
+    """Amount of free space to reach, as bytes or a percentage of the disk."""
+
+    bytes: int | None = None
+    percent: float | None = None
+
+    def shortfall(self, total: int, available: int) -> int:
+        """
+        Return how many bytes must be freed to reach the target.
+
+        Args:
+            total: Filesystem size in bytes
+            available: Bytes currently available to unprivileged users
+
+        Returns:
+            Bytes still to free (0 if the target is already met)
+        """
+        if self.percent is not None:
+            goal = math.ceil(total * self.percent / 100)
+        else:
+            goal = self.bytes or 0
+        return max(goal - available, 0)
+
+    def __str__(self) -> str:
+        if self.percent is not None:
+            return f"{self.percent:g}%"
+        return f"{self.bytes} bytes"
+
+
+def parse_free_target(value: str | FreeSpaceTarget) -> FreeSpaceTarget:
+    """
+    Parse a free-space target such as "200G" or "15%".
+
+    Args:
+        value: Size (see parse_size()) or percentage of the filesystem size
+
+    Returns:
+        The parsed target
+    """
+    if isinstance(value, FreeSpaceTarget):
+        return value
+    text = value.strip()
+    if text.endswith("%"):
+        try:
+            percent = float(text[:-1])
+        except ValueError:
+            raise ValueError(f"Invalid free space target: {value}")
+        if not 0 < percent <= 100:
+            raise ValueError(f"Free space percentage must be in (0, 100]: {value}")
+        return FreeSpaceTarget(percent=percent)
+    try:
+        return FreeSpaceTarget(bytes=parse_size(text))
+    except ValueError:
+        raise ValueError(f"Invalid free space target: {value}")
+
+
+class OldestFiles:
+    """
+    Streaming selection of the oldest files that together free enough space.
+
+    Files are offered one at a time while the tree is listed. A max-heap
+    keyed on modification time holds the oldest files seen so far, and the
+    newest of them is dropped whenever the remaining files still add up to
+    the requested size. Memory is bounded by the number of files needed to
+    reach the target, not by the size of the tree, and no full sort is done.
+    """
+
+    def __init__(self, needed: int, skip: set[str] | None = None):
+        """
+        Args:
+            needed: Number of bytes the selected files must add up to
+            skip: Paths that are never selected, such as files an earlier
+                round already tried to delete
+        """
+        self.needed = needed
+        self.total = 0
+        self._skip = skip
+        # Entries are (-mtime, path, size) so the newest file is at the top
+        self._heap: list[tuple[float, str, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def offer(self, path: str, size: int, mtime: float) -> None:
+        """
+        Consider a file for selection.
+
+        Args:
+            path: Path of the file
+            size: Size in bytes
+            mtime: Modification time
+        """
+        if self._skip and path in self._skip:
+            return
+        heap = self._heap
+        if self.total >= self.needed and (not heap or mtime >= -heap[0][0]):
+            # Already covered by older files
+            return
+        heapq.heappush(heap, (-mtime, path, size))
+        self.total += size
+        while heap and self.total - heap[0][2] >= self.needed:
+            self.total -= heapq.heappop(heap)[2]
+
+    def oldest_first(self) -> list[tuple[str, int]]:
+        """
+        Return the selected files, oldest first.
+
+        Returns:
+            List of (path, size) tuples
+        """
+        ordered = sorted(self._heap, reverse=True)
+        return [(path, size) for _, path, size in ordered]
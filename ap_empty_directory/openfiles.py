@@ -0,0 +1,128 @@
+"""Index of files held open for writing by running processes (Linux)."""
+
+import logging
+import os
+import stat
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class OpenFiles:
+    """
+    Set of regular files currently open for writing, keyed by device and inode.
+
+    Lookups take a directory entry. The inode comes from the directory
+    listing itself, so a file that no process has open costs one set lookup
+    and no system call; only an inode match is confirmed with a stat of the
+    entry (which DirEntry caches).
+    """
+
+    def __init__(self, files: set[tuple[int, int]] | None = None):
+        """
+        Args:
+            files: (st_dev, st_ino) pairs of open files
+        """
+        self.files: set[tuple[int, int]] = set(files or ())
+        self._inodes = {ino for _, ino in self.files}
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __contains__(self, entry: Any) -> bool:
+        if entry.inode() not in self._inodes:
+            return False
+        try:
+            st = entry.stat(follow_symlinks=False)
+        except OSError:
+            return False
+        return (st.st_dev, st.st_ino) in self.files
+
+
+def scan_open_files(proc: str = "/proc") -> OpenFiles:
+    """
+    Build an index of files open for writing by scanning /proc/*/fd once.
+
+    The permission bits of a /proc/PID/fd/N link reflect the mode the file
+    was opened with, so descriptors opened read-only are dropped with the
+    lstat() that scandir already provides, and only writable ones are
+    followed. Processes whose descriptors cannot be read (other users'
+    processes, unless running as root) are skipped.
+
+    Args:
+        proc: Mount point of procfs
+
+    Returns:
+        Index of open files
+    """
+    files: set[tuple[int, int]] = set()
+    unreadable = 0
+    try:
+        processes = [entry.name for entry in os.scandir(proc) if entry.name.isdigit()]
+    except OSError as e:
+        logger.warning(f"Failed to list open files in {proc}: {e}")
+        return OpenFiles()
+    for pid in processes:
+        try:
+            with os.scandir(os.path.join(proc, pid, "fd")) as it:
+                for fd in it:
+                    try:
+                        if not fd.stat(follow_symlinks=False).st_mode & stat.S_IWUSR:
+                            continue
+                        st = fd.stat()
+                    except OSError:
+                        # Closed since it was listed, or not a path (pipe etc.)
+                        continue
+                    if stat.S_ISREG(st.st_mode):
+                        files.add((st.st_dev, st.st_ino))
+        except PermissionError:
+            unreadable += 1
+        except OSError:
+            # Process exited while scanning
+            continue
+    if unreadable:
+        logger.debug(f"Could not read open files of {unreadable} processes")
+    logger.debug(f"Found {len(files)} files open for writing")
+    return OpenFiles(files)
+
+
+def open_elsewhere(dev: int, ino: int, proc: str = "/proc") -> bool:
+    """
+    Return True if a process other than this one has a file open.
+
+    Unlike scan_open_files(), descriptors opened read-only count as well, and
+    the scan stops at the first match. Meant for single files, such as one
+    about to be truncated, where a full index would be wasted. Processes
+    whose descriptors cannot be read are skipped; if procfs is missing, the
+    file is assumed to be open.
+
+    Args:
+        dev: st_dev of the file
+        ino: st_ino of the file
+        proc: Mount point of procfs
+
+    Returns:
+        True if the file is (or may be) open in another process
+    """
+    own = str(os.getpid())
+    try:
+        processes = [entry.name for entry in os.scandir(proc) if entry.name.isdigit()]
+    except OSError as e:
+        logger.debug(f"Failed to list processes in {proc}: {e}")
+        return True
+    for pid in processes:
+        if pid == own:
+            continue
+        try:
+            with os.scandir(os.path.join(proc, pid, "fd")) as it:
+                for fd in it:
+                    try:
+                        st = fd.stat()
+                    except OSError:
+                        continue
+                    if st.st_ino == ino and st.st_dev == dev:
+                        return True
+        except OSError:
+            # Not readable, or the process exited while scanning
+            continue
+    return False
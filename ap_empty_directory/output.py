@@ -0,0 +1,90 @@
+"""Machine-readable output formats."""
+
+import json
+import sys
+from dataclasses import asdict
+from json.encoder import encode_basestring_ascii  # type: ignore[attr-defined]
+from typing import IO, Any
+
+from ap_empty_directory.empty import RunStats
+from ap_empty_directory.report import UsageReport
+
+# Output formats supported by the CLI
+OUTPUT_TEXT = "text"
+OUTPUT_JSONL = "jsonl"
+OUTPUT_FORMATS = (OUTPUT_TEXT, OUTPUT_JSONL)
+
+
+class JsonlWriter:
+    """
+    Stream one compact JSON object per processed file, plus a final summary.
+
+    Instances are callable and can be passed directly as the ``on_entry``
+    callback of empty_directory(). Lines are encoded with the C string
+    encoder and written in batches, so emitting a result costs far less than
+    the unlink that produced it.
+    """
+
+    def __init__(self, stream: IO[str] | None = None, batch_size: int = 1024):
+        """
+        Args:
+            stream: Text stream to write to (defaults to sys.stdout)
+            batch_size: Number of lines to buffer between writes
+        """
+        self._stream = stream if stream is not None else sys.stdout
+        self._batch_size = batch_size
+        self._lines: list[str] = []
+
+    def __call__(self, event: str, path: str, error: OSError | None = None) -> None:
+        """
+        Record a single processed file.
+
+        Args:
+            event: Event name (deleted, planned, excluded, failed)
+            path: Path of the file
+            error: Error raised when the event is a failure
+        """
+        # Paths are escaped to ASCII so undecodable filenames (surrogate
+        # escapes) cannot break the output encoding
+        if error is None:
+            line = f'{{"event":"{event}","path":{encode_basestring_ascii(path)}}}\n'
+        else:
+            line = (
+                f'{{"event":"{event}","path":{encode_basestring_ascii(path)},'
+                f'"error":{encode_basestring_ascii(str(error))}}}\n'
+            )
+        self._lines.append(line)
+        if len(self._lines) >= self._batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered lines to the stream."""
+        if self._lines:
+            self._stream.write("".join(self._lines))
+            self._lines.clear()
+        self._stream.flush()
+
+    def close(
+        self,
+        stats: RunStats,
+        report: UsageReport | None = None,
+        error: str | None = None,
+    ) -> None:
+        """
+        Write the summary object and flush.
+
+        Args:
+            stats: Counters for the run
+            report: Usage report to write as a ``report`` event just before
+                the summary, so the stream stays one JSON object per line
+            error: Reason the run stopped early, added to the summary as
+                ``error``; the counters then cover the files handled so far
+        """
+        if report is not None:
+            line = {"event": "report", **report.as_dict()}
+            self._lines.append(json.dumps(line, separators=(",", ":")) + "\n")
+        summary: dict[str, Any] = {"event": "summary", **asdict(stats)}
+        if error is not None:
+            summary["error"] = error
+        self._lines.append(json.dumps(summary, separators=(",", ":")) + "\n")
+        self.flush()
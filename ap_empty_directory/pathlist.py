@@ -0,0 +1,120 @@
+"""Compact storage for large lists of file paths."""
+
+import os
+import sys
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from typing import overload
+
+_ENCODING = sys.getfilesystemencoding()
+_ERRORS = sys.getfilesystemencodeerrors()
+
+
+class PathList(Sequence[str]):
+    """
+    Append-only list of paths that stores each parent directory once.
+
+    A path is split into its directory (kept in an interned table) and its
+    final name. Entries hold a table index in a C array, and names are
+    encoded back to back into a single buffer with a C array of end
+    offsets, so no per-entry Python objects are kept. Full path strings are
+    built on access, so memory grows with the number of distinct
+    directories plus the bytes of the file names, rather than with the
+    full length of every path. Compares equal to a list of the same paths.
+    """
+
+    __slots__ = ("_dirs", "_dir_index", "_parents", "_names", "_ends")
+
+    def __init__(self, paths: Iterable[str] = ()):
+        """
+        Args:
+            paths: Initial paths
+        """
+        # Directory prefixes including the trailing separator, so joining is
+        # a plain concatenation (and a bare name has the prefix "")
+        self._dirs: list[str] = []
+        self._dir_index: dict[str, int] = {}
+        self._parents = array("I")
+        self._names = bytearray()
+        self._ends = array("Q")
+        self.extend(paths)
+
+    def append(self, path: str) -> None:
+        """
+        Add a path.
+
+        Args:
+            path: Path to add
+        """
+        head, sep, name = path.rpartition(os.sep)
+        self._append(head + sep, name)
+
+    def extend(self, paths: Iterable[str]) -> None:
+        """
+        Add several paths.
+
+        Args:
+            paths: Paths to add
+        """
+        if isinstance(paths, PathList):
+            for index, name in zip(paths._parents, paths._iter_names()):
+                self._append(paths._dirs[index], name)
+            return
+        for path in paths:
+            self.append(path)
+
+    def _append(self, prefix: str, name: str) -> None:
+        index = self._dir_index.get(prefix)
+        if index is None:
+            index = self._dir_index[prefix] = len(self._dirs)
+            self._dirs.append(prefix)
+        self._parents.append(index)
+        self._names += name.encode(_ENCODING, _ERRORS)
+        self._ends.append(len(self._names))
+
+    def _name(self, index: int) -> str:
+        start = self._ends[index - 1] if index else 0
+        return self._names[start : self._ends[index]].decode(_ENCODING, _ERRORS)
+
+    def _iter_names(self) -> Iterator[str]:
+        names = self._names
+        start = 0
+        for end in self._ends:
+            yield names[start:end].decode(_ENCODING, _ERRORS)
+            start = end
+
+    def __len__(self) -> int:
+        return len(self._ends)
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("PathList index out of range")
+        return self._dirs[self._parents[index]] + self._name(index)
+
+    def __iter__(self) -> Iterator[str]:
+        dirs = self._dirs
+        for index, name in zip(self._parents, self._iter_names()):
+            yield dirs[index] + name
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (PathList, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"PathList({list(self)!r})"
+
+    @property
+    def directories(self) -> int:
+        """Number of distinct parent directories stored."""
+        return len(self._dirs)
@@ -0,0 +1,153 @@
+"""Profiling and operation timing support."""
+
+import cProfile
+import logging
+import threading
+from collections import defaultdict
+from time import perf_counter
+from typing import Any, Callable, Iterator, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Timings:
+    """
+    Cumulative wall-clock time and call counts per filesystem operation.
+
+    Operations are instrumented by wrapping the callable once per directory
+    (see wrap() and wrap_scandir()); when no Timings object is in use nothing
+    is wrapped, so disabled timing adds no per-file overhead.
+    """
+
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = defaultdict(float)
+        self.calls: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, calls: int = 1) -> None:
+        """
+        Record time spent in an operation.
+
+        Args:
+            name: Operation name
+            seconds: Elapsed time
+            calls: Number of calls the time covers
+        """
+        with self._lock:
+            self.seconds[name] += seconds
+            self.calls[name] += calls
+
+    def wrap(self, name: str, func: Callable[..., T]) -> Callable[..., T]:
+        """
+        Wrap a callable so each call is timed under ``name``.
+
+        Args:
+            name: Operation name
+            func: Callable to time
+
+        Returns:
+            Timed callable with the same signature
+        """
+
+        def timed(*args: Any, **kwargs: Any) -> T:
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(name, perf_counter() - start)
+
+        return timed
+
+    def wrap_scandir(self, func: Callable[[str], Any]) -> Callable[[str], Any]:
+        """
+        Wrap an os.scandir-like callable, timing both opening and iteration.
+
+        Directory entries are read lazily, so timing only the call would miss
+        most of the listing cost on large or remote directories.
+
+        Args:
+            func: os.scandir or compatible callable
+
+        Returns:
+            Callable returning a timed context-managed iterator
+        """
+        return lambda path: _TimedScandir(self, func, path)
+
+    def as_dict(self) -> dict[str, dict[str, float]]:
+        """
+        Return the recorded timings.
+
+        Returns:
+            Mapping of operation name to {"calls": n, "seconds": s}
+        """
+        return {
+            name: {"calls": self.calls[name], "seconds": self.seconds[name]}
+            for name in sorted(self.seconds)
+        }
+
+    def format(self) -> str:
+        """
+        Format the recorded timings as a table, slowest operation first.
+
+        Returns:
+            Multi-line summary
+        """
+        lines = [f"{'operation':<12} {'calls':>10} {'seconds':>12} {'us/call':>10}"]
+        for name in sorted(self.seconds, key=self.seconds.__getitem__, reverse=True):
+            calls = self.calls[name]
+            seconds = self.seconds[name]
+            per_call = seconds / calls * 1e6 if calls else 0.0
+            lines.append(f"{name:<12} {calls:>10} {seconds:>12.6f} {per_call:>10.1f}")
+        return "\n".join(lines)
+
+
+class _TimedScandir:
+    """Context-managed directory iterator that times open and each read."""
+
+    def __init__(self, timings: Timings, func: Callable[[str], Any], path: str):
+        self._timings = timings
+        start = perf_counter()
+        self._it = func(path)
+        timings.add("scandir", perf_counter() - start)
+
+    def __enter__(self) -> Iterator[Any]:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._it.close()
+
+    def __iter__(self) -> Iterator[Any]:
+        return self
+
+    def __next__(self) -> Any:
+        start = perf_counter()
+        try:
+            return next(self._it)
+        finally:
+            self._timings.add("scandir", perf_counter() - start, calls=0)
+
+
+def run_profiled(path: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a callable under cProfile and write the stats to a file.
+
+    The stats are written even if the callable raises. Load them with
+    ``python -m pstats PATH`` or ``pstats.Stats(PATH)``.
+
+    Args:
+        path: File to write the profile stats to
+        func: Callable to profile
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        Return value of func
+    """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
+        logger.info(f"Wrote profile to {path}")
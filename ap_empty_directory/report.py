@@ -0,0 +1,157 @@
+"""Disk usage aggregation collected while traversing a directory."""
+
+import os
+from typing import Any
+
+# Report formats supported by the CLI
+REPORT_TEXT = "text"
+REPORT_JSON = "json"
+REPORT_FORMATS = (REPORT_TEXT, REPORT_JSON)
+
+# Key used for files without an extension
+NO_EXTENSION = "(none)"
+
+
+def format_bytes(size: int) -> str:
+    """
+    Format a byte count with a binary unit, e.g. "1.5 GiB".
+
+    Args:
+        size: Number of bytes
+
+    Returns:
+        Human-readable size
+    """
+    value = float(size)
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if value < 1024 or unit == "TiB":
+            break
+        value /= 1024
+    if unit == "B":
+        return f"{size} B"
+    return f"{value:.1f} {unit}"
+
+
+class UsageReport:
+    """
+    File counts and bytes per subdirectory and per file extension.
+
+    Subdirectories are grouped by their first ``depth`` path components
+    below the root, so with depth 1 every file under ``root/M31/...`` counts
+    towards ``M31``. The group of a directory is resolved once when the
+    directory is listed (see bucket()); adding a file then costs two dict
+    updates. Only regular files are counted, whether or not they are
+    deleted afterwards.
+    """
+
+    def __init__(self, depth: int = 1):
+        """
+        Args:
+            depth: Number of path components below the root to group by
+        """
+        if depth < 0:
+            raise ValueError(f"Report depth must not be negative: {depth}")
+        self.depth = depth
+        self.root: str | None = None
+        # Mappings of key to [files, bytes]
+        self.directories: dict[str, list[int]] = {}
+        self.extensions: dict[str, list[int]] = {}
+
+    def begin(self, root: str) -> None:
+        """
+        Set the directory that subdirectory groups are relative to.
+
+        Args:
+            root: Root directory of the run
+        """
+        self.root = root
+
+    def bucket(self, directory: str) -> list[int]:
+        """
+        Return the [files, bytes] counters of the group a directory is in.
+
+        Args:
+            directory: Directory being listed
+
+        Returns:
+            Mutable counters to pass to add()
+        """
+        relative = directory
+        if self.root is not None:
+            relative = os.path.relpath(directory, self.root)
+        parts = [] if relative == os.curdir else relative.split(os.sep)
+        key = os.sep.join(parts[: self.depth]) or os.curdir
+        counters = self.directories.get(key)
+        if counters is None:
+            counters = self.directories[key] = [0, 0]
+        return counters
+
+    def add(self, bucket: list[int], name: str, size: int) -> None:
+        """
+        Count one file.
+
+        Args:
+            bucket: Counters returned by bucket() for the file's directory
+            name: File name
+            size: File size in bytes
+        """
+        bucket[0] += 1
+        bucket[1] += size
+        extension = os.path.splitext(name)[1].lower() or NO_EXTENSION
+        counters = self.extensions.get(extension)
+        if counters is None:
+            counters = self.extensions[extension] = [0, 0]
+        counters[0] += 1
+        counters[1] += size
+
+    def as_dict(self) -> dict[str, Any]:
+        """
+        Return the report, largest groups first.
+
+        Returns:
+            Mapping with "total", "directories" and "extensions"
+        """
+        return {
+            "total": {
+                "files": sum(files for files, _ in self.directories.values()),
+                "bytes": sum(size for _, size in self.directories.values()),
+            },
+            "directories": _sorted_rows(self.directories, "path"),
+            "extensions": _sorted_rows(self.extensions, "extension"),
+        }
+
+    def format(self) -> str:
+        """
+        Format the report as text tables, largest groups first.
+
+        Returns:
+            Multi-line summary
+        """
+        report = self.as_dict()
+        lines = []
+        for title, rows, key in (
+            ("directory", report["directories"], "path"),
+            ("extension", report["extensions"], "extension"),
+        ):
+            width = max([len(title)] + [len(row[key]) for row in rows])
+            lines.append(f"{title:<{width}} {'files':>10} {'size':>12}")
+            for row in rows:
+                lines.append(
+                    f"{row[key]:<{width}} {row['files']:>10} "
+                    f"{format_bytes(row['bytes']):>12}"
+                )
+            lines.append("")
+        total = report["total"]
+        lines.append(f"total: {total['files']} files, {format_bytes(total['bytes'])}")
+        return "\n".join(lines)
+
+
+def _sorted_rows(counters: dict[str, list[int]], key: str) -> list[dict[str, Any]]:
+    # Groups whose directories held no files directly are left out
+    return [
+        {key: name, "files": files, "bytes": size}
+        for name, (files, size) in sorted(
+            counters.items(), key=lambda item: (-item[1][1], item[0])
+        )
+        if files
+    ]
@@ -0,0 +1,123 @@
+"""Deferred retries of transient deletion failures."""
+
+import errno
+import logging
+import time
+from typing import Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# errno values worth retrying: busy or locked files (including SMB sharing
+# violations), stale NFS handles, interrupted calls and timeouts
+TRANSIENT_ERRNOS = frozenset(
+    {
+        errno.EAGAIN,
+        errno.EBUSY,
+        errno.EINTR,
+        errno.ESTALE,
+        errno.ETIMEDOUT,
+        errno.ETXTBSY,
+    }
+)
+
+
+class RetryQueue:
+    """
+    Paths whose removal failed with a transient error, retried in rounds.
+
+    Failures are queued while the tree is traversed and retried once the
+    traversal is done, so no directory is listed again. Before each round
+    the queue sleeps with exponential backoff (``base_delay``, doubling,
+    capped at ``max_delay``); paths that fail transiently again are queued
+    for the next round until ``retries`` rounds have run.
+    """
+
+    def __init__(
+        self,
+        retries: int,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Args:
+            retries: Maximum number of retries per path
+            base_delay: Seconds to wait before the first retry
+            max_delay: Upper bound on the wait between retries
+            sleep: Sleep function
+        """
+        if retries < 0:
+            raise ValueError(f"Retries must not be negative: {retries}")
+        if base_delay < 0:
+            raise ValueError(f"Retry delay must not be negative: {base_delay}")
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._pending: dict[str, OSError] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def offer(self, path: str, error: OSError) -> bool:
+        """
+        Queue a failed removal if its error is transient.
+
+        Args:
+            path: Path that failed to be removed
+            error: Error raised by the removal
+
+        Returns:
+            True if the path was queued, False if the failure is permanent
+        """
+        if not self.retries or error.errno not in TRANSIENT_ERRNOS:
+            return False
+        self._pending[path] = error
+        return True
+
+    def delay(self, attempt: int) -> float:
+        """
+        Return the wait before a retry round.
+
+        Args:
+            attempt: Retry round, starting at 1
+
+        Returns:
+            Seconds to sleep
+        """
+        return min(self.base_delay * 2 ** (attempt - 1), self.max_delay)
+
+    def rounds(self) -> Iterator[tuple[int, list[str]]]:
+        """
+        Wait out the backoff and yield the paths to retry, round by round.
+
+        Paths offered while a round is processed are retried in the next
+        one. Iteration stops when the queue is empty or the retry limit is
+        reached.
+
+        Yields:
+            (attempt, paths) tuples
+        """
+        for attempt in range(1, self.retries + 1):
+            if not self._pending:
+                return
+            delay = self.delay(attempt)
+            logger.info(
+                f"Retrying {len(self._pending)} files in {delay:g}s "
+                f"(attempt {attempt}/{self.retries})"
+            )
+            self._sleep(delay)
+            paths = list(self._pending)
+            self._pending.clear()
+            yield attempt, paths
+
+    def exhausted(self) -> list[tuple[str, OSError]]:
+        """
+        Remove and return the paths that are still failing.
+
+        Returns:
+            List of (path, last error) tuples
+        """
+        failures = list(self._pending.items())
+        self._pending.clear()
+        return failures
@@ -0,0 +1,116 @@
+"""I/O rate limiting and process priority control."""
+
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# ionice scheduling classes (see ioprio_set(2))
+IONICE_CLASSES = {
+    "best-effort": 2,
+    "idle": 3,
+}
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``.
+    Consuming more tokens than are available puts the bucket into debt and
+    sleeps until the debt is repaid, so a single large request (e.g. a
+    multi-GB file against a bytes-per-second limit) is delayed rather than
+    rejected. A bucket may be shared between threads; the wait happens
+    outside the lock, so threads sleep off their own debt concurrently.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Args:
+            rate: Tokens added per second (must be positive)
+            capacity: Maximum burst size (defaults to one second of tokens)
+            clock: Monotonic clock function
+            sleep: Sleep function
+        """
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive: {rate}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: float = 1.0) -> float:
+        """
+        Take tokens from the bucket, sleeping if not enough are available.
+
+        Args:
+            amount: Number of tokens to take
+
+        Returns:
+            Seconds spent sleeping
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            wait = -self._tokens / self.rate
+        self._sleep(wait)
+        return wait
+
+
+def lower_priority(nice: int | None = None, ionice: str | None = None) -> None:
+    """
+    Lower the CPU and/or I/O scheduling priority of the current process.
+
+    Failures are logged and otherwise ignored; throttling is best-effort.
+
+    Args:
+        nice: Increment to add to the process niceness
+        ionice: I/O scheduling class name (see IONICE_CLASSES)
+    """
+    if nice:
+        try:
+            os.nice(nice)
+        except (AttributeError, OSError) as e:
+            logger.warning(f"Failed to set niceness: {e}")
+
+    if ionice:
+        if ionice not in IONICE_CLASSES:
+            raise ValueError(f"Unknown ionice class: {ionice}")
+        ionice_cmd = shutil.which("ionice")
+        if ionice_cmd is None:
+            logger.warning("ionice not available, I/O priority unchanged")
+            return
+        try:
+            subprocess.run(
+                [
+                    ionice_cmd,
+                    "-c",
+                    str(IONICE_CLASSES[ionice]),
+                    "-p",
+                    str(os.getpid()),
+                ],
+                check=True,
+                capture_output=True,
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.warning(f"Failed to set I/O priority: {e}")
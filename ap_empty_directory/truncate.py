@@ -0,0 +1,208 @@
+"""Background, chunked truncation of large files before they are unlinked."""
+
+import logging
+import stat
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from ap_empty_directory.backend import FilesystemBackend
+from ap_empty_directory.freespace import parse_size
+from ap_empty_directory.profiling import Timings
+from ap_empty_directory.throttle import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Bytes released per truncate call when no chunk size is given
+DEFAULT_CHUNK_SIZE = 256 << 20
+
+
+def parse_size_option(value: int | str, name: str) -> int:
+    """
+    Parse a positive size given as a byte count or a string like "4G".
+
+    Args:
+        value: Size in bytes or a size string (see parse_size())
+        name: Option name used in error messages
+
+    Returns:
+        Size in bytes
+    """
+    size = parse_size(value) if isinstance(value, str) else int(value)
+    if size <= 0:
+        raise ValueError(f"{name} must be positive: {value}")
+    return size
+
+
+class Truncator:
+    """
+    Single background worker that unlinks large files, then releases their
+    space in chunks.
+
+    Freeing the extents of a multi-GB file can keep one unlink busy for
+    seconds. For files handed to submit(), the worker opens the file, unlinks
+    it (which is quick while the descriptor keeps the data alive), and then
+    truncates it from the end through the descriptor, ``chunk_size`` bytes
+    per call, so the filesystem releases the space in bounded steps. The
+    traversal only queues the path and moves on. Nothing is truncated unless
+    the unlink succeeded, so a file that cannot be removed (busy, directory
+    not writable) is left intact and reported as failed.
+
+    Files with more than one hard link, or that another process has open
+    (see ``in_use``), are only unlinked: truncating would change the data
+    seen through the other link or descriptor, and the space is released
+    when that is closed. Files that cannot be opened for writing (read-only
+    file in a writable directory) or are no longer regular files are
+    unlinked directly as well.
+
+    As with UnlinkPool, results are queued and collected by the submitting
+    thread through completed() and drain(). A truncator may be reused
+    across runs.
+    """
+
+    def __init__(
+        self,
+        backend: FilesystemBackend,
+        threshold: int,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        bytes_bucket: TokenBucket | None = None,
+        timings: Timings | None = None,
+        in_use: Callable[[int, int], bool] | None = None,
+    ):
+        """
+        Args:
+            backend: Filesystem backend
+            threshold: Files of at least this many bytes are truncated
+            chunk_size: Bytes released per truncate call
+            bytes_bucket: Token bucket limiting bytes freed per second,
+                consumed chunk by chunk
+            timings: If provided, time spent truncating and removing is
+                recorded in it
+            in_use: Function taking (st_dev, st_ino) of an unlinked file and
+                returning True if another process still has it open (see
+                openfiles.open_elsewhere()); such files are not truncated
+        """
+        if threshold <= 0:
+            raise ValueError(f"Truncate threshold must be positive: {threshold}")
+        if chunk_size <= 0:
+            raise ValueError(f"Truncate chunk size must be positive: {chunk_size}")
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+        self._stat = backend.stat
+        self._open = backend.open
+        self._fstat = backend.fstat
+        self._truncate = backend.ftruncate
+        self._close = backend.close
+        self._remove = backend.remove
+        self._in_use = in_use
+        if timings is not None:
+            self._truncate = timings.wrap("truncate", self._truncate)
+            self._remove = timings.wrap("remove", self._remove)
+        self._bytes_bucket = bytes_bucket
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ap-empty-directory-truncate"
+        )
+        self._cond = threading.Condition()
+        self._queued = 0
+        self._done: deque[tuple[str, OSError | None]] = deque()
+
+    def submit(self, path: str, size: int) -> None:
+        """
+        Queue a file for truncation and removal. Does not block.
+
+        Args:
+            path: Path of the file
+            size: Size of the file when it was listed
+        """
+        with self._cond:
+            self._queued += 1
+        self._executor.submit(self._run, path, size)
+
+    def completed(self) -> list[tuple[str, OSError | None]]:
+        """
+        Collect results of files that have been removed.
+
+        Returns:
+            List of (path, error) tuples; error is None on success
+        """
+        results = []
+        while self._done:
+            results.append(self._done.popleft())
+        return results
+
+    def drain(self) -> list[tuple[str, OSError | None]]:
+        """
+        Wait for all queued files and collect their results.
+
+        Returns:
+            List of (path, error) tuples; error is None on success
+        """
+        with self._cond:
+            while self._queued:
+                self._cond.wait()
+        return self.completed()
+
+    def close(self) -> None:
+        """Wait for queued files and stop the worker thread."""
+        self._executor.shutdown(wait=True)
+
+    def _run(self, path: str, size: int) -> None:
+        error: OSError | None = None
+        try:
+            remaining = self._remove_and_shrink(path, size)
+            if self._bytes_bucket is not None:
+                self._bytes_bucket.consume(remaining)
+        except OSError as e:
+            error = e
+        finally:
+            with self._cond:
+                self._queued -= 1
+                self._done.append((path, error))
+                self._cond.notify_all()
+
+    def _remove_and_shrink(self, path: str, size: int) -> int:
+        """Remove a file, truncating it afterwards; return the bytes left."""
+        fd = self._open_regular(path)
+        if fd is None:
+            self._remove(path)
+            return size
+        try:
+            # Truncating only after the unlink succeeded means a failure
+            # never leaves a file behind with its data destroyed
+            self._remove(path)
+            st = self._fstat(fd)
+            if not stat.S_ISREG(st.st_mode) or st.st_nlink > 0:
+                # Replaced by something else since it was checked, or still
+                # reachable through another hard link
+                return st.st_size
+            if self._in_use is not None and self._in_use(st.st_dev, st.st_ino):
+                logger.debug(f"Not truncating {path}: open in another process")
+                return st.st_size
+            return self._shrink(fd, path, st.st_size)
+        finally:
+            self._close(fd)
+
+    def _open_regular(self, path: str) -> int | None:
+        """Open a regular file for writing, or return None if it cannot be."""
+        try:
+            if not stat.S_ISREG(self._stat(path, follow_symlinks=False).st_mode):
+                return None
+            return self._open(path)
+        except OSError as e:
+            # The unlink that follows reports the error if it persists
+            logger.debug(f"Not truncating {path}: {e}")
+            return None
+
+    def _shrink(self, fd: int, path: str, size: int) -> int:
+        """Truncate an open file chunk by chunk, returning the bytes left."""
+        try:
+            while size > self.chunk_size:
+                if self._bytes_bucket is not None:
+                    self._bytes_bucket.consume(self.chunk_size)
+                self._truncate(fd, size - self.chunk_size)
+                size -= self.chunk_size
+        except OSError as e:
+            # Closing the descriptor releases the rest in one step
+            logger.debug(f"Stopped truncating {path}: {e}")
+        return size
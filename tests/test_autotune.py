@@ -0,0 +1,158 @@
+"""Tests for the autotune module."""
+
+import threading
+import time
+
+import pytest
+
+from ap_empty_directory.autotune import (
+    WORKERS_AUTO,
+    AIMDController,
+    UnlinkPool,
+    parse_workers,
+)
+
+
+class TestParseWorkers:
+    """Tests for parse_workers."""
+
+    def test_valid(self):
+        """Test that counts and 'auto' are accepted."""
+        assert parse_workers(4) == 4
+        assert parse_workers("8") == 8
+        assert parse_workers("auto") == WORKERS_AUTO
+
+    @pytest.mark.parametrize("value", [0, "-1", "many"])
+    def test_invalid(self, value):
+        """Test that invalid settings raise ValueError."""
+        with pytest.raises(ValueError, match="Workers must be"):
+            parse_workers(value)
+
+
+def _window(controller, latency, now, ok=True):
+    """Feed one full window of results to the controller."""
+    for _ in range(max(16, 4 * controller.limit)):
+        controller.record(latency, ok, now)
+
+
+class TestAIMDController:
+    """Tests for AIMDController."""
+
+    def test_increases_while_throughput_holds(self):
+        """Test additive increase while latency and errors stay low."""
+        controller = AIMDController(initial=4, min_window=1)
+        controller.record(0.001, True, 0.0)
+
+        for i in range(1, 4):
+            _window(controller, 0.001, float(i))
+
+        assert controller.limit > 4
+        assert controller.peak == controller.limit
+
+    def test_halves_on_errors(self):
+        """Test multiplicative decrease when the error rate is high."""
+        controller = AIMDController(initial=16)
+
+        _window(controller, 0.001, 1.0, ok=False)
+
+        assert controller.limit == 8
+
+    def test_halves_on_latency_blowup(self):
+        """Test multiplicative decrease when latency grows past the baseline."""
+        controller = AIMDController(initial=8)
+        _window(controller, 0.001, 1.0)
+        limit = controller.limit
+
+        _window(controller, 0.010, 2.0)
+
+        assert controller.limit == limit // 2
+
+    def test_decreases_on_throughput_drop(self):
+        """Test that a throughput drop backs off by one."""
+        controller = AIMDController(initial=4)
+        _window(controller, 0.001, 1.0)
+        limit = controller.limit
+
+        # Same latency, but the window takes ten times longer
+        _window(controller, 0.001, 11.0)
+
+        assert controller.limit == limit - 1
+
+    def test_respects_bounds(self):
+        """Test that the limit stays within minimum and maximum."""
+        controller = AIMDController(initial=2, minimum=2, maximum=3)
+
+        for i in range(10):
+            _window(controller, 0.001, float(i + 1))
+        assert controller.limit == 3
+
+        _window(controller, 0.001, 100.0, ok=False)
+        assert controller.limit == 2
+
+    def test_invalid_limits(self):
+        """Test that inconsistent limits raise ValueError."""
+        with pytest.raises(ValueError, match="Invalid limits"):
+            AIMDController(initial=10, maximum=5)
+
+
+class TestUnlinkPool:
+    """Tests for UnlinkPool."""
+
+    def test_results_collected(self):
+        """Test that successes and failures are returned by drain()."""
+        removed = []
+
+        def remove(path):
+            if path == "bad":
+                raise PermissionError("Permission denied")
+            removed.append(path)
+
+        pool = UnlinkPool(workers=3)
+        for path in ("a", "bad", "b"):
+            pool.submit(remove, path)
+        results = dict(pool.drain())
+        pool.close()
+
+        assert sorted(removed) == ["a", "b"]
+        assert results["a"] is None
+        assert isinstance(results["bad"], PermissionError)
+
+    def test_concurrency_is_capped(self):
+        """Test that no more than the limit run at once."""
+        lock = threading.Lock()
+        active = 0
+        highest = 0
+
+        def remove(path):
+            nonlocal active, highest
+            with lock:
+                active += 1
+                highest = max(highest, active)
+            time.sleep(0.005)
+            with lock:
+                active -= 1
+
+        pool = UnlinkPool(workers=2)
+        for i in range(10):
+            pool.submit(remove, str(i))
+        assert len(pool.drain()) == 10
+        pool.close()
+
+        assert highest == 2
+
+    def test_controller_receives_results(self):
+        """Test that an adaptive pool feeds the controller."""
+        controller = AIMDController(initial=2, min_window=1)
+        pool = UnlinkPool(controller=controller)
+
+        for i in range(40):
+            pool.submit(lambda path: None, str(i))
+        pool.drain()
+        pool.close()
+
+        assert controller.adjustments > 0
+
+    def test_requires_limit(self):
+        """Test that a pool needs a worker count or a controller."""
+        with pytest.raises(ValueError, match="Either workers or controller"):
+            UnlinkPool()
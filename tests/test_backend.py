@@ -0,0 +1,274 @@
+"""Tests for the backend module."""
+
+import errno
+
+import pytest
+
+from ap_empty_directory.backend import OSBackend, SimulatedBackend
+from ap_empty_directory.empty import RunStats, empty_directory
+
+
+class TestOSBackend:
+    """Tests for OSBackend."""
+
+    def test_operations(self, tmp_path):
+        """Test that operations act on the real filesystem."""
+        backend = OSBackend()
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "file1.txt").write_bytes(b"abc")
+
+        with backend.scandir(str(tmp_path)) as it:
+            names = sorted(entry.name for entry in it)
+        assert names == ["file1.txt", "sub"]
+        assert backend.stat(str(tmp_path / "file1.txt")).st_size == 3
+        assert backend.isdir(str(tmp_path / "sub"))
+        assert backend.statvfs(str(tmp_path)).f_blocks > 0
+        fd = backend.open(str(tmp_path / "file1.txt"))
+        try:
+            backend.ftruncate(fd, 1)
+            assert backend.fstat(fd).st_size == 1
+        finally:
+            backend.close(fd)
+        assert (tmp_path / "file1.txt").read_bytes() == b"a"
+
+        backend.remove(str(tmp_path / "file1.txt"))
+        backend.rmdir(str(tmp_path / "sub"))
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestSimulatedBackend:
+    """Tests for SimulatedBackend."""
+
+    def test_tree_construction(self):
+        """Test that files, directories and symlinks can be created."""
+        fs = SimulatedBackend()
+        fs.add_file("/data/a/light.fits", size=100, mtime=5.0)
+        fs.symlink("/data/link", "/data/a")
+
+        assert fs.paths() == ["/data", "/data/a", "/data/a/light.fits", "/data/link"]
+        st = fs.stat("/data/a/light.fits")
+        assert (st.st_size, st.st_mtime) == (100, 5.0)
+        assert fs.isdir("/data/link")
+        assert not fs.isdir("/data/a/light.fits")
+
+    def test_scandir_entries(self):
+        """Test that entries behave like os.DirEntry."""
+        fs = SimulatedBackend()
+        fs.add_file("/data/file.fits")
+        fs.mkdir("/data/sub")
+        fs.symlink("/data/link", "/data/sub")
+        fs.symlink("/data/dangling", "/missing")
+
+        with fs.scandir("/data") as it:
+            entries = {entry.name: entry for entry in it}
+
+        assert entries["file.fits"].is_file(follow_symlinks=False)
+        assert entries["sub"].is_dir(follow_symlinks=False)
+        assert entries["link"].is_symlink()
+        assert not entries["link"].is_dir(follow_symlinks=False)
+        assert entries["link"].is_dir()
+        assert not entries["dangling"].is_file()
+        assert not entries["dangling"].is_dir()
+        assert entries["sub"].path == "/data/sub"
+
+    def test_errors_match_os(self):
+        """Test that failures raise the same OSError subclasses as os."""
+        fs = SimulatedBackend()
+        fs.add_file("/data/sub/file.fits")
+
+        with pytest.raises(FileNotFoundError):
+            fs.remove("/data/missing")
+        with pytest.raises(IsADirectoryError):
+            fs.remove("/data/sub")
+        with pytest.raises(NotADirectoryError):
+            fs.scandir("/data/sub/file.fits")
+        with pytest.raises(OSError) as exc_info:
+            fs.rmdir("/data/sub")
+        assert exc_info.value.errno == errno.ENOTEMPTY
+
+    def test_symlink_loop(self):
+        """Test that symlink loops raise ELOOP."""
+        fs = SimulatedBackend()
+        fs.symlink("/a", "/b")
+        fs.symlink("/b", "/a")
+
+        with pytest.raises(OSError) as exc_info:
+            fs.stat("/a")
+        assert exc_info.value.errno == errno.ELOOP
+
+    def test_latency_injection(self):
+        """Test that configured latency is applied per operation."""
+        slept = []
+        fs = SimulatedBackend(latency={"remove": 0.005}, sleep=slept.append)
+        fs.add_file("/data/a")
+        fs.add_file("/data/b")
+
+        fs.remove("/data/a")
+        fs.remove("/data/b")
+        with fs.scandir("/data"):
+            pass
+
+        assert slept == [0.005, 0.005]
+        assert fs.counts["remove"] == 2
+        assert fs.counts["scandir"] == 1
+
+    def test_failure_injection(self):
+        """Test that injected failures raise the configured errno."""
+        fs = SimulatedBackend(failure_rate={"remove": 1.0}, failure_errno=errno.EBUSY)
+        fs.add_file("/data/a")
+
+        with pytest.raises(OSError) as exc_info:
+            fs.remove("/data/a")
+
+        assert exc_info.value.errno == errno.EBUSY
+        assert fs.exists("/data/a")
+
+    def test_statvfs_tracks_file_sizes(self):
+        """Test that free space is the capacity less the sizes of all files."""
+        fs = SimulatedBackend(capacity=1000)
+        fs.add_file("/data/a.fits", size=300)
+        fs.add_file("/data/b.fits", size=200)
+        assert fs.statvfs("/data").f_bavail == 500
+
+        fs.remove("/data/a.fits")
+        st = fs.statvfs("/data")
+        assert (st.f_frsize * st.f_blocks, st.f_frsize * st.f_bavail) == (1000, 800)
+
+    def test_truncate(self):
+        """Test that ftruncate resizes an open file and updates free space."""
+        fs = SimulatedBackend(capacity=1000)
+        fs.add_file("/data/a.fits", size=300)
+        fs.symlink("/data/link", "/data/a.fits")
+
+        fd = fs.open("/data/a.fits")
+        fs.ftruncate(fd, 100)
+        fs.close(fd)
+
+        assert fs.stat("/data/a.fits").st_size == 100
+        assert fs.statvfs("/data").f_bavail == 900
+        assert (fs.counts["open"], fs.counts["truncate"]) == (1, 1)
+        with pytest.raises(OSError) as exc_info:
+            fs.open("/data/link")
+        assert exc_info.value.errno == errno.ELOOP
+        with pytest.raises(IsADirectoryError):
+            fs.open("/data")
+        with pytest.raises(OSError) as exc_info:
+            fs.ftruncate(fd, 0)
+        assert exc_info.value.errno == errno.EBADF
+
+    def test_unlinked_open_file_keeps_space(self):
+        """Test that an open file's space is released on close, not unlink."""
+        fs = SimulatedBackend(capacity=1000)
+        fs.add_file("/data/a.fits", size=300)
+
+        fd = fs.open("/data/a.fits")
+        fs.remove("/data/a.fits")
+        assert fs.fstat(fd).st_nlink == 0
+        assert fs.statvfs("/data").f_bavail == 700
+        fs.ftruncate(fd, 100)
+        assert fs.statvfs("/data").f_bavail == 900
+        fs.close(fd)
+
+        assert fs.statvfs("/data").f_bavail == 1000
+        assert not fs.exists("/data/a.fits")
+
+    def test_unknown_operation(self):
+        """Test that unknown operation names are rejected."""
+        with pytest.raises(ValueError, match="Unknown operations"):
+            SimulatedBackend(latency={"unlink": 1.0})
+
+
+class TestEmptyDirectoryOnSimulatedBackend:
+    """Tests running empty_directory against SimulatedBackend."""
+
+    def test_recursive_empty(self):
+        """Test that a recursive empty deletes files and prunes directories."""
+        fs = SimulatedBackend()
+        for target in ("M31", "M42"):
+            for i in range(3):
+                fs.add_file(f"/data/{target}/L/light_{i}.fits")
+        fs.add_file("/data/.keep")
+
+        failed = empty_directory(
+            "/data", recursive=True, exclude_regex=r"\.keep$", backend=fs
+        )
+
+        assert failed == []
+        assert fs.paths() == ["/data", "/data/.keep"]
+
+    def test_failures_reported(self):
+        """Test that injected failures end up in the failed list."""
+        fs = SimulatedBackend(failure_rate={"remove": 1.0})
+        fs.add_file("/data/a.fits")
+        stats = RunStats()
+
+        failed = empty_directory("/data", backend=fs, stats=stats)
+
+        assert failed == ["/data/a.fits"]
+        assert stats.failed == 1
+
+    def test_one_file_system(self):
+        """Test that simulated mount points are not entered."""
+        fs = SimulatedBackend()
+        fs.add_file("/data/local/a.fits")
+        fs.mkdir("/data/archive", dev=2)
+        fs.add_file("/data/archive/b.fits")
+        fs.mkdir("/data/archive/empty")
+
+        empty_directory("/data", recursive=True, one_file_system=True, backend=fs)
+
+        assert fs.paths() == [
+            "/data",
+            "/data/archive",
+            "/data/archive/b.fits",
+            "/data/archive/empty",
+        ]
+
+    def test_one_listing_per_directory(self):
+        """Test that file deletion lists each directory once and never stats."""
+        fs = SimulatedBackend()
+        for i in range(10):
+            fs.add_file(f"/data/file{i}.fits")
+
+        empty_directory("/data", backend=fs)
+
+        assert fs.counts["scandir"] == 1
+        assert fs.counts["remove"] == 10
+        # Only the isdir() validation of the root
+        assert fs.counts["stat"] == 1
+
+    def test_concurrent_workers(self):
+        """Test that concurrent unlinks overlap simulated latency."""
+        import time
+
+        fs = SimulatedBackend(latency={"remove": 0.01})
+        for i in range(40):
+            fs.add_file(f"/data/file{i}.fits")
+        stats = RunStats()
+
+        start = time.perf_counter()
+        failed = empty_directory("/data", backend=fs, workers=8, stats=stats)
+        elapsed = time.perf_counter() - start
+
+        assert failed == []
+        assert fs.paths() == ["/data"]
+        assert stats.deleted == 40
+        assert stats.workers == 8
+        # 40 serial unlinks would take 0.4s
+        assert elapsed < 0.3
+
+    def test_auto_workers_report_failures(self):
+        """Test that failures from the adaptive pool are reported."""
+        fs = SimulatedBackend(failure_rate={"remove": 1.0})
+        for i in range(50):
+            fs.add_file(f"/data/sub/file{i}.fits")
+        stats = RunStats()
+
+        failed = empty_directory(
+            "/data", recursive=True, backend=fs, workers="auto", stats=stats
+        )
+
+        assert len(failed) == 50
+        assert stats.failed == 50
+        # Persistent failures push concurrency down
+        assert stats.workers < stats.workers_peak or stats.workers == 1
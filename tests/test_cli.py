@@ -329,6 +329,566 @@ class TestCLIExcludeRegex:
         assert "file1.txt" in captured.err
 
 
+class TestCLIThrottling:
+    """Tests for CLI rate limiting and priority options."""
+
+    def test_cli_rate_limits(self, tmp_path, monkeypatch):
+        """Test CLI passes rate limits to empty_directory."""
+        from ap_empty_directory import cli
+
+        calls = []
+        monkeypatch.setattr(
+            cli, "empty_directory", lambda **kwargs: calls.append(kwargs)
+        )
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            [
+                "ap-empty-directory",
+                str(tmp_path),
+                "--max-unlinks-per-sec",
+                "50",
+                "--max-bytes-per-sec",
+                "1048576",
+            ],
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        assert calls[0]["max_unlinks_per_sec"] == 50.0
+        assert calls[0]["max_bytes_per_sec"] == 1048576.0
+
+    def test_cli_priority_options(self, tmp_path, monkeypatch):
+        """Test CLI lowers process priority before deleting."""
+        from ap_empty_directory import cli
+
+        calls = []
+        monkeypatch.setattr(
+            cli, "lower_priority", lambda **kwargs: calls.append(kwargs)
+        )
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["ap-empty-directory", str(tmp_path), "--nice", "10", "--ionice", "idle"],
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        assert calls == [{"nice": 10, "ionice": "idle"}]
+
+    def test_cli_invalid_rate(self, tmp_path, monkeypatch, capsys):
+        """Test CLI reports a non-positive rate as an error."""
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["ap-empty-directory", str(tmp_path), "--max-unlinks-per-sec", "0"],
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_ERROR
+        assert "Rate must be positive" in capsys.readouterr().err
+
+
+class TestCLIFilesystemPolicy:
+    """Tests for CLI --symlinks and --one-file-system options."""
+
+    def test_cli_symlinks_skip(self, tmp_path, monkeypatch):
+        """Test CLI --symlinks skip leaves links in place."""
+        target = tmp_path / "target.txt"
+        target.touch()
+        root = tmp_path / "root"
+        root.mkdir()
+        link = root / "link.txt"
+        link.symlink_to(target)
+
+        monkeypatch.setattr(
+            sys, "argv", ["ap-empty-directory", str(root), "--symlinks", "skip"]
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        assert link.is_symlink()
+
+    def test_cli_one_file_system(self, tmp_path, monkeypatch):
+        """Test CLI passes --one-file-system to empty_directory."""
+        from ap_empty_directory import cli
+
+        calls = []
+        monkeypatch.setattr(
+            cli, "empty_directory", lambda **kwargs: calls.append(kwargs)
+        )
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["ap-empty-directory", str(tmp_path), "-r", "--one-file-system"],
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        assert calls[0]["one_file_system"] is True
+        assert calls[0]["symlinks"] == "unlink"
+
+    def test_cli_free_until(self, tmp_path, monkeypatch):
+        """Test CLI passes the parsed --free-until target to empty_directory."""
+        from ap_empty_directory import cli
+        from ap_empty_directory.freespace import FreeSpaceTarget
+
+        calls = []
+        monkeypatch.setattr(
+            cli, "empty_directory", lambda **kwargs: calls.append(kwargs)
+        )
+        monkeypatch.setattr(
+            sys, "argv", ["ap-empty-directory", str(tmp_path), "--free-until", "15%"]
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        assert calls[0]["free_until"] == FreeSpaceTarget(percent=15.0)
+
+    def test_cli_free_until_invalid(self, tmp_path, monkeypatch, capsys):
+        """Test CLI rejects a malformed --free-until target."""
+        monkeypatch.setattr(
+            sys, "argv", ["ap-empty-directory", str(tmp_path), "--free-until", "lots"]
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 2
+        assert "Invalid free space target" in capsys.readouterr().err
+
+    def test_cli_skip_open(self, tmp_path, monkeypatch, capsys):
+        """Test CLI --skip-open reports open files as in use."""
+        import json
+
+        (tmp_path / "done.fits").touch()
+
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["ap-empty-directory", str(tmp_path), "--skip-open", "-o", "jsonl"],
+        )
+
+        with open(tmp_path / "capturing.fits", "w"):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert {"event": "in_use", "path": str(tmp_path / "capturing.fits")} in events
+        assert events[-1]["in_use"] == 1
+        assert events[-1]["deleted"] == 1
+        assert [p.name for p in tmp_path.iterdir()] == ["capturing.fits"]
+
+    def test_cli_retries(self, tmp_path, monkeypatch):
+        """Test CLI passes --retries and --retry-delay to empty_directory."""
+        from ap_empty_directory import cli
+
+        calls = []
+        monkeypatch.setattr(
+            cli, "empty_directory", lambda **kwargs: calls.append(kwargs)
+        )
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            [
+                "ap-empty-directory",
+                str(tmp_path),
+                "--retries",
+                "3",
+                "--retry-delay",
+                "2",
+            ],
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        assert (calls[0]["retries"], calls[0]["retry_delay"]) == (3, 2.0)
+
+    @pytest.mark.parametrize(
+        "exception, error",
+        [(OSError("disk gone"), "disk gone"), (KeyboardInterrupt(), "interrupted")],
+    )
+    def test_cli_jsonl_flushed_on_error(
+        self, tmp_path, monkeypatch, capsys, exception, error
+    ):
+        """Test CLI writes buffered events and an error summary when a run fails."""
+        import json
+
+        from ap_empty_directory import cli
+
+        def failing_run(on_entry, stats, **kwargs):
+            for name in ("a.fits", "b.fits"):
+                on_entry("deleted", str(tmp_path / name), None)
+                stats.deleted += 1
+            raise exception
+
+        monkeypatch.setattr(cli, "empty_directory", failing_run)
+        monkeypatch.setattr(
+            sys, "argv", ["ap-empty-directory", str(tmp_path), "-o", "jsonl"]
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_ERROR
+        events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [event["event"] for event in events] == ["deleted", "deleted", "summary"]
+        assert events[-1]["deleted"] == 2
+        assert events[-1]["error"] == error
+
+    def test_cli_negative_retry_delay(self, tmp_path, monkeypatch, capsys):
+        """Test CLI rejects a negative --retry-delay before deleting anything."""
+        (tmp_path / "light.fits").write_text("data")
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["ap-empty-directory", str(tmp_path), "--retries", "1", "--retry-delay=-1"],
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_ERROR
+        assert "Retry delay must not be negative" in capsys.readouterr().err
+        assert (tmp_path / "light.fits").exists()
+
+    def test_cli_truncate_above(self, tmp_path, monkeypatch):
+        """Test CLI truncates and removes files above --truncate-above."""
+        (tmp_path / "master.xisf").write_bytes(b"x" * 4096)
+        (tmp_path / "light.fits").write_bytes(b"x" * 10)
+
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            [
+                "ap-empty-directory",
+                str(tmp_path),
+                "--truncate-above",
+                "2K",
+                "--truncate-chunk",
+                "1K",
+            ],
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        assert list(tmp_path.iterdir()) == []
+
+    def test_cli_truncate_above_invalid(self, tmp_path, monkeypatch, capsys):
+        """Test CLI rejects a zero --truncate-above size."""
+        monkeypatch.setattr(
+            sys, "argv", ["ap-empty-directory", str(tmp_path), "--truncate-above", "0"]
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 2
+        assert "must be positive" in capsys.readouterr().err
+
+    def test_cli_coordinate(self, tmp_path, monkeypatch):
+        """Test CLI --coordinate empties the tree and removes its lease files."""
+        (tmp_path / "M31").mkdir()
+        (tmp_path / "M31" / "light.fits").touch()
+        (tmp_path / "stacking.log").touch()
+
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            [
+                "ap-empty-directory",
+                str(tmp_path),
+                "-r",
+                "--coordinate",
+                "--lease-ttl",
+                "30",
+            ],
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        assert list(tmp_path.iterdir()) == []
+
+    def test_cli_coordinate_requires_recursive(self, tmp_path, monkeypatch, capsys):
+        """Test CLI rejects --coordinate without --recursive."""
+        monkeypatch.setattr(
+            sys, "argv", ["ap-empty-directory", str(tmp_path), "--coordinate"]
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_ERROR
+        assert "coordinate requires recursive" in capsys.readouterr().err
+
+    def test_cli_keep_dirs(self, tmp_path, monkeypatch):
+        """Test CLI --keep-dirs leaves empty subdirectories in place."""
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "file.txt").touch()
+
+        monkeypatch.setattr(
+            sys, "argv", ["ap-empty-directory", str(tmp_path), "-r", "--keep-dirs"]
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        assert list(tmp_path.iterdir()) == [tmp_path / "sub"]
+        assert list((tmp_path / "sub").iterdir()) == []
+
+    def test_cli_prune_after_days_requires_keep_dirs(
+        self, tmp_path, monkeypatch, capsys
+    ):
+        """Test CLI rejects --prune-after-days without --keep-dirs."""
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["ap-empty-directory", str(tmp_path), "-r", "--prune-after-days", "7"],
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_ERROR
+        assert "prune_after_days requires keep_dirs" in capsys.readouterr().err
+
+    def test_cli_report_only(self, tmp_path, monkeypatch, capsys):
+        """Test CLI --report-only prints usage without deleting anything."""
+        (tmp_path / "M31").mkdir()
+        (tmp_path / "M31" / "light.fits").write_bytes(b"x" * 2048)
+
+        monkeypatch.setattr(
+            sys, "argv", ["ap-empty-directory", str(tmp_path), "-r", "--report-only"]
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        assert (tmp_path / "M31" / "light.fits").exists()
+        out = capsys.readouterr().out
+        assert out.splitlines()[1].split() == ["M31", "1", "2.0", "KiB"]
+        assert "total: 1 files, 2.0 KiB" in out
+
+    def test_cli_report_json(self, tmp_path, monkeypatch, capsys):
+        """Test CLI --report json prints the report after deleting."""
+        import json
+
+        (tmp_path / "a.txt").write_bytes(b"abc")
+
+        monkeypatch.setattr(
+            sys, "argv", ["ap-empty-directory", str(tmp_path), "-q", "--report", "json"]
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        assert list(tmp_path.iterdir()) == []
+        report = json.loads(capsys.readouterr().out)
+        assert report["total"] == {"files": 1, "bytes": 3}
+        assert report["extensions"] == [{"extension": ".txt", "files": 1, "bytes": 3}]
+
+    @pytest.mark.parametrize("report_format", ["text", "json"])
+    def test_cli_report_with_jsonl(self, tmp_path, monkeypatch, capsys, report_format):
+        """Test CLI --report with -o jsonl keeps stdout one JSON object per line."""
+        import json
+
+        (tmp_path / "a.txt").write_bytes(b"abc")
+
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            [
+                "ap-empty-directory",
+                str(tmp_path),
+                "-o",
+                "jsonl",
+                "--report",
+                report_format,
+            ],
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [event["event"] for event in events] == ["deleted", "report", "summary"]
+        assert events[1]["total"] == {"files": 1, "bytes": 3}
+
+
+class TestCLIProfiling:
+    """Tests for CLI --profile and --timing options."""
+
+    def test_cli_profile(self, tmp_path, monkeypatch):
+        """Test CLI writes cProfile stats and still empties the directory."""
+        import pstats
+
+        root = tmp_path / "root"
+        root.mkdir()
+        (root / "file1.txt").touch()
+        profile = tmp_path / "run.prof"
+
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["ap-empty-directory", str(root), "--profile", str(profile)],
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        assert list(root.iterdir()) == []
+        stats = pstats.Stats(str(profile))
+        assert any(func[2] == "empty_directory" for func in stats.stats)
+
+    def test_cli_timing(self, tmp_path, monkeypatch, capsys):
+        """Test CLI prints the timing breakdown to stderr."""
+        (tmp_path / "file1.txt").touch()
+
+        monkeypatch.setattr(
+            sys, "argv", ["ap-empty-directory", str(tmp_path), "--timing", "-q"]
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        captured = capsys.readouterr()
+        assert "remove" in captured.err
+        assert "scandir" in captured.err
+        assert captured.out == ""
+
+
+class TestCLIWorkers:
+    """Tests for CLI --workers option."""
+
+    def test_cli_workers(self, tmp_path, monkeypatch):
+        """Test CLI deletes files with concurrent workers."""
+        for i in range(20):
+            (tmp_path / f"file{i}.txt").touch()
+
+        monkeypatch.setattr(
+            sys, "argv", ["ap-empty-directory", str(tmp_path), "--workers", "4"]
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        assert list(tmp_path.iterdir()) == []
+
+    def test_cli_workers_auto_reported(self, tmp_path, monkeypatch, capsys):
+        """Test CLI reports autotuned workers in the jsonl summary."""
+        import json
+
+        (tmp_path / "file1.txt").touch()
+
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["ap-empty-directory", str(tmp_path), "-w", "auto", "-o", "jsonl"],
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        summary = json.loads(capsys.readouterr().out.splitlines()[-1])
+        assert summary["workers"] >= 1
+        assert summary["workers_peak"] >= summary["workers"]
+
+    def test_cli_workers_invalid(self, tmp_path, monkeypatch, capsys):
+        """Test CLI rejects an invalid worker count."""
+        monkeypatch.setattr(
+            sys, "argv", ["ap-empty-directory", str(tmp_path), "--workers", "0"]
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 2
+        assert "Workers must be" in capsys.readouterr().err
+
+
+class TestCLIOutput:
+    """Tests for CLI --output option."""
+
+    def test_cli_jsonl_output(self, tmp_path, monkeypatch, capsys):
+        """Test CLI streams JSON lines and a summary to stdout."""
+        import json
+
+        file1 = tmp_path / "file1.txt"
+        keep_file = tmp_path / ".keep"
+        file1.touch()
+        keep_file.touch()
+
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            [
+                "ap-empty-directory",
+                str(tmp_path),
+                "--output",
+                "jsonl",
+                "-e",
+                r"\.keep$",
+            ],
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        captured = capsys.readouterr()
+        records = [json.loads(line) for line in captured.out.splitlines()]
+        assert {"event": "deleted", "path": str(file1)} in records
+        assert {"event": "excluded", "path": str(keep_file)} in records
+        assert records[-1]["event"] == "summary"
+        assert records[-1]["deleted"] == 1
+        assert records[-1]["excluded"] == 1
+
+    def test_cli_jsonl_dryrun_suppresses_logging(self, tmp_path, monkeypatch, capsys):
+        """Test CLI jsonl mode does not emit progress log lines."""
+        (tmp_path / "file1.txt").touch()
+
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["ap-empty-directory", str(tmp_path), "-n", "-o", "jsonl"],
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == EXIT_SUCCESS
+        captured = capsys.readouterr()
+        assert "[DRYRUN]" not in captured.err
+        assert '"event":"planned"' in captured.out
+
+
 class TestCLIErrorHandling:
     """Tests for CLI error handling."""
 
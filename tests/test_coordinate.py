@@ -0,0 +1,214 @@
+"""Tests for the coordinate module."""
+
+import os
+import time
+
+import pytest
+
+from ap_empty_directory.coordinate import COORDINATION_DIR, LeaseDirectory
+
+
+def _names(*names):
+    return lambda: list(names)
+
+
+class TestLeaseDirectory:
+    """Tests for LeaseDirectory."""
+
+    def test_claims_are_exclusive(self, tmp_path):
+        """Test that a subtree leased by one process is not yielded to another."""
+        with (
+            LeaseDirectory(str(tmp_path), owner="a") as a,
+            LeaseDirectory(str(tmp_path), owner="b", sleep=lambda _: None) as b,
+        ):
+            claims = a.claims(_names("M31"))
+            assert next(claims) == "M31"
+            lease = tmp_path / COORDINATION_DIR / "lease.M31"
+            assert lease.read_text() == "a"
+
+            assert b._claim("M31") is False
+
+            assert list(claims) == []
+            assert not lease.exists()
+            assert (tmp_path / COORDINATION_DIR / "done.M31").exists()
+            assert list(b.claims(_names("M31"))) == []
+
+    def test_waits_for_leases_held_by_others(self, tmp_path):
+        """Test that a process waits while the remaining work is leased."""
+        with LeaseDirectory(str(tmp_path), owner="a") as a:
+            held = a.claims(_names("M31"))
+            next(held)
+            waits = []
+
+            def finish_other(seconds):
+                waits.append(seconds)
+                list(held)
+
+            with LeaseDirectory(
+                str(tmp_path), poll=0.5, owner="b", sleep=finish_other
+            ) as b:
+                assert list(b.claims(_names("M31"))) == []
+
+        assert waits == [0.5]
+
+    def test_expired_lease_taken_over(self, tmp_path):
+        """Test that a lease that was not renewed is taken over."""
+        coordination = tmp_path / COORDINATION_DIR
+        coordination.mkdir()
+        (coordination / "member.other").touch()
+        lease = coordination / "lease.M31"
+        lease.write_text("crashed")
+        os.utime(lease, (0, 0))
+
+        with LeaseDirectory(str(tmp_path), ttl=60, owner="b") as b:
+            claims = b.claims(_names("M31"))
+            assert next(claims) == "M31"
+            assert lease.read_text() == "b"
+            list(claims)
+
+        assert sorted(os.listdir(coordination)) == ["done.M31", "member.other"]
+
+    def test_live_lease_not_taken_over(self, tmp_path):
+        """Test that a recently renewed lease is respected."""
+        coordination = tmp_path / COORDINATION_DIR
+        coordination.mkdir()
+        (coordination / "lease.M31").write_text("alive")
+
+        with LeaseDirectory(str(tmp_path), ttl=60, owner="b") as b:
+            assert b._claim("M31") is False
+
+        assert (coordination / "lease.M31").read_text() == "alive"
+
+    def test_leases_renewed(self, tmp_path):
+        """Test that held leases are renewed in the background."""
+        with LeaseDirectory(str(tmp_path), ttl=0.15, owner="a") as a:
+            claims = a.claims(_names("M31"))
+            next(claims)
+            lease = tmp_path / COORDINATION_DIR / "lease.M31"
+            os.utime(lease, (0, 0))
+            deadline = time.monotonic() + 5
+            while lease.stat().st_mtime == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            assert lease.stat().st_mtime > 0
+            list(claims)
+
+    def test_unfinished_lease_released(self, tmp_path):
+        """Test that a lease is released, not marked done, on an error."""
+        with pytest.raises(RuntimeError):
+            with LeaseDirectory(str(tmp_path), owner="a") as a:
+                for _ in a.claims(_names("M31")):
+                    raise RuntimeError("failed")
+
+        assert os.listdir(tmp_path / COORDINATION_DIR) == []
+
+    def test_prune_lock(self, tmp_path):
+        """Test that one process prunes and the coordination state is removed."""
+        with (
+            LeaseDirectory(str(tmp_path), owner="a") as a,
+            LeaseDirectory(str(tmp_path), owner="b") as b,
+        ):
+            list(a.claims(_names("", "M31")))
+
+            assert a.begin_prune() is True
+            assert b.begin_prune() is False
+            assert list(b.claims(_names("M42"))) == []
+
+            a.finish()
+
+        assert not (tmp_path / COORDINATION_DIR).exists()
+
+    def test_interrupted_prune_cleared(self, tmp_path):
+        """Test that state left by a pruner that died is discarded."""
+        coordination = tmp_path / COORDINATION_DIR
+        coordination.mkdir()
+        (coordination / "done.M31").touch()
+        (coordination / "prune").touch()
+        os.utime(coordination / "prune", (0, 0))
+
+        with LeaseDirectory(str(tmp_path), owner="a") as a:
+            assert list(a.claims(_names("M31"))) == ["M31"]
+
+    def test_markers_of_dead_run_discarded(self, tmp_path):
+        """Test that completion markers are ignored once every process died."""
+        coordination = tmp_path / COORDINATION_DIR
+        coordination.mkdir()
+        two_days_ago = time.time() - 2 * 86400
+        for name in ("done.M31", "member.crashed", "lease.M42"):
+            (coordination / name).touch()
+            os.utime(coordination / name, (two_days_ago, two_days_ago))
+
+        with LeaseDirectory(str(tmp_path), owner="a") as a:
+            assert sorted(os.listdir(coordination)) == ["member.a"]
+            assert sorted(a.claims(_names("M31", "M42"))) == ["M31", "M42"]
+
+    def test_markers_kept_while_run_active(self, tmp_path):
+        """Test that a process joining a live run skips finished subtrees."""
+        coordination = tmp_path / COORDINATION_DIR
+        coordination.mkdir()
+        (coordination / "done.M31").touch()
+        (coordination / "member.b").touch()
+
+        with LeaseDirectory(str(tmp_path), owner="a") as a:
+            assert list(a.claims(_names("M31"))) == []
+
+        assert sorted(os.listdir(coordination)) == ["done.M31", "member.b"]
+
+    def test_reset_waits_for_lock(self, tmp_path):
+        """Test that a process entering during a reset keeps its files."""
+        coordination = tmp_path / COORDINATION_DIR
+        coordination.mkdir()
+        (coordination / "reset").write_text("b")
+        two_days_ago = time.time() - 2 * 86400
+        for name in ("done.M31", "member.crashed"):
+            (coordination / name).touch()
+            os.utime(coordination / name, (two_days_ago, two_days_ago))
+
+        def finish_reset(seconds):
+            # b clears the dead run, joins and releases the lock meanwhile
+            (coordination / "done.M31").unlink()
+            (coordination / "member.crashed").unlink()
+            (coordination / "member.b").write_text("b")
+            (coordination / "lease.M42").write_text("b")
+            (coordination / "reset").unlink()
+
+        with LeaseDirectory(str(tmp_path), owner="a", sleep=finish_reset):
+            assert sorted(os.listdir(coordination)) == [
+                "lease.M42",
+                "member.a",
+                "member.b",
+            ]
+
+    def test_expired_reset_lock_taken_over(self, tmp_path):
+        """Test that the reset lock of a process that died is taken over."""
+        coordination = tmp_path / COORDINATION_DIR
+        coordination.mkdir()
+        (coordination / "reset").write_text("crashed")
+        os.utime(coordination / "reset", (0, 0))
+
+        with LeaseDirectory(str(tmp_path), owner="a", sleep=pytest.fail):
+            assert os.listdir(coordination) == ["member.a"]
+
+    def test_taken_over_lease_not_completed(self, tmp_path):
+        """Test that a lease taken over by another process is left to it."""
+        with LeaseDirectory(str(tmp_path), ttl=0.15, owner="a") as a:
+            claims = a.claims(_names("M31"))
+            assert next(claims) == "M31"
+            lease = tmp_path / COORDINATION_DIR / "lease.M31"
+            lease.write_text("b")
+            os.utime(lease, (0, 0))
+            deadline = time.monotonic() + 5
+            while not a.lost("M31") and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            assert a.lost("M31")
+            assert lease.stat().st_mtime == 0
+            claims.close()
+
+        assert lease.read_text() == "b"
+        assert not (tmp_path / COORDINATION_DIR / "done.M31").exists()
+
+    def test_invalid_ttl(self, tmp_path):
+        """Test that a non-positive TTL raises ValueError."""
+        with pytest.raises(ValueError, match="must be positive"):
+            LeaseDirectory(str(tmp_path), ttl=0)
@@ -1,14 +1,73 @@
 """Tests for the empty module."""
 
+import errno
+import logging
+import os
+import time
 from unittest.mock import patch
 
 import pytest
 
 from ap_empty_directory.empty import (
+    EVENT_DELETED,
+    EVENT_EXCLUDED,
+    EVENT_FAILED,
+    EVENT_PLANNED,
+    DirectoryEmptier,
+    RunStats,
     _delete_files_in_dir,
     delete_files_in_directory,
     empty_directory,
 )
+from ap_empty_directory.pathlist import PathList
+
+
+def _coordinated_worker(root, results, barrier):
+    """Run a coordinated empty_directory and record the files it handled."""
+    import json
+
+    events = []
+    barrier.wait()
+    empty_directory(
+        root,
+        recursive=True,
+        coordinate=True,
+        lease_ttl=2,
+        on_entry=lambda event, path, error: events.append([event, path]),
+    )
+    with open(results, "w") as f:
+        json.dump(events, f)
+
+
+class _FakeEntry:
+    """Minimal os.DirEntry stand-in for a regular file or directory."""
+
+    def __init__(self, directory, name, is_dir=False):
+        self.name = name
+        self.path = os.path.join(directory, name)
+        self._is_dir = is_dir
+
+    def is_file(self, follow_symlinks=True):
+        return not self._is_dir
+
+    def is_dir(self, follow_symlinks=True):
+        return self._is_dir
+
+    def is_symlink(self):
+        return False
+
+
+class _FakeScandir:
+    """Context-managed iterator mimicking os.scandir()."""
+
+    def __init__(self, entries):
+        self._entries = entries
+
+    def __enter__(self):
+        return iter(self._entries)
+
+    def __exit__(self, *exc):
+        return False
 
 
 class TestDeleteFilesInDirectory:
@@ -93,6 +152,81 @@ class TestDeleteFilesInDirectory:
         assert f"recursive={False}" in caplog.text
         assert f"dryrun={False}" in caplog.text
 
+    def test_non_recursive_does_not_stat_entries(self, tmp_path):
+        """Test that file types come from the listing, not per-entry stats."""
+        for i in range(5):
+            (tmp_path / f"file{i}.txt").touch()
+        (tmp_path / "subdir").mkdir()
+
+        with patch("os.path.isfile", side_effect=AssertionError("isfile called")):
+            with patch("os.stat", side_effect=AssertionError("stat called")):
+                failed = _delete_files_in_dir(str(tmp_path))
+
+        assert failed == []
+        assert [p.name for p in tmp_path.iterdir()] == ["subdir"]
+
+    def test_recursive_lists_each_directory_once(self, tmp_path):
+        """Test that recursive mode lists each directory exactly once."""
+        (tmp_path / "a" / "b").mkdir(parents=True)
+        (tmp_path / "a" / "b" / "file1.txt").touch()
+        (tmp_path / "c").mkdir()
+
+        listed = []
+        original_scandir = os.scandir
+
+        def tracking_scandir(path):
+            listed.append(path)
+            return original_scandir(path)
+
+        with patch("os.scandir", side_effect=tracking_scandir):
+            delete_files_in_directory(str(tmp_path), recursive=True)
+
+        assert sorted(listed) == sorted(
+            [
+                str(tmp_path),
+                str(tmp_path / "a"),
+                str(tmp_path / "a" / "b"),
+                str(tmp_path / "c"),
+            ]
+        )
+
+    def test_recursive_skips_unreadable_subdirectory(self, tmp_path, caplog):
+        """Test that a subdirectory that cannot be listed is reported and skipped."""
+        import logging
+
+        (tmp_path / "bad").mkdir()
+        (tmp_path / "file1.txt").touch()
+        original_scandir = os.scandir
+
+        def failing_scandir(path):
+            if str(path).endswith("bad"):
+                raise PermissionError("Permission denied")
+            return original_scandir(path)
+
+        with caplog.at_level(logging.WARNING):
+            with patch("os.scandir", side_effect=failing_scandir):
+                failed = delete_files_in_directory(str(tmp_path), recursive=True)
+
+        assert failed == []
+        assert "Failed to list" in caplog.text
+        assert not (tmp_path / "file1.txt").exists()
+
+    def test_symlink_to_file_is_unlinked(self, tmp_path):
+        """Test that a symlink to a file is removed without touching the target."""
+        outside = tmp_path / "outside"
+        outside.mkdir()
+        target = outside / "target.txt"
+        target.touch()
+        inside = tmp_path / "inside"
+        inside.mkdir()
+        link = inside / "link.txt"
+        link.symlink_to(target)
+
+        delete_files_in_directory(str(inside))
+
+        assert not link.is_symlink()
+        assert target.exists()
+
 
 class TestEmptyDirectory:
     """Tests for empty_directory function."""
@@ -264,22 +398,21 @@ class TestExcludeRegex:
         """Test that exclude regex is case sensitive by default."""
         import os
 
-        # Mock os.listdir to return both case variants
+        # Mock os.scandir to return both case variants
         # This tests regex matching without requiring filesystem case-sensitivity
-        with patch("os.listdir", return_value=[".keep", ".KEEP"]):
+        entries = [
+            _FakeEntry(str(tmp_path), ".keep"),
+            _FakeEntry(str(tmp_path), ".KEEP"),
+        ]
+        with patch("os.scandir", return_value=_FakeScandir(entries)):
             # Track which files would be deleted
             deleted_files = []
 
-            def mock_isfile(path):
-                # Treat both as files
-                return path.endswith(".keep") or path.endswith(".KEEP")
-
             def mock_remove(path):
                 deleted_files.append(os.path.basename(path))
 
-            with patch("os.path.isfile", side_effect=mock_isfile):
-                with patch("os.remove", side_effect=mock_remove):
-                    delete_files_in_directory(str(tmp_path), exclude_regex=r"\.keep$")
+            with patch("os.remove", side_effect=mock_remove):
+                delete_files_in_directory(str(tmp_path), exclude_regex=r"\.keep$")
 
         # Only .KEEP should be deleted (case-sensitive regex)
         assert ".KEEP" in deleted_files
@@ -382,7 +515,7 @@ class TestErrorHandling:
         assert "file1.txt" in failed[0]
 
     def test_empty_directory_handles_cleanup_error(self, tmp_path, caplog):
-        """Test that delete_empty_directories errors are caught."""
+        """Test that empty directory cleanup errors are caught."""
         import logging
 
         subdir = tmp_path / "subdir"
@@ -390,10 +523,1278 @@ class TestErrorHandling:
 
         with caplog.at_level(logging.WARNING):
             with patch(
-                "ap_empty_directory.empty.delete_empty_directories",
+                "ap_empty_directory.empty._delete_empty_dirs",
                 side_effect=OSError("Failed to remove directory"),
             ):
                 failed = empty_directory(str(tmp_path), recursive=True)
 
         assert "Failed to clean up empty directories" in caplog.text
         assert failed == []
+
+
+class TestThrottling:
+    """Tests for unlink and byte rate limiting."""
+
+    def test_unlink_rate_limit_consumes_per_file(self, tmp_path):
+        """Test that each deletion takes one token from the unlink bucket."""
+        for i in range(3):
+            (tmp_path / f"file{i}.txt").touch()
+
+        with patch("ap_empty_directory.empty.TokenBucket") as mock_bucket:
+            delete_files_in_directory(str(tmp_path), max_unlinks_per_sec=100)
+
+        mock_bucket.assert_called_once_with(100)
+        assert mock_bucket.return_value.consume.call_count == 3
+        assert list(tmp_path.iterdir()) == []
+
+    def test_bytes_rate_limit_consumes_file_size(self, tmp_path):
+        """Test that the bytes bucket is charged with each file's size."""
+        (tmp_path / "file1.txt").write_bytes(b"x" * 10)
+
+        with patch("ap_empty_directory.empty.TokenBucket") as mock_bucket:
+            delete_files_in_directory(str(tmp_path), max_bytes_per_sec=1000)
+
+        mock_bucket.return_value.consume.assert_called_once_with(10)
+
+    def test_dryrun_is_not_throttled(self, tmp_path):
+        """Test that dryrun does not consume tokens."""
+        (tmp_path / "file1.txt").touch()
+
+        with patch("ap_empty_directory.empty.TokenBucket") as mock_bucket:
+            delete_files_in_directory(str(tmp_path), dryrun=True, max_unlinks_per_sec=1)
+
+        mock_bucket.return_value.consume.assert_not_called()
+
+    def test_empty_directory_throttled(self, tmp_path):
+        """Test that empty_directory passes rate limits through."""
+        subdir = tmp_path / "subdir"
+        subdir.mkdir()
+        (subdir / "file1.txt").touch()
+
+        empty_directory(
+            str(tmp_path),
+            recursive=True,
+            max_unlinks_per_sec=1000,
+            max_bytes_per_sec=1e9,
+        )
+
+        assert not subdir.exists()
+
+
+class TestEntryReporting:
+    """Tests for on_entry callbacks and run statistics."""
+
+    def test_events_and_stats(self, tmp_path):
+        """Test that deleted, excluded and failed files are reported."""
+        import os
+
+        (tmp_path / "file1.txt").touch()
+        (tmp_path / "file2.txt").touch()
+        (tmp_path / ".keep").touch()
+        original_remove = os.remove
+
+        def mock_remove(path):
+            if "file2.txt" in str(path):
+                raise PermissionError("Permission denied")
+            original_remove(path)
+
+        events = []
+        stats = RunStats()
+        with patch("os.remove", side_effect=mock_remove):
+            empty_directory(
+                str(tmp_path),
+                exclude_regex=r"\.keep$",
+                on_entry=lambda event, path, error: events.append(
+                    (event, os.path.basename(path), error)
+                ),
+                stats=stats,
+            )
+
+        assert sorted(e[:2] for e in events) == [
+            (EVENT_DELETED, "file1.txt"),
+            (EVENT_EXCLUDED, ".keep"),
+            (EVENT_FAILED, "file2.txt"),
+        ]
+        failed = [e for e in events if e[0] == EVENT_FAILED]
+        assert isinstance(failed[0][2], PermissionError)
+        assert stats == RunStats(deleted=1, excluded=1, failed=1)
+
+    def test_dryrun_reports_planned(self, tmp_path):
+        """Test that dryrun reports files as planned, not deleted."""
+        (tmp_path / "file1.txt").touch()
+
+        events = []
+        stats = RunStats()
+        delete_files_in_directory(
+            str(tmp_path),
+            dryrun=True,
+            on_entry=lambda event, path, error: events.append(event),
+            stats=stats,
+        )
+
+        assert events == [EVENT_PLANNED]
+        assert stats == RunStats(planned=1)
+
+
+class _OtherDeviceEntry:
+    """Wrap a real DirEntry so that it appears to live on another device."""
+
+    def __init__(self, entry):
+        self._entry = entry
+        self.name = entry.name
+        self.path = entry.path
+
+    def is_file(self, follow_symlinks=True):
+        return self._entry.is_file(follow_symlinks=follow_symlinks)
+
+    def is_dir(self, follow_symlinks=True):
+        return self._entry.is_dir(follow_symlinks=follow_symlinks)
+
+    def is_symlink(self):
+        return self._entry.is_symlink()
+
+    def stat(self, follow_symlinks=True):
+        st = self._entry.stat(follow_symlinks=follow_symlinks)
+        fields = list(st)
+        fields[2] = st.st_dev + 1
+        return os.stat_result(fields)
+
+
+def _scandir_with_mount(mount_name):
+    """Return an os.scandir replacement that reports mount_name as a mount."""
+    original_scandir = os.scandir
+
+    def scandir(path):
+        entries = [
+            _OtherDeviceEntry(e) if e.name == mount_name else e
+            for e in original_scandir(path)
+        ]
+        return _FakeScandir(entries)
+
+    return scandir
+
+
+class TestSymlinkPolicy:
+    """Tests for the symlinks option."""
+
+    @pytest.fixture
+    def tree(self, tmp_path):
+        """Create a root containing links to an external file and directory."""
+        external = tmp_path / "external"
+        external.mkdir()
+        (external / "data.fits").touch()
+        root = tmp_path / "root"
+        root.mkdir()
+        (root / "file_link").symlink_to(external / "data.fits")
+        (root / "dir_link").symlink_to(external)
+        (root / "dangling").symlink_to(tmp_path / "missing")
+        return root, external
+
+    def test_unlink_removes_links_only(self, tree):
+        """Test that the default policy removes links without following them."""
+        root, external = tree
+
+        delete_files_in_directory(str(root), recursive=True)
+
+        assert list(root.iterdir()) == []
+        assert (external / "data.fits").exists()
+
+    def test_skip_leaves_links(self, tree):
+        """Test that the skip policy leaves every symlink in place."""
+        root, external = tree
+
+        delete_files_in_directory(str(root), recursive=True, symlinks="skip")
+
+        assert sorted(p.name for p in root.iterdir()) == [
+            "dangling",
+            "dir_link",
+            "file_link",
+        ]
+
+    def test_follow_descends_into_linked_directory(self, tree):
+        """Test that the follow policy deletes files inside linked directories."""
+        root, external = tree
+
+        delete_files_in_directory(str(root), recursive=True, symlinks="follow")
+
+        assert not (external / "data.fits").exists()
+        assert (root / "dir_link").is_symlink()
+        assert not (root / "file_link").is_symlink()
+
+    def test_follow_non_recursive_keeps_directory_links(self, tree):
+        """Test that directory links are not touched without recursion."""
+        root, external = tree
+
+        delete_files_in_directory(str(root), symlinks="follow")
+
+        assert (root / "dir_link").is_symlink()
+        assert (external / "data.fits").exists()
+
+    def test_follow_handles_cycles(self, tmp_path):
+        """Test that a symlink loop is visited only once."""
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "loop").symlink_to(tmp_path)
+        (tmp_path / "sub" / "file1.txt").touch()
+
+        failed = delete_files_in_directory(
+            str(tmp_path), recursive=True, symlinks="follow"
+        )
+
+        assert failed == []
+        assert not (tmp_path / "sub" / "file1.txt").exists()
+
+    def test_invalid_policy(self, tmp_path):
+        """Test that an unknown policy raises ValueError."""
+        with pytest.raises(ValueError, match="Unknown symlink policy"):
+            delete_files_in_directory(str(tmp_path), symlinks="maybe")
+
+
+class TestOneFileSystem:
+    """Tests for the one_file_system option."""
+
+    @pytest.fixture
+    def tree(self, tmp_path):
+        """Create a root with a local subdirectory and a simulated mount."""
+        (tmp_path / "local").mkdir()
+        (tmp_path / "local" / "file1.txt").touch()
+        (tmp_path / "archive").mkdir()
+        (tmp_path / "archive" / "file2.txt").touch()
+        (tmp_path / "archive" / "empty").mkdir()
+        return tmp_path
+
+    def test_does_not_descend_into_mount(self, tree):
+        """Test that files on another device are left alone."""
+        with patch("os.scandir", side_effect=_scandir_with_mount("archive")):
+            delete_files_in_directory(str(tree), recursive=True, one_file_system=True)
+
+        assert not (tree / "local" / "file1.txt").exists()
+        assert (tree / "archive" / "file2.txt").exists()
+
+    def test_descends_by_default(self, tree):
+        """Test that mount points are crossed without the option."""
+        with patch("os.scandir", side_effect=_scandir_with_mount("archive")):
+            delete_files_in_directory(str(tree), recursive=True)
+
+        assert not (tree / "archive" / "file2.txt").exists()
+
+    def test_prune_stays_on_device(self, tree):
+        """Test that empty directories on another device are not removed."""
+        with patch("os.scandir", side_effect=_scandir_with_mount("archive")):
+            empty_directory(str(tree), recursive=True, one_file_system=True)
+
+        assert not (tree / "local").exists()
+        assert (tree / "archive" / "empty").exists()
+
+    def test_prune_dryrun(self, tree, caplog):
+        """Test that dryrun reports directories that would become empty."""
+        import logging
+
+        (tree / "a" / "b").mkdir(parents=True)
+
+        with caplog.at_level(logging.INFO):
+            empty_directory(
+                str(tree), recursive=True, dryrun=True, one_file_system=True
+            )
+
+        assert "[DRYRUN] Deleting empty directory" in caplog.text
+        assert str(tree / "a") in caplog.text
+        assert (tree / "a" / "b").exists()
+
+
+class TestTimings:
+    """Tests for operation timing."""
+
+    def test_timings_recorded(self, tmp_path):
+        """Test that listing, deletion and matching time is recorded."""
+        from ap_empty_directory.profiling import Timings
+
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "file1.txt").touch()
+        (tmp_path / ".keep").touch()
+        timings = Timings()
+
+        empty_directory(
+            str(tmp_path),
+            recursive=True,
+            exclude_regex=r"\.keep$",
+            timings=timings,
+        )
+
+        # Listed once to delete files and once more to prune directories
+        assert timings.calls["scandir"] == 4
+        assert timings.calls["remove"] == 1
+        assert timings.calls["exclude"] == 2
+        assert timings.calls["rmdir"] == 1
+        assert not (tmp_path / "sub").exists()
+
+    def test_rmdir_timed_on_one_file_system(self, tmp_path):
+        """Test that rmdir is timed by the device-aware prune."""
+        from ap_empty_directory.profiling import Timings
+
+        (tmp_path / "sub").mkdir()
+        timings = Timings()
+
+        empty_directory(
+            str(tmp_path), recursive=True, one_file_system=True, timings=timings
+        )
+
+        assert timings.calls["rmdir"] == 1
+
+    def test_prune_walk_listing_timed(self):
+        """Test that every listing, including the prune walk, is counted."""
+        from ap_empty_directory.backend import SimulatedBackend
+        from ap_empty_directory.profiling import Timings
+
+        fs = SimulatedBackend()
+        for name in ("a", "b", "c"):
+            fs.add_file(f"/data/{name}/light.fits")
+        timings = Timings()
+
+        empty_directory("/data", recursive=True, backend=fs, timings=timings)
+
+        assert fs.counts["scandir"] == 8
+        assert timings.calls["scandir"] == fs.counts["scandir"]
+
+
+class TestDirectoryEmptier:
+    """Tests for the reusable DirectoryEmptier."""
+
+    def test_empty_reuses_configuration(self, tmp_path):
+        """Test that one instance empties several directories."""
+        roots = []
+        for name in ("night1", "night2"):
+            root = tmp_path / name
+            (root / "sub").mkdir(parents=True)
+            (root / "sub" / "light.fits").touch()
+            (root / ".keep").touch()
+            roots.append(root)
+
+        with DirectoryEmptier(recursive=True, exclude_regex=r"\.keep$") as emptier:
+            for root in roots:
+                assert emptier.empty(str(root)) == []
+
+        for root in roots:
+            assert [p.name for p in root.iterdir()] == [".keep"]
+
+    def test_plan_does_not_delete(self, tmp_path):
+        """Test that plan lists deletions without performing them."""
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "light.fits").touch()
+        (tmp_path / ".keep").touch()
+
+        emptier = DirectoryEmptier(recursive=True, exclude_regex=r"\.keep$")
+        planned = emptier.plan(str(tmp_path))
+
+        assert planned == [str(tmp_path / "sub" / "light.fits")]
+        assert isinstance(planned, PathList)
+        assert (tmp_path / "sub" / "light.fits").exists()
+
+    def test_wrappers_return_plain_lists(self):
+        """Test that the convenience wrappers return lists, not PathLists."""
+        from ap_empty_directory.backend import SimulatedBackend
+
+        fs = SimulatedBackend(failure_rate={"remove": 1.0})
+        fs.add_file("/data/sub/light.fits")
+
+        failed = empty_directory("/data", recursive=True, backend=fs)
+        failed_flat = delete_files_in_directory("/data/sub", backend=fs)
+
+        assert type(failed) is list and type(failed_flat) is list
+        assert failed + failed_flat == ["/data/sub/light.fits"] * 2
+
+    def test_pattern_compiled_once(self, tmp_path):
+        """Test that the exclude pattern is compiled at construction only."""
+        with patch("re.compile", wraps=__import__("re").compile) as mock_compile:
+            emptier = DirectoryEmptier(exclude_regex=r"\.keep$")
+            emptier.empty(str(tmp_path))
+            emptier.empty(str(tmp_path))
+
+        assert mock_compile.call_count == 1
+
+    def test_pool_kept_warm(self):
+        """Test that the worker pool and tuned concurrency persist across calls."""
+        from ap_empty_directory.backend import SimulatedBackend
+
+        fs = SimulatedBackend()
+        emptier = DirectoryEmptier(backend=fs, workers="auto")
+        try:
+            fs.add_file("/data/a/file.fits")
+            emptier.empty("/data/a")
+            pool = emptier._pool
+            fs.add_file("/data/b/file.fits")
+            emptier.empty("/data/b")
+
+            assert pool is not None
+            assert emptier._pool is pool
+        finally:
+            emptier.close()
+
+        assert emptier._pool is None
+        assert fs.paths() == ["/data", "/data/a", "/data/b"]
+
+    def test_invalid_configuration(self):
+        """Test that configuration errors are raised at construction."""
+        with pytest.raises(ValueError, match="Unknown symlink policy"):
+            DirectoryEmptier(symlinks="maybe")
+        with pytest.raises(ValueError, match="Workers must be"):
+            DirectoryEmptier(workers=0)
+        with pytest.raises(ValueError, match="prune_after_days requires keep_dirs"):
+            DirectoryEmptier(prune_after_days=7)
+
+
+class TestKeepDirs:
+    """Tests for keeping the directory skeleton."""
+
+    @pytest.fixture
+    def fs(self):
+        from ap_empty_directory.backend import SimulatedBackend
+
+        now = time.time()
+        fs = SimulatedBackend()
+        fs.mkdir("/data/old", mtime=now - 30 * 86400)
+        fs.mkdir("/data/old/nested", mtime=now - 30 * 86400)
+        fs.mkdir("/data/recent", mtime=now - 86400)
+        fs.add_file("/data/old/nested/light.fits")
+        fs.add_file("/data/recent/light.fits")
+        return fs
+
+    def test_keep_dirs_leaves_skeleton(self, fs):
+        """Test that no directories are removed or even walked for pruning."""
+        empty_directory("/data", recursive=True, backend=fs, keep_dirs=True)
+
+        assert fs.paths() == [
+            "/data",
+            "/data/old",
+            "/data/old/nested",
+            "/data/recent",
+        ]
+        assert fs.counts["rmdir"] == 0
+        assert fs.counts["scandir"] == 4
+
+    def test_prune_after_days(self, fs):
+        """Test that only directories stale before the run are removed."""
+        empty_directory(
+            "/data", recursive=True, backend=fs, keep_dirs=True, prune_after_days=7
+        )
+
+        assert fs.paths() == ["/data", "/data/recent"]
+
+    def test_prune_after_days_dryrun(self, fs, caplog):
+        """Test that dryrun reports stale empty directories without removing."""
+        fs.remove("/data/old/nested/light.fits")
+
+        with caplog.at_level(logging.INFO):
+            empty_directory(
+                "/data",
+                recursive=True,
+                dryrun=True,
+                backend=fs,
+                keep_dirs=True,
+                prune_after_days=7,
+            )
+
+        pruned = [m for m in caplog.messages if "empty directory" in m]
+        assert pruned == [
+            "[DRYRUN] Deleting empty directory: /data/old/nested",
+            "[DRYRUN] Deleting empty directory: /data/old",
+        ]
+        assert fs.counts["rmdir"] == 0
+
+
+class TestFreeUntil:
+    """Tests for the free space target mode."""
+
+    @pytest.fixture
+    def fs(self):
+        from ap_empty_directory.backend import SimulatedBackend
+
+        fs = SimulatedBackend(capacity=1000)
+        # 900 bytes used; oldest files are spread over subdirectories
+        for i in range(9):
+            fs.add_file(f"/data/night{i % 3}/light{i}.fits", size=100, mtime=i)
+        return fs
+
+    def test_deletes_oldest_until_target(self, fs):
+        """Test that only the oldest files needed to reach the target go."""
+        stats = RunStats()
+        empty_directory(
+            "/data", recursive=True, backend=fs, free_until="350", stats=stats
+        )
+
+        assert fs.statvfs("/data").f_bavail == 400
+        assert stats.deleted == 3
+        remaining = [p for p in fs.paths() if p.endswith(".fits")]
+        assert [p.rsplit("/", 1)[1] for p in remaining] == [
+            f"light{i}.fits" for i in (3, 6, 4, 7, 5, 8)
+        ]
+
+    def test_percent_target(self, fs):
+        """Test that a percentage of the filesystem size can be targeted."""
+        empty_directory("/data", recursive=True, backend=fs, free_until="50%")
+
+        assert fs.statvfs("/data").f_bavail == 500
+
+    def test_target_already_met(self, fs, caplog):
+        """Test that nothing is deleted when space is already sufficient."""
+        with caplog.at_level(logging.INFO):
+            empty_directory("/data", recursive=True, backend=fs, free_until="100")
+
+        assert "already met" in caplog.text
+        assert fs.counts["remove"] == 0
+
+    def test_rechecks_free_space(self, fs):
+        """Test that deletion continues while statvfs reports a shortfall."""
+        statvfs = fs.statvfs
+        calls = []
+
+        def lagging_statvfs(path):
+            # The check after the first round reports less space than the
+            # file sizes suggest (e.g. blocks still held by an open file)
+            st = statvfs(path)
+            calls.append(st.f_bavail)
+            if len(calls) == 2:
+                return os.statvfs_result((1, 1, 1000, 250, 250, 0, 0, 0, 0, 255))
+            return st
+
+        with patch.object(fs, "statvfs", side_effect=lagging_statvfs):
+            empty_directory("/data", recursive=True, backend=fs, free_until="300")
+
+        assert calls == [100, 300, 400]
+        assert statvfs("/data").f_bavail == 400
+
+    def test_excluded_reported_once_across_rounds(self, fs):
+        """Test that a second round does not report excluded files again."""
+        fs.add_file("/data/x.keep", size=0, mtime=100)
+        statvfs = fs.statvfs
+        calls = []
+
+        def lagging_statvfs(path):
+            st = statvfs(path)
+            calls.append(st.f_bavail)
+            if len(calls) == 2:
+                return os.statvfs_result((1, 1, 1000, 250, 250, 0, 0, 0, 0, 255))
+            return st
+
+        events = []
+        stats = RunStats()
+        with patch.object(fs, "statvfs", side_effect=lagging_statvfs):
+            empty_directory(
+                "/data",
+                recursive=True,
+                backend=fs,
+                free_until="300",
+                exclude_regex=r"\.keep$",
+                stats=stats,
+                on_entry=lambda event, path, error: events.append((event, path)),
+            )
+
+        assert len(calls) == 3
+        assert events.count((EVENT_EXCLUDED, "/data/x.keep")) == 1
+        assert stats.excluded == 1
+        assert stats.deleted == 3
+
+    def test_undeletable_oldest_file_skipped_in_later_rounds(self, fs):
+        """Test that a file that failed is not selected again by later rounds."""
+        remove = fs.remove
+
+        def failing_remove(path):
+            if path.endswith("light0.fits"):
+                raise PermissionError(errno.EACCES, "denied", path)
+            remove(path)
+
+        fs.remove = failing_remove
+        events = []
+        stats = RunStats()
+
+        failed = empty_directory(
+            "/data",
+            recursive=True,
+            backend=fs,
+            free_until="400",
+            stats=stats,
+            on_entry=lambda event, path, error: events.append((event, path)),
+        )
+
+        assert fs.statvfs("/data").f_bavail == 400
+        assert failed == ["/data/night0/light0.fits"]
+        assert stats.failed == 1
+        assert events.count((EVENT_FAILED, "/data/night0/light0.fits")) == 1
+        assert stats.deleted == 3
+
+    def test_directory_mtimes_from_before_the_run(self):
+        """Test that later rounds do not replace the mtimes used for pruning."""
+        from ap_empty_directory.backend import SimulatedBackend
+
+        now = time.time()
+        fs = SimulatedBackend(capacity=1000)
+        fs.mkdir("/data/old", mtime=now - 30 * 86400)
+        fs.add_file("/data/old/light0.fits", size=100, mtime=0)
+        for i in range(1, 9):
+            fs.add_file(f"/data/new/light{i}.fits", size=100, mtime=i)
+        fs.mkdir("/data/new", mtime=now)
+        remove = fs.remove
+
+        def touching_remove(path):
+            # Like a real filesystem, unlinking updates the parent's mtime
+            remove(path)
+            fs.mkdir(os.path.dirname(path), mtime=time.time())
+
+        fs.remove = touching_remove
+        statvfs = fs.statvfs
+        calls = []
+
+        def lagging_statvfs(path):
+            st = statvfs(path)
+            calls.append(st.f_bavail)
+            if len(calls) == 2:
+                return os.statvfs_result((1, 1, 1000, 150, 150, 0, 0, 0, 0, 255))
+            return st
+
+        with patch.object(fs, "statvfs", side_effect=lagging_statvfs):
+            empty_directory(
+                "/data",
+                recursive=True,
+                backend=fs,
+                free_until="200",
+                keep_dirs=True,
+                prune_after_days=7,
+            )
+
+        assert len(calls) == 3
+        assert not fs.exists("/data/old")
+        assert fs.exists("/data/new/light2.fits")
+
+    def test_target_not_reached(self, fs, caplog):
+        """Test that an unreachable target deletes everything and warns."""
+        empty_directory(
+            "/data",
+            recursive=True,
+            backend=fs,
+            free_until="2000",
+            exclude_regex=r"light0",
+        )
+
+        assert fs.paths() == ["/data", "/data/night0", "/data/night0/light0.fits"]
+        assert "not reached" in caplog.text
+
+    def test_dryrun_plans_selection(self, fs):
+        """Test that dryrun plans the selected files without deleting."""
+        emptier = DirectoryEmptier(recursive=True, backend=fs, free_until="300")
+
+        planned = emptier.plan("/data")
+
+        assert planned == ["/data/night0/light0.fits", "/data/night1/light1.fits"]
+        assert fs.counts["remove"] == 0
+
+    def test_concurrent_workers(self, fs):
+        """Test that the target is honoured with concurrent unlinks."""
+        stats = RunStats()
+        empty_directory(
+            "/data",
+            recursive=True,
+            backend=fs,
+            free_until="500",
+            workers=4,
+            stats=stats,
+        )
+
+        assert fs.statvfs("/data").f_bavail == 500
+        assert stats.deleted == 4
+
+    def test_invalid_target(self):
+        """Test that an invalid target is rejected at construction."""
+        with pytest.raises(ValueError, match="Invalid free space target"):
+            DirectoryEmptier(free_until="lots")
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="requires Linux /proc")
+class TestSkipOpen:
+    """Tests for skipping files open for writing."""
+
+    def test_open_files_skipped_and_reported(self, tmp_path):
+        """Test that open files are left in place and reported as in use."""
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "done.fits").touch()
+        events = []
+        stats = RunStats()
+
+        with open(tmp_path / "sub" / "capturing.fits", "w"):
+            failed = empty_directory(
+                str(tmp_path),
+                recursive=True,
+                skip_open=True,
+                stats=stats,
+                on_entry=lambda event, path, error: events.append((event, path)),
+            )
+
+        assert failed == []
+        assert sorted(events) == [
+            ("deleted", str(tmp_path / "sub" / "done.fits")),
+            ("in_use", str(tmp_path / "sub" / "capturing.fits")),
+        ]
+        assert (stats.deleted, stats.in_use, stats.failed) == (1, 1, 0)
+        assert [p.name for p in (tmp_path / "sub").iterdir()] == ["capturing.fits"]
+
+    def test_scanned_once_per_run(self, tmp_path):
+        """Test that /proc is scanned once per run, not per directory."""
+        from ap_empty_directory import openfiles
+
+        for name in ("a", "b", "c"):
+            (tmp_path / name).mkdir()
+            (tmp_path / name / "file.fits").touch()
+
+        with patch(
+            "ap_empty_directory.empty.scan_open_files",
+            wraps=openfiles.scan_open_files,
+        ) as mock_scan:
+            with DirectoryEmptier(recursive=True, skip_open=True) as emptier:
+                emptier.empty(str(tmp_path))
+                emptier.empty(str(tmp_path))
+
+        assert mock_scan.call_count == 2
+        assert list(tmp_path.iterdir()) == []
+
+    def test_not_scanned_by_default(self, tmp_path):
+        """Test that no scan happens unless skip_open is set."""
+        with patch("ap_empty_directory.empty.scan_open_files") as mock_scan:
+            empty_directory(str(tmp_path))
+
+        mock_scan.assert_not_called()
+
+
+class TestRetries:
+    """Tests for deferred retries of transient failures."""
+
+    @pytest.fixture
+    def fs(self):
+        from ap_empty_directory.backend import SimulatedBackend
+
+        fs = SimulatedBackend()
+        for i in range(4):
+            fs.add_file(f"/data/sub{i % 2}/light{i}.fits")
+        return fs
+
+    @staticmethod
+    def _flaky(fs, failures):
+        """Make removals fail with the given errnos before succeeding."""
+        remove = fs.remove
+        remaining = dict(failures)
+
+        def flaky_remove(path):
+            codes = remaining.get(path)
+            if codes:
+                raise OSError(codes.pop(0), "flaky", path)
+            remove(path)
+
+        fs.remove = flaky_remove
+
+    def test_transient_failures_retried(self, fs):
+        """Test that transient failures are retried without re-listing."""
+        self._flaky(
+            fs,
+            {
+                "/data/sub0/light0.fits": [errno.EBUSY, errno.EBUSY],
+                "/data/sub1/light1.fits": [errno.ESTALE],
+            },
+        )
+        events = []
+        stats = RunStats()
+
+        failed = empty_directory(
+            "/data",
+            recursive=True,
+            backend=fs,
+            retries=3,
+            retry_delay=0,
+            stats=stats,
+            on_entry=lambda event, path, error: events.append(event),
+        )
+
+        assert failed == []
+        assert events == ["deleted"] * 4
+        assert (stats.deleted, stats.failed) == (4, 0)
+        assert fs.paths() == ["/data"]
+        assert fs.counts["scandir"] == 3 + 3  # delete pass + prune pass
+
+    def test_permanent_failures_not_retried(self, fs):
+        """Test that permanent errors are reported immediately."""
+        self._flaky(fs, {"/data/sub0/light0.fits": [errno.EACCES]})
+
+        with patch("ap_empty_directory.retry.time.sleep") as mock_sleep:
+            failed = empty_directory("/data", recursive=True, backend=fs, retries=3)
+
+        assert failed == ["/data/sub0/light0.fits"]
+        mock_sleep.assert_not_called()
+
+    def test_retry_limit(self, fs):
+        """Test that files still failing after the last retry are reported."""
+        self._flaky(fs, {"/data/sub0/light0.fits": [errno.EBUSY] * 3})
+        stats = RunStats()
+
+        failed = empty_directory(
+            "/data", recursive=True, backend=fs, retries=2, retry_delay=0, stats=stats
+        )
+
+        assert failed == ["/data/sub0/light0.fits"]
+        assert (stats.deleted, stats.failed) == (3, 1)
+
+    def test_vanished_file_counts_as_deleted(self, fs):
+        """Test that a retry finding the file gone counts as a success."""
+        remove = fs.remove
+        stale = ["/data/sub0/light0.fits"]
+
+        def stale_then_gone(path):
+            # The removal takes effect but the first one reports an error
+            remove(path)
+            if path in stale:
+                stale.remove(path)
+                raise OSError(errno.ESTALE, "stale", path)
+
+        fs.remove = stale_then_gone
+
+        failed = empty_directory(
+            "/data", backend=fs, recursive=True, retries=1, retry_delay=0
+        )
+
+        assert failed == []
+
+    def test_retries_with_workers(self, fs):
+        """Test that retries go through the worker pool."""
+        self._flaky(fs, {"/data/sub1/light3.fits": [errno.EBUSY]})
+
+        failed = empty_directory(
+            "/data", recursive=True, backend=fs, retries=1, retry_delay=0, workers=4
+        )
+
+        assert failed == []
+        assert fs.paths() == ["/data"]
+
+    def test_no_retries_by_default(self, fs):
+        """Test that transient failures are reported at once by default."""
+        self._flaky(fs, {"/data/sub0/light0.fits": [errno.EBUSY]})
+
+        failed = empty_directory("/data", recursive=True, backend=fs)
+
+        assert failed == ["/data/sub0/light0.fits"]
+
+    def test_negative_delay_rejected_before_deleting(self, fs):
+        """Test that a negative retry delay is rejected up front."""
+        with pytest.raises(ValueError, match="Retry delay must not be negative"):
+            empty_directory("/data", recursive=True, backend=fs, retry_delay=-1)
+
+        assert len(fs.paths()) == 7
+
+
+class TestUsageReport:
+    """Tests for collecting a usage report during the traversal."""
+
+    @pytest.fixture
+    def fs(self):
+        from ap_empty_directory.backend import SimulatedBackend
+
+        fs = SimulatedBackend()
+        for i in range(3):
+            fs.add_file(f"/data/M31/Ha/light{i}.fits", size=100)
+            fs.add_file(f"/data/M42/OIII/light{i}.xisf", size=50)
+        fs.add_file("/data/M42/.keep", size=1)
+        return fs
+
+    def test_report_collected_while_deleting(self, fs):
+        """Test that the report needs no extra listing."""
+        from ap_empty_directory.report import UsageReport
+
+        report = UsageReport()
+        empty_directory(
+            "/data", recursive=True, backend=fs, exclude_regex=r"\.keep$", report=report
+        )
+
+        assert report.as_dict()["directories"] == [
+            {"path": "M31", "files": 3, "bytes": 300},
+            {"path": "M42", "files": 4, "bytes": 151},
+        ]
+        # One listing per directory to delete, one per directory to prune
+        assert fs.counts["scandir"] == 5 + 5
+        assert fs.paths() == ["/data", "/data/M42", "/data/M42/.keep"]
+
+    def test_report_only(self, fs):
+        """Test that report_only deletes and prunes nothing."""
+        from ap_empty_directory.report import UsageReport
+
+        report = UsageReport(depth=2)
+        stats = RunStats()
+        failed = empty_directory(
+            "/data",
+            recursive=True,
+            backend=fs,
+            report=report,
+            report_only=True,
+            stats=stats,
+        )
+
+        assert failed == []
+        assert stats == RunStats()
+        assert fs.counts["remove"] == fs.counts["rmdir"] == 0
+        assert [row["path"] for row in report.as_dict()["directories"]] == [
+            "M31/Ha",
+            "M42/OIII",
+            "M42",
+        ]
+
+    def test_survey(self, fs):
+        """Test DirectoryEmptier.survey."""
+        emptier = DirectoryEmptier(recursive=True, backend=fs)
+
+        report = emptier.survey("/data")
+
+        assert report.as_dict()["total"] == {"files": 7, "bytes": 451}
+        assert fs.counts["remove"] == 0
+
+    def test_report_with_free_until(self, fs):
+        """Test that free space rounds count each file once."""
+        from ap_empty_directory.report import UsageReport
+
+        fs_capacity = fs.statvfs("/data").f_blocks
+        target = fs_capacity - 451 + 100
+        report = UsageReport()
+        empty_directory(
+            "/data", recursive=True, backend=fs, free_until=str(target), report=report
+        )
+
+        assert report.as_dict()["total"] == {"files": 7, "bytes": 451}
+
+
+class TestTruncateAbove:
+    """Tests for truncating large files in the background before unlink."""
+
+    @pytest.fixture
+    def fs(self):
+        from ap_empty_directory.backend import SimulatedBackend
+
+        fs = SimulatedBackend(capacity=100_000)
+        fs.add_file("/data/M31/master.xisf", size=10_000, mtime=1.0)
+        fs.add_file("/data/M31/light1.fits", size=100, mtime=2.0)
+        fs.add_file("/data/M42/light2.fits", size=100, mtime=3.0)
+        return fs
+
+    def test_large_files_truncated(self, fs):
+        """Test that only files above the threshold are truncated."""
+        events = []
+        stats = RunStats()
+
+        failed = empty_directory(
+            "/data",
+            recursive=True,
+            backend=fs,
+            truncate_above=1000,
+            truncate_chunk=4000,
+            stats=stats,
+            on_entry=lambda event, path, error: events.append((event, path)),
+        )
+
+        assert failed == []
+        assert stats.deleted == 3
+        assert ("deleted", "/data/M31/master.xisf") in events
+        # 10000 -> 6000 -> 2000, then unlinked
+        assert fs.counts["truncate"] == 2
+        assert fs.paths() == ["/data"]
+
+    def test_failure_reported(self, fs):
+        """Test that a failed unlink of a truncated file is reported."""
+        remove = fs.remove
+
+        def failing_remove(path):
+            if path.endswith(".xisf"):
+                raise PermissionError(errno.EACCES, "denied", path)
+            remove(path)
+
+        fs.remove = failing_remove
+        stats = RunStats()
+
+        failed = empty_directory(
+            "/data",
+            recursive=True,
+            backend=fs,
+            truncate_above=1000,
+            truncate_chunk=4000,
+            stats=stats,
+        )
+
+        assert failed == ["/data/M31/master.xisf"]
+        assert stats.failed == 1
+        # Nothing is truncated unless the unlink succeeded
+        assert fs.stat("/data/M31/master.xisf").st_size == 10_000
+        assert fs.counts["truncate"] == 0
+
+    def test_dryrun_does_not_truncate(self, fs):
+        """Test that a dry run never truncates."""
+        stats = RunStats()
+
+        empty_directory(
+            "/data",
+            recursive=True,
+            dryrun=True,
+            backend=fs,
+            truncate_above=1000,
+            stats=stats,
+        )
+
+        assert stats.planned == 3
+        assert fs.counts["truncate"] == 0
+        assert fs.stat("/data/M31/master.xisf").st_size == 10_000
+
+    def test_with_free_until(self, fs):
+        """Test that files selected to free space are truncated as well."""
+        target = 100_000 - 10_200 + 5000
+
+        empty_directory(
+            "/data",
+            recursive=True,
+            backend=fs,
+            free_until=str(target),
+            truncate_above=1000,
+            truncate_chunk=4000,
+        )
+
+        assert fs.counts["truncate"] == 2
+        assert not fs.exists("/data/M31/master.xisf")
+        assert fs.exists("/data/M31/light1.fits")
+
+    def test_retried_after_transient_failure(self, fs):
+        """Test that transient failures of truncated files are retried."""
+        remove = fs.remove
+        failures = [errno.EBUSY]
+
+        def flaky_remove(path):
+            if path.endswith(".xisf") and failures:
+                raise OSError(failures.pop(), "busy", path)
+            remove(path)
+
+        fs.remove = flaky_remove
+
+        failed = empty_directory(
+            "/data",
+            recursive=True,
+            backend=fs,
+            truncate_above=1000,
+            retries=1,
+            retry_delay=0,
+        )
+
+        assert failed == []
+        assert fs.paths() == ["/data"]
+
+    def test_worker_reused(self, fs):
+        """Test that the truncate worker persists across calls until close()."""
+        with DirectoryEmptier(
+            recursive=True, backend=fs, truncate_above="1K"
+        ) as emptier:
+            emptier.empty("/data")
+            truncator = emptier._truncator
+            fs.add_file("/data/M51/master.xisf", size=5000)
+            emptier.empty("/data")
+
+            assert emptier._truncator is truncator
+            assert fs.paths() == ["/data"]
+        assert emptier._truncator is None
+
+    @pytest.mark.parametrize(
+        "options",
+        [{"truncate_above": 0}, {"truncate_above": "big"}, {"truncate_chunk": 0}],
+    )
+    def test_invalid_settings(self, options):
+        """Test that invalid sizes are rejected when configuring."""
+        with pytest.raises(ValueError):
+            DirectoryEmptier(**options)
+
+
+class TestCoordinate:
+    """Tests for emptying one tree from several cooperating processes."""
+
+    @pytest.fixture
+    def tree(self, tmp_path):
+        root = tmp_path / "scratch"
+        files = []
+        for target in range(8):
+            for frame in range(25):
+                path = root / f"target{target}" / f"night{frame % 3}" / f"{frame}.fits"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.touch()
+                files.append(str(path))
+        (root / "stacking.log").touch()
+        files.append(str(root / "stacking.log"))
+        return root, files
+
+    def test_single_process(self, tree):
+        """Test that a coordinated run on its own empties and prunes the tree."""
+        from ap_empty_directory.coordinate import COORDINATION_DIR
+
+        root, files = tree
+        stats = RunStats()
+
+        failed = empty_directory(
+            str(root), recursive=True, coordinate=True, stats=stats
+        )
+
+        assert failed == []
+        assert stats.deleted == len(files)
+        assert list(root.iterdir()) == []
+        assert not (root / COORDINATION_DIR).exists()
+
+    def test_markers_of_dead_run_ignored(self, tree):
+        """Test that a run left unfinished by dead processes is started over."""
+        from ap_empty_directory.coordinate import COORDINATION_DIR
+
+        root, files = tree
+        coordination = root / COORDINATION_DIR
+        coordination.mkdir()
+        marker = coordination / "done.target0"
+        marker.touch()
+        two_days_ago = time.time() - 2 * 86400
+        os.utime(marker, (two_days_ago, two_days_ago))
+        stats = RunStats()
+
+        empty_directory(str(root), recursive=True, coordinate=True, stats=stats)
+
+        assert stats.deleted == len(files)
+        assert list(root.iterdir()) == []
+
+    def test_multiple_processes(self, tree, tmp_path):
+        """Test that processes split the work: each file is handled once."""
+        import json
+        import multiprocessing
+
+        root, files = tree
+        try:
+            context = multiprocessing.get_context("fork")
+        except ValueError:
+            pytest.skip("fork start method not available")
+        barrier = context.Barrier(4)
+        results = [tmp_path / f"events{i}.json" for i in range(4)]
+        processes = [
+            context.Process(
+                target=_coordinated_worker, args=(str(root), str(result), barrier)
+            )
+            for result in results
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+
+        assert [process.exitcode for process in processes] == [0, 0, 0, 0]
+        events = [
+            event for result in results for event in json.loads(result.read_text())
+        ]
+        assert all(event == EVENT_DELETED for event, _ in events)
+        deleted = [path for _, path in events]
+        assert sorted(deleted) == sorted(files)
+        assert list(root.iterdir()) == []
+
+    def test_expired_lease_of_crashed_process(self, tree):
+        """Test that a subtree leased by a dead process is still emptied."""
+        from ap_empty_directory.coordinate import COORDINATION_DIR
+
+        root, files = tree
+        coordination = root / COORDINATION_DIR
+        coordination.mkdir()
+        (coordination / "lease.target3").write_text("crashed")
+        os.utime(coordination / "lease.target3", (0, 0))
+
+        empty_directory(str(root), recursive=True, coordinate=True, lease_ttl=30)
+
+        assert list(root.iterdir()) == []
+
+    def test_lost_lease_stops_subtree(self, tree, caplog):
+        """Test that work on a subtree stops once its lease is taken over."""
+        from ap_empty_directory.coordinate import COORDINATION_DIR, LeaseDirectory
+
+        root, files = tree
+        lease = root / COORDINATION_DIR / "lease.target0"
+        deleted = []
+
+        def on_entry(event, path, error):
+            if "target0" in path and not any("target0" in p for p in deleted):
+                # Another process takes the subtree over mid-run
+                lease.write_text("other")
+            deleted.append(path)
+
+        with (
+            patch.object(
+                LeaseDirectory, "lost", lambda self, name: not self._still_held(name)
+            ),
+            caplog.at_level(logging.WARNING),
+        ):
+            empty_directory(
+                str(root),
+                recursive=True,
+                coordinate=True,
+                lease_ttl=1,
+                on_entry=on_entry,
+            )
+
+        assert "Stopped emptying" in caplog.text
+        # Only picked up again once the other process's lease expired
+        resumed = [i for i, path in enumerate(deleted) if "target0" in path][1:]
+        assert resumed == list(range(len(files) - len(resumed), len(files)))
+        assert sorted(deleted) == sorted(files)
+        assert list(root.iterdir()) == []
+
+    def test_keep_dirs(self, tree):
+        """Test that keep_dirs skips the final prune but removes lease files."""
+        root, _ = tree
+
+        empty_directory(str(root), recursive=True, coordinate=True, keep_dirs=True)
+
+        assert sorted(p.name for p in root.iterdir()) == [
+            f"target{i}" for i in range(8)
+        ]
+
+    def test_dryrun_not_coordinated(self, tree):
+        """Test that a dry run plans without creating lease files."""
+        root, files = tree
+        stats = RunStats()
+
+        empty_directory(
+            str(root), recursive=True, coordinate=True, dryrun=True, stats=stats
+        )
+
+        assert stats.planned == len(files)
+        assert all(os.path.exists(path) for path in files)
+        assert len(list(root.iterdir())) == 9
+
+    @pytest.mark.parametrize(
+        "options, message",
+        [
+            ({}, "requires recursive"),
+            ({"recursive": True, "free_until": "1G"}, "free_until"),
+            (
+                {"recursive": True, "keep_dirs": True, "prune_after_days": 1},
+                "prune_after_days",
+            ),
+            ({"recursive": True, "lease_ttl": 0}, "must be positive"),
+        ],
+    )
+    def test_invalid_settings(self, options, message):
+        """Test that unsupported combinations are rejected when configuring."""
+        with pytest.raises(ValueError, match=message):
+            DirectoryEmptier(coordinate=True, **options)
+
+    def test_simulated_backend_rejected(self):
+        """Test that coordination requires the real filesystem."""
+        from ap_empty_directory.backend import SimulatedBackend
+
+        with pytest.raises(ValueError, match="real filesystem"):
+            DirectoryEmptier(
+                recursive=True, coordinate=True, backend=SimulatedBackend()
+            )
+
+    def test_report_rejected(self, tree):
+        """Test that a usage report cannot be combined with coordination."""
+        from ap_empty_directory.report import UsageReport
+
+        root, _ = tree
+
+        with pytest.raises(ValueError, match="report"):
+            empty_directory(
+                str(root), recursive=True, coordinate=True, report=UsageReport()
+            )
@@ -0,0 +1,128 @@
+"""Tests for the freespace module."""
+
+import random
+
+import pytest
+
+from ap_empty_directory.freespace import (
+    FreeSpaceTarget,
+    OldestFiles,
+    parse_free_target,
+    parse_size,
+)
+
+
+class TestParseSize:
+    """Tests for parse_size."""
+
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ("4096", 4096),
+            ("10K", 10 << 10),
+            ("200G", 200 << 30),
+            ("200gb", 200 << 30),
+            ("1.5TiB", 3 << 39),
+            (" 2 M ", 2 << 20),
+        ],
+    )
+    def test_valid(self, value, expected):
+        """Test that sizes with binary suffixes are parsed."""
+        assert parse_size(value) == expected
+
+    @pytest.mark.parametrize("value", ["", "G", "-1G", "10X", "1e3"])
+    def test_invalid(self, value):
+        """Test that malformed sizes raise ValueError."""
+        with pytest.raises(ValueError, match="Invalid size"):
+            parse_size(value)
+
+
+class TestParseFreeTarget:
+    """Tests for parse_free_target and FreeSpaceTarget."""
+
+    def test_bytes(self):
+        """Test that a size target is the shortfall to that many bytes."""
+        target = parse_free_target("1K")
+
+        assert target == FreeSpaceTarget(bytes=1024)
+        assert target.shortfall(total=10000, available=1000) == 24
+        assert target.shortfall(total=10000, available=2000) == 0
+
+    def test_percent(self):
+        """Test that a percentage target is relative to the filesystem size."""
+        target = parse_free_target("15%")
+
+        assert target == FreeSpaceTarget(percent=15.0)
+        assert target.shortfall(total=1000, available=100) == 50
+        assert str(target) == "15%"
+
+    def test_passthrough(self):
+        """Test that a parsed target is returned unchanged."""
+        target = FreeSpaceTarget(bytes=1)
+        assert parse_free_target(target) is target
+
+    @pytest.mark.parametrize("value", ["abc%", "0%", "101%", "lots"])
+    def test_invalid(self, value):
+        """Test that malformed targets raise ValueError."""
+        with pytest.raises(ValueError):
+            parse_free_target(value)
+
+
+class TestOldestFiles:
+    """Tests for OldestFiles."""
+
+    def test_selects_oldest_covering_needed(self):
+        """Test that the fewest oldest files covering the size are kept."""
+        files = [(f"/data/f{i}", 10, float(i)) for i in range(1000)]
+        random.Random(0).shuffle(files)
+        selection = OldestFiles(needed=35)
+
+        for path, size, mtime in files:
+            selection.offer(path, size, mtime)
+
+        assert selection.oldest_first() == [
+            ("/data/f0", 10),
+            ("/data/f1", 10),
+            ("/data/f2", 10),
+            ("/data/f3", 10),
+        ]
+        assert selection.total == 40
+
+    def test_memory_bounded_by_target(self):
+        """Test that the heap never holds more files than the target needs."""
+        selection = OldestFiles(needed=100)
+        largest = 0
+
+        for i in range(10000, 0, -1):
+            selection.offer(f"/data/f{i}", 10, float(i))
+            largest = max(largest, len(selection))
+
+        assert largest == 10
+        assert [path for path, _ in selection.oldest_first()][:2] == [
+            "/data/f1",
+            "/data/f2",
+        ]
+
+    def test_not_enough_files(self):
+        """Test that every file is kept when they cannot cover the size."""
+        selection = OldestFiles(needed=1000)
+        selection.offer("/data/new", 10, 2.0)
+        selection.offer("/data/old", 10, 1.0)
+
+        assert selection.oldest_first() == [("/data/old", 10), ("/data/new", 10)]
+        assert selection.total == 20
+
+    def test_nothing_needed(self):
+        """Test that no files are selected when nothing must be freed."""
+        selection = OldestFiles(needed=0)
+        selection.offer("/data/file", 10, 1.0)
+
+        assert selection.oldest_first() == []
+
+    def test_skipped_paths_not_selected(self):
+        """Test that skipped paths are passed over even when oldest."""
+        selection = OldestFiles(needed=10, skip={"/data/failed"})
+        selection.offer("/data/failed", 10, 1.0)
+        selection.offer("/data/next", 10, 2.0)
+
+        assert selection.oldest_first() == [("/data/next", 10)]
@@ -0,0 +1,102 @@
+"""Tests for the openfiles module."""
+
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from ap_empty_directory.openfiles import OpenFiles, open_elsewhere, scan_open_files
+
+requires_proc = pytest.mark.skipif(
+    not os.path.isdir("/proc/self/fd"), reason="requires Linux /proc"
+)
+
+
+class _Entry:
+    """Directory entry stand-in that counts stat calls."""
+
+    def __init__(self, dev, ino):
+        self._stat = SimpleNamespace(st_dev=dev, st_ino=ino)
+        self._ino = ino
+        self.stat_calls = 0
+
+    def inode(self):
+        return self._ino
+
+    def stat(self, follow_symlinks=True):
+        self.stat_calls += 1
+        return self._stat
+
+
+class TestOpenFiles:
+    """Tests for OpenFiles."""
+
+    def test_unknown_inode_needs_no_stat(self):
+        """Test that entries with an unindexed inode are rejected without stat."""
+        index = OpenFiles({(1, 100)})
+        entry = _Entry(1, 200)
+
+        assert entry not in index
+        assert entry.stat_calls == 0
+
+    def test_match_requires_same_device(self):
+        """Test that an inode match on another device is not treated as open."""
+        index = OpenFiles({(1, 100)})
+
+        assert _Entry(1, 100) in index
+        assert _Entry(2, 100) not in index
+
+
+@requires_proc
+class TestScanOpenFiles:
+    """Tests for scan_open_files."""
+
+    def test_finds_files_open_for_writing(self, tmp_path):
+        """Test that files open for writing are indexed and read-only are not."""
+        writing = tmp_path / "writing.fits"
+        reading = tmp_path / "reading.fits"
+        reading.touch()
+
+        with open(writing, "w"), open(reading):
+            index = scan_open_files()
+
+        entries = {entry.name: entry for entry in os.scandir(tmp_path)}
+        assert entries["writing.fits"] in index
+        assert entries["reading.fits"] not in index
+
+    def test_missing_proc(self, tmp_path, caplog):
+        """Test that an unreadable procfs yields an empty index."""
+        index = scan_open_files(str(tmp_path / "missing"))
+
+        assert len(index) == 0
+        assert "Failed to list open files" in caplog.text
+
+
+@requires_proc
+class TestOpenElsewhere:
+    """Tests for open_elsewhere."""
+
+    def test_open_in_other_process(self, tmp_path):
+        """Test that a file read by another process is found, own ones are not."""
+        path = tmp_path / "master.xisf"
+        path.touch()
+        st = path.stat()
+
+        with open(path) as f:
+            assert not open_elsewhere(st.st_dev, st.st_ino)
+            reader = subprocess.Popen(
+                [sys.executable, "-c", "import time; time.sleep(60)"],
+                stdin=f,
+            )
+        try:
+            # stdin is the file, now held only by the child
+            assert open_elsewhere(st.st_dev, st.st_ino)
+        finally:
+            reader.kill()
+            reader.wait()
+
+    def test_missing_proc(self, tmp_path):
+        """Test that a file is assumed open when procfs is unavailable."""
+        assert open_elsewhere(1, 1, str(tmp_path / "missing"))
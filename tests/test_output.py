@@ -0,0 +1,102 @@
+"""Tests for the output module."""
+
+import io
+import json
+
+from ap_empty_directory.empty import EVENT_DELETED, EVENT_FAILED, RunStats
+from ap_empty_directory.output import JsonlWriter
+from ap_empty_directory.report import UsageReport
+
+
+class TestJsonlWriter:
+    """Tests for JsonlWriter."""
+
+    def test_entry_lines(self):
+        """Test that each entry produces one compact JSON object."""
+        stream = io.StringIO()
+        writer = JsonlWriter(stream)
+
+        writer(EVENT_DELETED, "/data/a.fits")
+        writer(EVENT_FAILED, "/data/b.fits", PermissionError("Permission denied"))
+        writer.flush()
+
+        lines = stream.getvalue().splitlines()
+        assert [json.loads(line) for line in lines] == [
+            {"event": "deleted", "path": "/data/a.fits"},
+            {
+                "event": "failed",
+                "path": "/data/b.fits",
+                "error": "Permission denied",
+            },
+        ]
+        assert " " not in lines[0]
+
+    def test_special_characters_escaped(self):
+        """Test that quotes, non-ASCII and undecodable names stay valid JSON."""
+        stream = io.StringIO()
+        writer = JsonlWriter(stream)
+        path = '/data/M31 "core"/été/\udcff.fits'
+
+        writer(EVENT_DELETED, path)
+        writer.flush()
+
+        assert json.loads(stream.getvalue())["path"] == path
+
+    def test_lines_are_batched(self):
+        """Test that lines are buffered until the batch is full."""
+        stream = io.StringIO()
+        writer = JsonlWriter(stream, batch_size=3)
+
+        writer(EVENT_DELETED, "/a")
+        writer(EVENT_DELETED, "/b")
+        assert stream.getvalue() == ""
+
+        writer(EVENT_DELETED, "/c")
+        assert len(stream.getvalue().splitlines()) == 3
+
+    def test_close_writes_summary(self):
+        """Test that close flushes entries and appends the summary."""
+        stream = io.StringIO()
+        writer = JsonlWriter(stream)
+
+        writer(EVENT_DELETED, "/a")
+        writer.close(RunStats(deleted=1, excluded=2))
+
+        lines = stream.getvalue().splitlines()
+        assert json.loads(lines[-1]) == {
+            "event": "summary",
+            "deleted": 1,
+            "planned": 0,
+            "excluded": 2,
+            "failed": 0,
+            "in_use": 0,
+            "workers": 1,
+            "workers_peak": 1,
+        }
+
+    def test_close_writes_report_before_summary(self):
+        """Test that a usage report is written as one event before the summary."""
+        stream = io.StringIO()
+        writer = JsonlWriter(stream)
+        report = UsageReport()
+        report.begin("/data")
+        report.add(report.bucket("/data/M31"), "light.fits", 100)
+
+        writer.close(RunStats(), report)
+
+        report_line, summary_line = stream.getvalue().splitlines()
+        assert json.loads(report_line) == {"event": "report", **report.as_dict()}
+        assert json.loads(summary_line)["event"] == "summary"
+
+    def test_close_with_error(self):
+        """Test that a run that stopped early gets an error in its summary."""
+        stream = io.StringIO()
+        writer = JsonlWriter(stream)
+
+        writer(EVENT_DELETED, "/a")
+        writer.close(RunStats(deleted=1), error="disk gone")
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert lines[0] == {"event": "deleted", "path": "/a"}
+        assert lines[1]["error"] == "disk gone"
+        assert lines[1]["deleted"] == 1
@@ -0,0 +1,76 @@
+"""Tests for the pathlist module."""
+
+import os
+import tracemalloc
+
+import pytest
+
+from ap_empty_directory.pathlist import PathList
+
+
+class TestPathList:
+    """Tests for PathList."""
+
+    def test_round_trip(self):
+        """Test that paths come back unchanged and in order."""
+        paths = ["/data/a/light1.fits", "/data/b/light2.fits", "/data/a/light3.fits"]
+
+        result = PathList(paths)
+
+        assert list(result) == paths
+        assert len(result) == 3
+        assert result.directories == 2
+
+    def test_edge_paths(self):
+        """Test root-level files, bare names and undecodable names."""
+        paths = ["/top.fits", "relative.fits", "/data/\udcff.fits", "/data/"]
+
+        assert list(PathList(paths)) == paths
+
+    def test_sequence_access(self):
+        """Test indexing, slicing and containment."""
+        result = PathList(["/a/1", "/a/2", "/b/3"])
+
+        assert result[0] == "/a/1"
+        assert result[-1] == "/b/3"
+        assert result[1:] == ["/a/2", "/b/3"]
+        assert "/a/2" in result
+        with pytest.raises(IndexError):
+            result[3]
+
+    def test_equality(self):
+        """Test that a PathList compares equal to a list of the same paths."""
+        assert PathList() == []
+        assert PathList(["/a/1"]) == ["/a/1"]
+        assert PathList(["/a/1"]) != ["/a/2"]
+        assert PathList(["/a/1"]) == PathList(["/a/1"])
+
+    def test_extend_from_pathlist(self):
+        """Test that extending from another PathList keeps the paths."""
+        result = PathList(["/a/1"])
+        result.extend(PathList(["/b/2", "/a/3"]))
+
+        assert result == ["/a/1", "/b/2", "/a/3"]
+        assert result.directories == 2
+
+    def test_memory_scales_with_directories(self):
+        """Test that many paths in few directories use far less than strings."""
+        prefix = os.sep.join(["", "data", "M31", "LIGHT", "Ha", "2026-01-01"])
+        names = [f"light_{i:06d}_300s.fits" for i in range(20000)]
+
+        tracemalloc.start()
+        try:
+            plain = [f"{prefix}/d{i % 10}/{name}" for i, name in enumerate(names)]
+            plain_bytes = tracemalloc.get_traced_memory()[0]
+            del plain
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            compact = PathList()
+            for i, name in enumerate(names):
+                compact.append(f"{prefix}/d{i % 10}/{name}")
+            compact_bytes = tracemalloc.get_traced_memory()[0] - base
+        finally:
+            tracemalloc.stop()
+
+        assert compact.directories == 10
+        assert compact_bytes < plain_bytes / 2
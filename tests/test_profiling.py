@@ -0,0 +1,85 @@
+"""Tests for the profiling module."""
+
+import os
+import pstats
+
+import pytest
+
+from ap_empty_directory.profiling import Timings, run_profiled
+
+
+class TestTimings:
+    """Tests for Timings."""
+
+    def test_wrap_records_calls(self):
+        """Test that wrapped calls are counted and timed."""
+        timings = Timings()
+        double = timings.wrap("double", lambda x: x * 2)
+
+        assert double(2) == 4
+        assert double(3) == 6
+
+        result = timings.as_dict()
+        assert result["double"]["calls"] == 2
+        assert result["double"]["seconds"] >= 0
+
+    def test_wrap_records_failures(self):
+        """Test that calls raising exceptions are still recorded."""
+        timings = Timings()
+
+        def fail(path):
+            raise PermissionError(path)
+
+        with pytest.raises(PermissionError):
+            timings.wrap("remove", fail)("/x")
+
+        assert timings.calls["remove"] == 1
+
+    def test_wrap_scandir_times_iteration(self, tmp_path):
+        """Test that scandir wrapping yields entries and counts one call."""
+        (tmp_path / "a").touch()
+        (tmp_path / "b").touch()
+        timings = Timings()
+
+        with timings.wrap_scandir(os.scandir)(str(tmp_path)) as it:
+            names = sorted(entry.name for entry in it)
+
+        assert names == ["a", "b"]
+        assert timings.calls["scandir"] == 1
+
+    def test_format(self):
+        """Test that the formatted table lists operations slowest first."""
+        timings = Timings()
+        timings.add("remove", 2.0, calls=4)
+        timings.add("scandir", 1.0)
+
+        lines = timings.format().splitlines()
+
+        assert lines[1].startswith("remove")
+        assert "500000.0" in lines[1]
+        assert lines[2].startswith("scandir")
+
+
+class TestRunProfiled:
+    """Tests for run_profiled."""
+
+    def test_writes_stats(self, tmp_path):
+        """Test that the profile is written and the result returned."""
+        path = tmp_path / "run.prof"
+
+        result = run_profiled(str(path), sorted, [3, 1, 2])
+
+        assert result == [1, 2, 3]
+        assert pstats.Stats(str(path)).total_calls > 0
+
+    def test_writes_stats_on_error(self, tmp_path):
+        """Test that the profile is written even if the callable raises."""
+        path = tmp_path / "run.prof"
+
+        def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            run_profiled(str(path), fail)
+
+        assert path.exists()
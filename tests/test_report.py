@@ -0,0 +1,88 @@
+"""Tests for the report module."""
+
+import pytest
+
+from ap_empty_directory.report import UsageReport, format_bytes
+
+
+class TestFormatBytes:
+    """Tests for format_bytes."""
+
+    @pytest.mark.parametrize(
+        "size, expected",
+        [
+            (0, "0 B"),
+            (1023, "1023 B"),
+            (1536, "1.5 KiB"),
+            (200 << 30, "200.0 GiB"),
+            (3 << 50, "3072.0 TiB"),
+        ],
+    )
+    def test_units(self, size, expected):
+        """Test that sizes use the largest fitting binary unit."""
+        assert format_bytes(size) == expected
+
+
+class TestUsageReport:
+    """Tests for UsageReport."""
+
+    def _report(self, depth=1):
+        report = UsageReport(depth)
+        report.begin("/data")
+        for directory, name, size in [
+            ("/data", "README", 5),
+            ("/data/M31/Ha", "light1.fits", 100),
+            ("/data/M31/Ha", "light2.FITS", 100),
+            ("/data/M31/OIII", "light3.xisf", 50),
+            ("/data/M42", "notes.json", 10),
+        ]:
+            report.add(report.bucket(directory), name, size)
+        return report
+
+    def test_groups_by_first_level(self):
+        """Test that depth 1 groups files by top-level subdirectory."""
+        result = self._report().as_dict()
+
+        assert result["total"] == {"files": 5, "bytes": 265}
+        assert result["directories"] == [
+            {"path": "M31", "files": 3, "bytes": 250},
+            {"path": "M42", "files": 1, "bytes": 10},
+            {"path": ".", "files": 1, "bytes": 5},
+        ]
+
+    def test_groups_by_extension(self):
+        """Test that extensions are case-insensitive, largest first."""
+        result = self._report().as_dict()
+
+        assert result["extensions"] == [
+            {"extension": ".fits", "files": 2, "bytes": 200},
+            {"extension": ".xisf", "files": 1, "bytes": 50},
+            {"extension": ".json", "files": 1, "bytes": 10},
+            {"extension": "(none)", "files": 1, "bytes": 5},
+        ]
+
+    def test_deeper_grouping(self):
+        """Test that depth 2 separates filters within a target."""
+        paths = [row["path"] for row in self._report(depth=2).as_dict()["directories"]]
+
+        assert paths == ["M31/Ha", "M31/OIII", "M42", "."]
+
+    def test_bucket_shared_per_group(self):
+        """Test that directories in the same group share counters."""
+        report = UsageReport(1)
+        report.begin("/data")
+
+        assert report.bucket("/data/M31/Ha") is report.bucket("/data/M31/OIII")
+
+    def test_format(self):
+        """Test the text tables."""
+        text = self._report().format()
+
+        assert text.splitlines()[0].split() == ["directory", "files", "size"]
+        assert "M31" in text.splitlines()[1]
+        assert text.splitlines()[-1] == "total: 5 files, 265 B"
+
+    def test_invalid_depth(self):
+        """Test that a negative depth raises ValueError."""
+        with pytest.raises(ValueError, match="must not be negative"):
+            UsageReport(-1)
@@ -0,0 +1,70 @@
+"""Tests for the retry module."""
+
+import errno
+
+import pytest
+
+from ap_empty_directory.retry import RetryQueue
+
+
+def _error(code):
+    return OSError(code, "error", "/data/file")
+
+
+class TestRetryQueue:
+    """Tests for RetryQueue."""
+
+    def test_only_transient_errors_queued(self):
+        """Test that permanent errors are not queued."""
+        queue = RetryQueue(3, sleep=lambda s: None)
+
+        assert queue.offer("/data/busy", _error(errno.EBUSY))
+        assert queue.offer("/data/stale", _error(errno.ESTALE))
+        assert not queue.offer("/data/denied", _error(errno.EACCES))
+        assert not queue.offer("/data/missing", _error(errno.ENOENT))
+        assert len(queue) == 2
+
+    def test_disabled_with_zero_retries(self):
+        """Test that nothing is queued when retries are disabled."""
+        queue = RetryQueue(0)
+
+        assert not queue.offer("/data/busy", _error(errno.EBUSY))
+
+    def test_backoff_and_round_limit(self):
+        """Test exponential, capped backoff and the retry limit."""
+        slept = []
+        queue = RetryQueue(4, base_delay=1.0, max_delay=3.0, sleep=slept.append)
+        queue.offer("/data/busy", _error(errno.EBUSY))
+
+        attempts = []
+        for attempt, paths in queue.rounds():
+            attempts.append((attempt, paths))
+            # Still busy every time
+            queue.offer("/data/busy", _error(errno.EBUSY))
+
+        assert attempts == [(n, ["/data/busy"]) for n in (1, 2, 3, 4)]
+        assert slept == [1.0, 2.0, 3.0, 3.0]
+        assert [path for path, _ in queue.exhausted()] == ["/data/busy"]
+        assert len(queue) == 0
+
+    def test_stops_when_empty(self):
+        """Test that no further rounds run once every retry succeeded."""
+        slept = []
+        queue = RetryQueue(5, sleep=slept.append)
+        queue.offer("/data/busy", _error(errno.EBUSY))
+
+        rounds = list(queue.rounds())
+
+        assert rounds == [(1, ["/data/busy"])]
+        assert slept == [0.5]
+        assert queue.exhausted() == []
+
+    def test_negative_retries(self):
+        """Test that a negative retry count raises ValueError."""
+        with pytest.raises(ValueError, match="must not be negative"):
+            RetryQueue(-1)
+
+    def test_negative_delay(self):
+        """Test that a negative retry delay raises ValueError."""
+        with pytest.raises(ValueError, match="must not be negative"):
+            RetryQueue(1, base_delay=-1)
@@ -0,0 +1,134 @@
+"""Tests for the throttle module."""
+
+import os
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+from ap_empty_directory.throttle import TokenBucket, lower_priority
+
+
+class FakeClock:
+    """Manually advanced clock whose sleep() advances time."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket:
+    """Tests for TokenBucket."""
+
+    def test_burst_within_capacity_does_not_sleep(self):
+        """Test that consuming up to capacity never sleeps."""
+        clock = FakeClock()
+        bucket = TokenBucket(10, clock=clock, sleep=clock.sleep)
+
+        for _ in range(10):
+            assert bucket.consume() == 0.0
+
+        assert clock.slept == []
+
+    def test_exceeding_capacity_sleeps_for_deficit(self):
+        """Test that consuming beyond capacity sleeps until refilled."""
+        clock = FakeClock()
+        bucket = TokenBucket(10, clock=clock, sleep=clock.sleep)
+
+        for _ in range(10):
+            bucket.consume()
+        waited = bucket.consume()
+
+        assert waited == pytest.approx(0.1)
+
+    def test_sustained_rate(self):
+        """Test that the long-run rate matches the configured rate."""
+        clock = FakeClock()
+        bucket = TokenBucket(100, capacity=1, clock=clock, sleep=clock.sleep)
+
+        for _ in range(1001):
+            bucket.consume()
+
+        assert clock.now == pytest.approx(10.0)
+
+    def test_large_request_goes_into_debt(self):
+        """Test that a request larger than capacity is delayed, not rejected."""
+        clock = FakeClock()
+        bucket = TokenBucket(1000, clock=clock, sleep=clock.sleep)
+
+        waited = bucket.consume(5000)
+
+        assert waited == pytest.approx(4.0)
+
+    def test_refill_is_capped(self):
+        """Test that idle time does not accumulate more than capacity."""
+        clock = FakeClock()
+        bucket = TokenBucket(10, capacity=5, clock=clock, sleep=clock.sleep)
+
+        clock.now += 100
+        for _ in range(5):
+            assert bucket.consume() == 0.0
+        assert bucket.consume() > 0
+
+    def test_invalid_rate(self):
+        """Test that a non-positive rate raises ValueError."""
+        with pytest.raises(ValueError, match="Rate must be positive"):
+            TokenBucket(0)
+
+
+class TestLowerPriority:
+    """Tests for lower_priority."""
+
+    def test_noop_by_default(self):
+        """Test that nothing is changed when no options are given."""
+        with patch("os.nice") as mock_nice, patch("subprocess.run") as mock_run:
+            lower_priority()
+
+        mock_nice.assert_not_called()
+        mock_run.assert_not_called()
+
+    def test_nice(self):
+        """Test that niceness is incremented."""
+        with patch("os.nice") as mock_nice:
+            lower_priority(nice=5)
+
+        mock_nice.assert_called_once_with(5)
+
+    def test_ionice_idle(self):
+        """Test that ionice is invoked for the current process."""
+        with patch("shutil.which", return_value="/usr/bin/ionice"):
+            with patch("subprocess.run") as mock_run:
+                lower_priority(ionice="idle")
+
+        args = mock_run.call_args[0][0]
+        assert args == ["/usr/bin/ionice", "-c", "3", "-p", str(os.getpid())]
+
+    def test_ionice_missing(self, caplog):
+        """Test that a missing ionice binary is logged, not raised."""
+        with patch("shutil.which", return_value=None):
+            lower_priority(ionice="idle")
+
+        assert "ionice not available" in caplog.text
+
+    def test_ionice_failure(self, caplog):
+        """Test that ionice failures are logged, not raised."""
+        with patch("shutil.which", return_value="/usr/bin/ionice"):
+            with patch(
+                "subprocess.run",
+                side_effect=subprocess.CalledProcessError(1, "ionice"),
+            ):
+                lower_priority(ionice="idle")
+
+        assert "Failed to set I/O priority" in caplog.text
+
+    def test_unknown_ionice_class(self):
+        """Test that an unknown ionice class raises ValueError."""
+        with pytest.raises(ValueError, match="Unknown ionice class"):
+            lower_priority(ionice="realtime")
@@ -0,0 +1,205 @@
+"""Tests for the truncate module."""
+
+import errno
+import os
+import threading
+
+import pytest
+
+from ap_empty_directory.backend import OSBackend, SimulatedBackend
+from ap_empty_directory.truncate import Truncator, parse_size_option
+
+
+class TestParseSizeOption:
+    """Tests for parse_size_option."""
+
+    def test_valid(self):
+        """Test that byte counts and size strings are accepted."""
+        assert parse_size_option(4096, "chunk") == 4096
+        assert parse_size_option("4G", "chunk") == 4 << 30
+
+    @pytest.mark.parametrize("value", [0, "0", "-1G"])
+    def test_invalid(self, value):
+        """Test that zero and negative sizes raise ValueError."""
+        with pytest.raises(ValueError):
+            parse_size_option(value, "chunk")
+
+
+class TestTruncator:
+    """Tests for Truncator."""
+
+    def test_removes_then_truncates_in_chunks(self):
+        """Test that a large file is unlinked, then shrunk chunk by chunk."""
+        fs = SimulatedBackend(capacity=10_000)
+        fs.add_file("/data/master.xisf", size=1000)
+        sizes = []
+        truncate = fs.ftruncate
+
+        def record(fd, length):
+            assert not fs.exists("/data/master.xisf")
+            sizes.append(length)
+            truncate(fd, length)
+
+        fs.ftruncate = record  # type: ignore[method-assign]
+        truncator = Truncator(fs, threshold=500, chunk_size=300)
+        try:
+            truncator.submit("/data/master.xisf", 1000)
+            results = truncator.drain()
+        finally:
+            truncator.close()
+
+        assert results == [("/data/master.xisf", None)]
+        assert sizes == [700, 400, 100]
+        assert fs.paths() == ["/data"]
+        assert fs.statvfs("/data").f_bavail == 10_000
+
+    def test_submit_does_not_block(self):
+        """Test that the caller continues while a file is being truncated."""
+        fs = SimulatedBackend()
+        fs.add_file("/data/master.xisf", size=1000)
+        release = threading.Event()
+        truncate = fs.ftruncate
+
+        def slow_truncate(fd, length):
+            release.wait(5)
+            truncate(fd, length)
+
+        fs.ftruncate = slow_truncate  # type: ignore[method-assign]
+        truncator = Truncator(fs, threshold=1, chunk_size=100)
+        try:
+            truncator.submit("/data/master.xisf", 1000)
+            assert truncator.completed() == []
+            release.set()
+            assert truncator.drain() == [("/data/master.xisf", None)]
+        finally:
+            release.set()
+            truncator.close()
+
+    def test_open_failure_falls_back_to_unlink(self):
+        """Test that a file that cannot be opened for writing is still removed."""
+        fs = SimulatedBackend(failure_rate={"open": 1.0}, failure_errno=errno.EACCES)
+        fs.add_file("/data/readonly.fits", size=1000)
+        truncator = Truncator(fs, threshold=1, chunk_size=100)
+        try:
+            truncator.submit("/data/readonly.fits", 1000)
+            assert truncator.drain() == [("/data/readonly.fits", None)]
+        finally:
+            truncator.close()
+
+        assert fs.counts["truncate"] == 0
+        assert not fs.exists("/data/readonly.fits")
+
+    def test_truncate_failure_releases_rest_on_close(self):
+        """Test that a failed truncate still frees the space of the file."""
+        fs = SimulatedBackend(
+            capacity=10_000, failure_rate={"truncate": 1.0}, failure_errno=errno.EIO
+        )
+        fs.add_file("/data/master.xisf", size=1000)
+        truncator = Truncator(fs, threshold=1, chunk_size=100)
+        try:
+            truncator.submit("/data/master.xisf", 1000)
+            assert truncator.drain() == [("/data/master.xisf", None)]
+        finally:
+            truncator.close()
+
+        assert fs.counts["truncate"] == 1
+        assert fs.paths() == ["/data"]
+        assert fs.statvfs("/data").f_bavail == 10_000
+
+    def test_remove_failure_leaves_file_intact(self):
+        """Test that a failed unlink is reported and nothing is truncated."""
+        fs = SimulatedBackend(failure_rate={"remove": 1.0}, failure_errno=errno.EBUSY)
+        fs.add_file("/data/master.xisf", size=1000)
+        truncator = Truncator(fs, threshold=1, chunk_size=400)
+        try:
+            truncator.submit("/data/master.xisf", 1000)
+            [(path, error)] = truncator.drain()
+        finally:
+            truncator.close()
+
+        assert path == "/data/master.xisf"
+        assert error is not None and error.errno == errno.EBUSY
+        assert fs.stat("/data/master.xisf").st_size == 1000
+        assert fs.counts["truncate"] == 0
+
+    def test_unwritable_directory_leaves_file_intact(self, tmp_path):
+        """Test that a file in a read-only directory keeps its data."""
+        if os.geteuid() == 0:
+            pytest.skip("root can remove files from read-only directories")
+        master = tmp_path / "master.xisf"
+        master.write_bytes(b"x" * 1000)
+        tmp_path.chmod(0o555)
+        truncator = Truncator(OSBackend(), threshold=1, chunk_size=100)
+        try:
+            truncator.submit(str(master), 1000)
+            [(_, error)] = truncator.drain()
+        finally:
+            truncator.close()
+            tmp_path.chmod(0o755)
+
+        assert isinstance(error, PermissionError)
+        assert master.read_bytes() == b"x" * 1000
+
+    def test_file_open_elsewhere_is_not_truncated(self):
+        """Test that a file another process has open is only unlinked."""
+        fs = SimulatedBackend()
+        fs.add_file("/data/master.xisf", size=1000)
+        checked = []
+
+        def in_use(dev, ino):
+            checked.append(ino)
+            return True
+
+        truncator = Truncator(fs, threshold=1, chunk_size=100, in_use=in_use)
+        try:
+            truncator.submit("/data/master.xisf", 1000)
+            assert truncator.drain() == [("/data/master.xisf", None)]
+        finally:
+            truncator.close()
+
+        assert len(checked) == 1
+        assert fs.counts["truncate"] == 0
+        assert not fs.exists("/data/master.xisf")
+
+    def test_hard_linked_file_is_not_truncated(self, tmp_path):
+        """Test that data reachable through another link is left intact."""
+        original = tmp_path / "master.xisf"
+        original.write_bytes(b"x" * 1000)
+        link = tmp_path / "link.xisf"
+        os.link(original, link)
+        truncator = Truncator(OSBackend(), threshold=1, chunk_size=100)
+        try:
+            truncator.submit(str(original), 1000)
+            assert truncator.drain() == [(str(original), None)]
+        finally:
+            truncator.close()
+
+        assert not original.exists()
+        assert link.read_bytes() == b"x" * 1000
+
+    def test_bytes_bucket_consumed_per_chunk(self):
+        """Test that the byte throttle is charged as space is released."""
+        fs = SimulatedBackend()
+        fs.add_file("/data/master.xisf", size=1000)
+        consumed = []
+
+        class Bucket:
+            def consume(self, amount=1.0):
+                consumed.append(amount)
+                return 0.0
+
+        truncator = Truncator(fs, threshold=1, chunk_size=400, bytes_bucket=Bucket())
+        try:
+            truncator.submit("/data/master.xisf", 1000)
+            truncator.drain()
+        finally:
+            truncator.close()
+
+        assert consumed == [400, 400, 200]
+
+    def test_invalid_settings(self):
+        """Test that non-positive sizes raise ValueError."""
+        with pytest.raises(ValueError, match="threshold"):
+            Truncator(SimulatedBackend(), threshold=0)
+        with pytest.raises(ValueError, match="chunk size"):
+            Truncator(SimulatedBackend(), threshold=1, chunk_size=0)